@@ -0,0 +1,68 @@
+"""Time to query a directory of config files: parsing them all with YamlConfig, or with a ConfigArchive
+
+    python benchmarks/bench_archive.py --n_files 1000 --n_keys 200
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from ruamel.yaml import YAML
+
+from configmypy import YamlConfig
+from configmypy.archive import ConfigArchive
+
+from generators import make_nested_config
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n_files', type=int, default=1000)
+    parser.add_argument('--n_keys', type=int, default=200, help='number of leaves of each config')
+    parser.add_argument('--max_workers', type=int, default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as folder:
+        yaml = YAML(typ='safe')
+        for i in range(args.n_files):
+            config = make_nested_config(args.n_keys)
+            config['opt'] = {'optimizer': rng.choice(['SGD', 'Adam']), 'lr': rng.choice([0.1, 0.01])}
+            config['data'] = {'batch_size': rng.choice([8, 16, 32, 64])}
+            filepath = Path(folder, f'run_{i // 100}', f'run_{i}', 'config.yaml')
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            with filepath.open('w') as f:
+                yaml.dump(config, f)
+        conditions = ('opt.optimizer=SGD', 'data.batch_size>16')
+
+        def query_yaml():
+            matches = []
+            for filepath in sorted(Path(folder).glob('**/*.yaml')):
+                config, _ = YamlConfig(filepath.name, config_folder=filepath.parent, engine='safe').read_conf()
+                if config.opt.optimizer == 'SGD' and config.data.batch_size > 16:
+                    matches.append(filepath.relative_to(folder).as_posix())
+            return matches
+
+        print(f'{args.n_files} files of {args.n_keys} leaves, querying {" and ".join(conditions)}')
+        expected, duration = timed(query_yaml)
+        print(f'{"YamlConfig (sequential)":>30}: {duration:.3f}s')
+
+        archive = ConfigArchive(folder, max_workers=args.max_workers)
+        _, duration = timed(archive.refresh)
+        print(f'{"ConfigArchive: first refresh":>30}: {duration:.3f}s')
+        _, duration = timed(lambda: ConfigArchive(folder, max_workers=args.max_workers).refresh())
+        print(f'{"reload index + refresh":>30}: {duration:.3f}s')
+        matches, duration = timed(lambda: archive.query(*conditions))
+        print(f'{"query":>30}: {duration*1000:.2f}ms')
+        assert matches == sorted(expected)
+
+
+if __name__ == '__main__':
+    main()
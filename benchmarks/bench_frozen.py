@@ -0,0 +1,44 @@
+"""Attribute-read throughput and memory footprint of a Bunch and of its frozen version
+
+    python benchmarks/bench_frozen.py --n_sections 10 --n_keys 100
+"""
+import argparse
+import sys
+import timeit
+from collections.abc import Mapping
+
+from configmypy import Bunch
+from configmypy.frozen import freeze
+
+from generators import make_config
+
+
+def footprint(config):
+    """Size in bytes of the nodes of a config (dicts, frozen nodes, lists/tuples), excluding the leaves"""
+    size = sys.getsizeof(config)
+    values = config.values() if isinstance(config, Mapping) else config
+    for value in values:
+        if isinstance(value, (Mapping, list, tuple)):
+            size += footprint(value)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n_sections', type=int, default=10)
+    parser.add_argument('--n_keys', type=int, default=100)
+    parser.add_argument('--number', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    bunch = Bunch(make_config(args.n_sections, args.n_keys))
+    frozen = freeze(bunch)
+
+    print(f'Config with {4*args.n_sections*args.n_keys} leaves, reading config.section_0.group_1.float_1')
+    for name, config in [('Bunch', bunch), ('frozen', frozen)]:
+        timing = timeit.timeit('config.section_0.group_1.float_1', globals={'config': config}, number=args.number)
+        print(f'{name:>6}: {args.number/timing/1e6:.1f}M reads/s, '
+              f'footprint {footprint(config)/2**10:.1f}KB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Measure the time taken to import configmypy, using python -X importtime
+
+Usage::
+
+    python benchmarks/bench_import_time.py --statement "from configmypy import Bunch" --max_ms 20
+
+Exits with an error if the import takes more than max_ms (median over several runs),
+so it can be used to catch import-time regressions.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+def import_times(statement):
+    """Runs statement in a new interpreter
+
+    Returns
+    -------
+    times : dict
+        {module: cumulative import time in us} for all the imported modules
+    top_level : list
+        modules imported directly (not by another module)
+    """
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                         capture_output=True, text=True, check=True)
+    times = dict()
+    top_level = []
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        times[module.strip()] = int(cumulative)
+        # Nesting is indicated by indentation
+        if len(module) - len(module.lstrip()) == 1:
+            top_level.append(module.strip())
+    return times, top_level
+
+
+def statement_import_time(statement, baseline):
+    """Time (in ms) spent importing the modules needed by statement, excluding the interpreter's startup"""
+    times, top_level = import_times(statement)
+    return sum(times[module] for module in top_level if module not in baseline) / 1000, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--statement', type=str, default='import configmypy')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--top', type=int, default=10, help='number of slowest modules to show')
+    parser.add_argument('--max_ms', type=float, default=None)
+    args = parser.parse_args()
+
+    baseline, _ = import_times('pass')
+    runs = [statement_import_time(args.statement, baseline) for _ in range(args.repeat)]
+    total = statistics.median(total for total, _ in runs)
+    print(f'{args.statement}: {total:.1f}ms (median of {args.repeat} runs)')
+    times = {module: time for module, time in runs[-1][1].items() if module not in baseline}
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    for module, time in slowest:
+        print(f'{time/1000:8.1f}ms  {module}')
+
+    if args.max_ms is not None and total > args.max_ms:
+        sys.exit(f'Import time regression: {total:.1f}ms > {args.max_ms}ms')
+
+
+if __name__ == '__main__':
+    main()
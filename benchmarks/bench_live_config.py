@@ -0,0 +1,106 @@
+"""Read throughput and latency of a config shared by many reader threads, while a writer updates it
+
+Compares a LiveConfig (lock-free reads of immutable versions) with a Bunch protected by a lock:
+
+    python benchmarks/bench_live_config.py --n_readers 1 4 16 --publish_interval 0.001
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from configmypy import Bunch
+from configmypy.live_config import LiveConfig
+
+from generators import make_config
+
+# Reads timed together, to measure their latency without timing each read
+BATCH = 100
+
+
+def run_readers(read, n_readers, n_reads):
+    """Runs n_readers threads doing n_reads each, returns (reads/s, batch latencies)"""
+    latencies = []
+    barrier = threading.Barrier(n_readers + 1)
+
+    def reader():
+        thread_latencies = []
+        barrier.wait()
+        for _ in range(n_reads // BATCH):
+            start = time.perf_counter()
+            for _ in range(BATCH):
+                read()
+            thread_latencies.append(time.perf_counter() - start)
+        latencies.extend(thread_latencies)
+
+    threads = [threading.Thread(target=reader) for _ in range(n_readers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return n_readers*n_reads/(time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n_sections', type=int, default=10)
+    parser.add_argument('--n_keys', type=int, default=100)
+    parser.add_argument('--n_readers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--n_reads', type=int, default=100_000, help='reads per reader thread')
+    parser.add_argument('--publish_interval', type=float, default=0.001, help='time between updates, in seconds')
+    args = parser.parse_args()
+
+    configs = [make_config(args.n_sections, args.n_keys) for _ in range(2)]
+    configs[1]['section_0']['group_1']['float_1'] = -1.0
+
+    live = LiveConfig(configs[0])
+    bunch = Bunch(configs[0])
+    lock = threading.Lock()
+
+    def read_live():
+        return live.config.section_0.group_1.float_1
+
+    def read_locked():
+        with lock:
+            return bunch.section_0.group_1.float_1
+
+    def publish_live(config):
+        live.publish(config)
+
+    def publish_locked(config):
+        # The new config is built before taking the lock, like for the LiveConfig
+        new = Bunch(config)
+        with lock:
+            bunch.update(new)
+
+    print(f'Config with {4*args.n_sections*args.n_keys} leaves, '
+          f'updated every {args.publish_interval*1000:g}ms')
+    print(f'{"":>8} {"readers":>8} {"Mreads/s":>10} {"p50 (us)":>10} {"p99 (us)":>10} {"max (us)":>10} {"updates":>8}')
+    for n_readers in args.n_readers:
+        for name, read, publish in [('live', read_live, publish_live), ('locked', read_locked, publish_locked)]:
+            stop = threading.Event()
+            n_updates = 0
+
+            def writer():
+                nonlocal n_updates
+                while not stop.wait(args.publish_interval):
+                    publish(configs[n_updates % 2])
+                    n_updates += 1
+
+            writer_thread = threading.Thread(target=writer)
+            writer_thread.start()
+            throughput, latencies = run_readers(read, n_readers, args.n_reads)
+            stop.set()
+            writer_thread.join()
+
+            # Latency of a read, from the time of its batch
+            latencies = sorted(latency/BATCH*1e6 for latency in latencies)
+            p99 = latencies[min(len(latencies) - 1, int(0.99*len(latencies)))]
+            print(f'{name:>8} {n_readers:>8} {throughput/1e6:>10.2f} {statistics.median(latencies):>10.3f} '
+                  f'{p99:>10.3f} {latencies[-1]:>10.3f} {n_updates:>8}')
+
+
+if __name__ == '__main__':
+    main()
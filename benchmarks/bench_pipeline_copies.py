@@ -0,0 +1,58 @@
+"""Memory and time of a 3-step ConfigPipeline, with and without in-place updates
+
+The pipeline reads a default config, overrides a few values from the command-line,
+then updates the config from a second file::
+
+    python benchmarks/bench_pipeline_copies.py --n_sections 20 --n_keys 200
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from configmypy import ArgparseConfig, ConfigPipeline, YamlConfig
+
+from generators import make_config
+
+
+def run_pipeline(folder, inplace):
+    """Returns the time taken, and the total and peak memory allocated by the pipeline"""
+    pipe = ConfigPipeline([YamlConfig('default.json', config_folder=folder, engine='json'),
+                           ArgparseConfig(infer_types='fuzzy', config_file=None),
+                           YamlConfig(config_folder=folder, engine='json')],
+                          inplace=inplace)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    pipe.read_conf()
+    timing = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timing, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n_sections', type=int, default=10)
+    parser.add_argument('--n_keys', type=int, default=100)
+    args = parser.parse_args()
+
+    config = make_config(args.n_sections, args.n_keys)
+    override = make_config(1, args.n_keys)
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        folder.joinpath('default.json').write_text(json.dumps(config))
+        folder.joinpath('override.json').write_text(json.dumps(override))
+        sys.argv = [sys.argv[0], '--section_0.group_0.int_0', '3', '--config_file', 'override.json']
+
+        print(f'3-step pipeline on a config with {4*args.n_sections*args.n_keys} leaves')
+        for inplace in [False, True]:
+            timing, peak = run_pipeline(folder, inplace)
+            print(f'inplace={inplace!s:>5}: {timing*1000:.1f}ms, peak memory {peak/2**20:.2f}MB')
+
+
+if __name__ == '__main__':
+    main()
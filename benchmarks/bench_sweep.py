@@ -0,0 +1,57 @@
+"""Time and peak memory of building sweep variants, by deepcopy or with expand_sweep
+
+    python benchmarks/bench_sweep.py --n_sections 10 --n_keys 100 --n_variants 1000
+"""
+import argparse
+import time
+import tracemalloc
+from copy import deepcopy
+
+from configmypy import Bunch
+from configmypy.sweep import expand_sweep, sweep_params
+from configmypy.utils import set_dotted
+
+from generators import make_config
+
+
+def deepcopy_sweep(base, spec):
+    for values in sweep_params(spec):
+        config = deepcopy(base)
+        for key, value in values.items():
+            set_dotted(config, key, value)
+        yield config
+
+
+def run(variants):
+    """Iterates over the variants (keeping only the last), returns the time taken and peak memory"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    for config in variants:
+        pass
+    timing = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timing, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n_sections', type=int, default=10)
+    parser.add_argument('--n_keys', type=int, default=100)
+    parser.add_argument('--n_variants', type=int, default=1000)
+    args = parser.parse_args()
+
+    base = Bunch(make_config(args.n_sections, args.n_keys))
+    n = int(args.n_variants ** 0.5)
+    spec = {'section_0.group_0.int_0': list(range(n)),
+            f'section_{args.n_sections - 1}.group_1.float_1': [i / 10 for i in range(args.n_variants // n)]}
+
+    print(f'{n * (args.n_variants // n)} variants of a config with {4*args.n_sections*args.n_keys} leaves')
+    for name, variants in [('deepcopy', deepcopy_sweep(base, spec)), ('expand_sweep', expand_sweep(base, spec))]:
+        timing, peak = run(variants)
+        print(f'{name:>12}: {timing*1000:.1f}ms, peak memory {peak/2**20:.2f}MB')
+
+
+if __name__ == '__main__':
+    main()
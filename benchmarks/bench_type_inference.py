@@ -0,0 +1,40 @@
+"""Micro-benchmark of the type inference used to read values from the command-line
+
+Usage::
+
+    python benchmarks/bench_type_inference.py --number 100000
+"""
+import argparse
+import timeit
+
+from configmypy.type_inference import TypeInferencer, get_type_inferencer
+from configmypy.type_inference import infer_boolean, infer_iterable, infer_numeric, infer_str
+
+
+CASES = [
+    ('infer_str', infer_str, 'adam'),
+    ('infer_boolean', infer_boolean, 'False'),
+    ('infer_numeric (int)', infer_numeric, '1024'),
+    ('infer_numeric (float)', infer_numeric, '-1.5e-3'),
+    ('infer_numeric (None)', infer_numeric, 'None'),
+    ('infer_iterable', infer_iterable, str(list(range(100)))),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    for name, function, var in CASES:
+        number = args.number // 100 if function is infer_iterable else args.number
+        timing = min(timeit.repeat(lambda: function(var, False), number=number, repeat=3))
+        print(f'{name:>24}: {timing/number*1e6:.2f}us per call')
+
+    for name, function in [('TypeInferencer', TypeInferencer), ('get_type_inferencer', get_type_inferencer)]:
+        timing = min(timeit.repeat(lambda: function(float, strict=False), number=args.number, repeat=3))
+        print(f'{name:>24}: {timing/args.number*1e6:.2f}us per construction')
+
+
+if __name__ == '__main__':
+    main()
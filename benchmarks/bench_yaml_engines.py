@@ -0,0 +1,43 @@
+"""Compare the speed of the YamlConfig engines on a large synthetic config
+
+Usage::
+
+    python benchmarks/bench_yaml_engines.py --n_sections 50 --n_keys 200
+"""
+import argparse
+import json
+import tempfile
+import timeit
+from pathlib import Path
+
+from ruamel.yaml import YAML
+
+from configmypy import YamlConfig
+
+from generators import make_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n_sections', type=int, default=20)
+    parser.add_argument('--n_keys', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    config = make_config(args.n_sections, args.n_keys)
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        with folder.joinpath('config.yaml').open('w') as f:
+            YAML().dump(config, f)
+        folder.joinpath('config.json').write_text(json.dumps(config))
+        size = folder.joinpath('config.yaml').stat().st_size
+        print(f'Config with {args.n_sections} sections, {4*args.n_sections*args.n_keys} leaves ({size/1e6:.2f}MB)')
+
+        for config_file, engine in [('config.yaml', 'rt'), ('config.yaml', 'safe'), ('config.json', 'json')]:
+            reader = YamlConfig(config_file, config_folder=folder, engine=engine)
+            timing = min(timeit.repeat(reader.read_conf, number=1, repeat=args.repeat))
+            print(f'{engine:>6}: {timing*1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
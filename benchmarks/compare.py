@@ -0,0 +1,56 @@
+"""Compare two result files of benchmarks/suite.py, e.g. before and after a change
+
+Usage::
+
+    python benchmarks/compare.py before.json after.json --threshold 0.1
+
+Exits with an error if a benchmark got slower, or used more memory, by more than threshold (relative).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def compare(before, after, threshold):
+    """Returns the lines of the comparison table and the names of the regressed benchmarks"""
+    lines = [f'{"benchmark":>30} {"time before":>12} {"time after":>12} {"ratio":>7} '
+             f'{"mem before":>11} {"mem after":>11} {"ratio":>7}']
+    regressions = []
+    for name, old in before['results'].items():
+        new = after['results'].get(name)
+        if new is None:
+            continue
+        time_ratio = new['time_min'] / old['time_min'] if old['time_min'] else float('inf')
+        memory_ratio = new['peak_memory'] / old['peak_memory'] if old['peak_memory'] else 1.0
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        lines.append(f'{name:>30} {old["time_min"]*1000:10.2f}ms {new["time_min"]*1000:10.2f}ms {time_ratio:7.2f} '
+                     f'{old["peak_memory"]/2**20:9.2f}MB {new["peak_memory"]/2**20:9.2f}MB {memory_ratio:7.2f}'
+                     + ('  <-- regression' if regressed else ''))
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative increase in time or memory considered a regression')
+    args = parser.parse_args()
+
+    before = json.loads(Path(args.before).read_text())
+    after = json.loads(Path(args.after).read_text())
+    if before['metadata']['parameters'] != after['metadata']['parameters']:
+        print('Warning: the benchmarks were run with different parameters.', file=sys.stderr)
+    print(f'before: {before["metadata"]["commit"]}, after: {after["metadata"]["commit"]}')
+
+    lines, regressions = compare(before, after, args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        sys.exit(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Synthetic configs for the benchmarks"""
+import math
+
+
+def make_config(n_sections, n_keys):
+    """Synthetic config with n_sections top-level sections of n_keys leaves each"""
+    config = {}
+    for i in range(n_sections):
+        section = {}
+        for j in range(n_keys):
+            section[f'group_{j % 10}'] = section.get(f'group_{j % 10}', {})
+            section[f'group_{j % 10}'].update({f'int_{j}': j, f'float_{j}': j / 7,
+                                               f'str_{j}': f'value_{j}', f'list_{j}': [j, j + 1, j + 2]})
+        config[f'section_{i}'] = section
+    return config
+
+
+def _leaf(i, list_size):
+    """Key and value of the i-th leaf, cycling through the usual types"""
+    kind = ('int', 'float', 'str', 'bool', 'list')[i % 5]
+    if kind == 'int':
+        value = i
+    elif kind == 'float':
+        value = i / 7
+    elif kind == 'str':
+        value = f'value_{i}'
+    elif kind == 'bool':
+        value = i % 2 == 0
+    else:
+        value = list(range(i, i + list_size))
+    return f'{kind}_{i}', value
+
+
+def make_nested_config(n_keys, depth=2, list_size=3, leaves_per_node=10):
+    """Synthetic config with n_keys leaves, nested depth levels deep
+
+    Parameters
+    ----------
+    n_keys : int
+        number of leaves
+    depth : int, default is 2
+        number of levels of nested dicts above the leaves
+    list_size : int, default is 3
+        length of the lists (one leaf out of 5 is a list)
+    leaves_per_node : int, default is 10
+        number of leaves of each of the deepest dicts
+    """
+    if depth == 0:
+        leaves_per_node = n_keys
+    n_nodes = max(1, math.ceil(n_keys / leaves_per_node))
+    branching = max(1, math.ceil(n_nodes ** (1 / depth))) if depth else 1
+    n_leaves = 0
+
+    def build(level):
+        nonlocal n_leaves
+        node = {}
+        if level == depth:
+            while len(node) < leaves_per_node and n_leaves < n_keys:
+                key, value = _leaf(n_leaves, list_size)
+                node[key] = value
+                n_leaves += 1
+            return node
+        for j in range(branching):
+            child = build(level + 1)
+            if child:
+                node[f'level{level}_{j}'] = child
+        return node
+
+    return build(0)
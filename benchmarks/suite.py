@@ -0,0 +1,227 @@
+"""Time and peak memory of the main operations of configmypy, as json to compare across commits
+
+Usage::
+
+    python benchmarks/suite.py --n_keys 2000 --depth 3 --list_size 10 --output before.json
+    # ... change the code ...
+    python benchmarks/suite.py --n_keys 2000 --depth 3 --list_size 10 --output after.json
+    python benchmarks/compare.py before.json after.json
+
+Each benchmark is run --repeat times, on fresh inputs: the minimum and median times are reported,
+and the peak memory allocated (traced with tracemalloc) during a separate run.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from configmypy import ArgparseConfig, Bunch, ConfigPipeline, YamlConfig
+from configmypy.utils import flat_index, iter_nested_dict_flat, update_nested_dict_from_flat
+
+from generators import make_nested_config
+
+# Benchmarks, by name. Each takes the context and returns (setup, run):
+# setup() creates fresh inputs and run(inputs) is the code measured
+BENCHMARKS = dict()
+
+
+def benchmark(name):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def _read_conf(step):
+    return lambda _: step.read_conf()
+
+
+@benchmark('yaml_read_conf_rt')
+def yaml_read_conf_rt(context):
+    return lambda: None, _read_conf(YamlConfig('config.yaml', config_folder=context['folder'], engine='rt'))
+
+
+@benchmark('yaml_read_conf_safe')
+def yaml_read_conf_safe(context):
+    return lambda: None, _read_conf(YamlConfig('config.yaml', config_folder=context['folder'], engine='safe'))
+
+
+@benchmark('bunch_init')
+def bunch_init(context):
+    return lambda: None, lambda _: Bunch(context['config'])
+
+
+@benchmark('bunch_update')
+def bunch_update(context):
+    return lambda: Bunch(context['config']), lambda bunch: bunch.update(context['override'])
+
+
+@benchmark('iter_nested_dict_flat_dict')
+def iter_nested_dict_flat_dict(context):
+    return lambda: None, lambda _: list(iter_nested_dict_flat(context['config']))
+
+
+@benchmark('iter_nested_dict_flat_bunch')
+def iter_nested_dict_flat_bunch(context):
+    """On a new Bunch, so including building its flat index"""
+    return lambda: Bunch(context['config']), lambda bunch: list(iter_nested_dict_flat(bunch))
+
+
+@benchmark('update_nested_dict_from_flat')
+def update_nested_dict_from_flat_(context):
+    def run(bunch):
+        for key, value in context['flat_overrides']:
+            update_nested_dict_from_flat(bunch, key, value)
+    return lambda: Bunch(context['config']), run
+
+
+@benchmark('argparse_read_conf')
+def argparse_read_conf(context):
+    def run(bunch):
+        sys.argv = context['argv']
+        ArgparseConfig(infer_types='fuzzy', inplace=True).read_conf(bunch)
+    return lambda: Bunch(context['config']), run
+
+
+@benchmark('argparse_read_conf_lazy')
+def argparse_read_conf_lazy(context):
+    def run(bunch):
+        sys.argv = context['argv']
+        ArgparseConfig(infer_types='fuzzy', inplace=True, lazy=True).read_conf(bunch)
+    return lambda: Bunch(context['config']), run
+
+
+@benchmark('pipeline_read_conf')
+def pipeline_read_conf(context):
+    def setup():
+        return ConfigPipeline([YamlConfig('config.yaml', config_folder=context['folder'], engine=context['engine']),
+                               ArgparseConfig(infer_types='fuzzy', config_file=None),
+                               YamlConfig(config_folder=context['folder'], engine=context['engine'])])
+
+    def run(pipe):
+        sys.argv = context['argv'] + ['--config_file', 'override.yaml']
+        pipe.read_conf()
+    return setup, run
+
+
+def _spec(config):
+    """Schema of the types of config"""
+    return {key: _spec(value) if isinstance(value, dict) else type(value) for key, value in config.items()}
+
+
+@benchmark('schema_validate')
+def schema_validate(context):
+    """Compiled once, on a Bunch whose flat index is cached"""
+    from configmypy.schema import compile_schema
+    schema = compile_schema(_spec(context['config']))
+
+    def setup():
+        bunch = Bunch(context['config'])
+        flat_index(bunch)
+        return bunch
+    return setup, schema.validate
+
+
+def measure(setup, run, repeat):
+    """Returns the min and median time of run(setup()), and its peak memory allocated, in bytes"""
+    # Warm-up, e.g. for the lazy imports and caches
+    run(setup())
+    times = []
+    for _ in range(repeat):
+        inputs = setup()
+        start = time.perf_counter()
+        run(inputs)
+        times.append(time.perf_counter() - start)
+
+    inputs = setup()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    run(inputs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'time_min': min(times), 'time_median': statistics.median(times), 'peak_memory': peak}
+
+
+def git_commit():
+    try:
+        res = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                             cwd=Path(__file__).parent)
+        return res.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n_keys', type=int, default=1000, help='number of leaves of the config')
+    parser.add_argument('--depth', type=int, default=2, help='levels of nesting above the leaves')
+    parser.add_argument('--list_size', type=int, default=3, help='length of the lists in the config')
+    parser.add_argument('--n_overrides', type=int, default=10, help='number of values set from the command-line')
+    parser.add_argument('--engine', default='rt', help='engine of the YamlConfig in the pipeline')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS), help='only run these benchmarks')
+    parser.add_argument('--output', help='write the results to this json file (printed by default)')
+    args = parser.parse_args()
+
+    from ruamel.yaml import YAML
+
+    config = make_nested_config(args.n_keys, depth=args.depth, list_size=args.list_size)
+    flat_config = [(key, value) for key, value in iter_nested_dict_flat(config) if not isinstance(value, list)]
+    step = max(1, len(flat_config) // args.n_overrides)
+    flat_overrides = [(key, value) for key, value in flat_config[::step][:args.n_overrides]]
+    override = dict()
+    for key, value in flat_overrides:
+        *parents, last = key.split('.')
+        node = override
+        for parent in parents:
+            node = node.setdefault(parent, dict())
+        node[last] = value
+
+    results = dict()
+    with tempfile.TemporaryDirectory() as folder:
+        with Path(folder).joinpath('config.yaml').open('w') as f:
+            YAML().dump(config, f)
+        with Path(folder).joinpath('override.yaml').open('w') as f:
+            YAML().dump(override, f)
+
+        context = {
+            'folder': folder,
+            'config': config,
+            'override': Bunch(override),
+            'flat_overrides': flat_overrides,
+            'argv': [sys.argv[0]] + [arg for key, value in flat_overrides for arg in (f'--{key}', str(value))],
+            'engine': args.engine,
+        }
+        argv = sys.argv
+        try:
+            for name in args.only or BENCHMARKS:
+                setup, run = BENCHMARKS[name](context)
+                results[name] = measure(setup, run, args.repeat)
+                print(f'{name:>30}: {results[name]["time_min"]*1000:9.2f}ms, '
+                      f'peak memory {results[name]["peak_memory"]/2**20:7.2f}MB', file=sys.stderr)
+        finally:
+            sys.argv = argv
+
+    output = {
+        'metadata': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {key: value for key, value in vars(args).items() if key != 'output'},
+        },
+        'results': results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(output, indent=2))
+    else:
+        print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
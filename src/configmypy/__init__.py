@@ -2,6 +2,25 @@ __version__ = '0.2.0'
 
 from .bunch import Bunch
 
-from .argparse_config import ArgparseConfig
-from .yaml_config import YamlConfig
-from .pipeline_config import ConfigPipeline
+# The other classes are imported lazily, on first access,
+# so that importing configmypy (e.g. just for Bunch) does not import ruamel or argparse
+_lazy_imports = {
+    'ArgparseConfig': 'argparse_config',
+    'YamlConfig': 'yaml_config',
+    'ConfigPipeline': 'pipeline_config',
+}
+
+__all__ = ['Bunch'] + list(_lazy_imports)
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        from importlib import import_module
+        value = getattr(import_module(f'.{_lazy_imports[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_imports))
@@ -0,0 +1,325 @@
+# Index the configs of a directory tree (e.g. past experiments) by dotted key, to query them without parsing them
+
+import logging
+import operator
+import os
+import pickle
+import re
+import sys
+import threading
+from ast import literal_eval
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .bunch import Bunch
+from .loaders import ENGINES, resolve_engine
+from .utils import file_fingerprint, iter_nested_dict_flat, set_dotted
+
+logger = logging.getLogger(__name__)
+
+# Changed when the format of the persisted index changes
+INDEX_VERSION = 1
+
+ArchiveChanges = namedtuple('ArchiveChanges', ['added', 'updated', 'removed'])
+ArchiveChanges.__doc__ = """Files (relative to the folder of the archive) indexed again by `ConfigArchive.refresh`"""
+
+_OPERATORS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne,
+              '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+_CONDITION_PATTERN = re.compile(r'\s*(.+?)\s*(==|!=|>=|<=|=|>|<)\s*(.*?)\s*')
+
+
+def _parse_value(text):
+    """Value of a condition, e.g. 16, 0.1, True, None or [1, 2], and strings otherwise (quoted or not)"""
+    try:
+        return literal_eval(text)
+    except (ValueError, SyntaxError):
+        pass
+    return {'true': True, 'false': False, 'none': None, 'null': None}.get(text.lower(), text)
+
+
+def parse_condition(condition):
+    """Parses a condition such as 'data.batch_size>16' into (key, predicate)"""
+    match = _CONDITION_PATTERN.fullmatch(condition)
+    if match is None:
+        raise ValueError(f'Invalid condition {condition!r}, expected e.g. "opt.optimizer=SGD" or "data.batch_size>16".')
+    key, op, value = match.groups()
+    compare, value = _OPERATORS[op], _parse_value(value)
+
+    def predicate(other):
+        try:
+            return compare(other, value)
+        except TypeError:
+            # e.g. comparing a str with an int
+            return False
+    return key, predicate
+
+
+def _to_plain(value):
+    """Converts ruamel's types (CommentedSeq, ScalarFloat, etc) to the builtin ones, see `_IndexUnpickler`"""
+    if isinstance(value, dict):
+        return {key: _to_plain(nested_value) for key, nested_value in value.items()}
+    if isinstance(value, list):
+        return [_to_plain(nested_value) for nested_value in value]
+    if isinstance(value, tuple):
+        return tuple(_to_plain(nested_value) for nested_value in value)
+    scalarbool = sys.modules.get('ruamel.yaml.scalarbool')
+    if isinstance(value, bool) or (scalarbool is not None and isinstance(value, scalarbool.ScalarBoolean)):
+        return bool(value)
+    for builtin_type in (int, float, str):
+        if isinstance(value, builtin_type):
+            return builtin_type(value)
+    return value
+
+
+# Classes that can be loaded from an index, besides the builtin containers and scalars (e.g. dates from TOML)
+_INDEX_GLOBALS = {('datetime', name) for name in ('date', 'datetime', 'time', 'timedelta', 'timezone')}
+
+
+class _IndexUnpickler(pickle.Unpickler):
+    """Only loads plain data: the index is stored with the configs, possibly in a folder shared with other users"""
+    def find_class(self, module, name):
+        if (module, name) in _INDEX_GLOBALS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f'{module}.{name} cannot be loaded from an archive index.')
+
+
+def _index_file(filepath, engine, config_name):
+    """Parses a config file into a list of (flat_key, value), run in the worker processes
+
+    Returns
+    -------
+    (list, None) or (None, str)
+        the flattened config, or None and the error
+    """
+    try:
+        with open(filepath, 'r') as f:
+            config = ENGINES[resolve_engine(engine, filepath)](f.read())
+        if config_name is not None:
+            config = config[config_name]
+        if not isinstance(config, dict):
+            return None, f'expected a mapping, got {type(config).__name__}'
+    except Exception as error:
+        return None, f'{type(error).__name__}: {error}'
+    # Same values as in a Bunch
+    return [(key, None if isinstance(value, str) and (value == 'None' or value == 'none') else _to_plain(value))
+            for key, value in iter_nested_dict_flat(config)], None
+
+
+def _index_file_args(args):
+    return _index_file(*args)
+
+
+class ConfigArchive:
+    """Columnar index of the config files of a directory tree, by dotted key, to query them without parsing them
+
+    The files are parsed in parallel, in a pool of processes, and flattened into one column per dotted key,
+    {dotted_key: {file: value}}. The index is saved next to the files:
+    `refresh` only parses again the files added or modified (from their mtime and size) since the last time.
+    The archive can be queried from other threads during a refresh: the queries wait for it to finish.
+
+    Parameters
+    ----------
+    folder : str
+        root of the directory tree
+    pattern : str, default is '**/*.yaml'
+        glob pattern of the config files, relative to folder
+    config_name : str, optional
+        if given, only the section config_name of each file is indexed
+    engine : {'safe', 'rt', 'json', 'toml', 'auto'}, default is 'safe'
+        parser of the files, see `YamlConfig`
+    index_file : str or False, optional
+        where the index is saved, by default `.configmypy_archive.pickle` in folder.
+        If False, the index is not saved.
+        Only plain values (e.g. numbers, strings, lists and dates) are loaded from it, never arbitrary objects.
+    max_workers : int, optional
+        number of processes parsing the files, by default the number of CPUs.
+        If 1, the files are parsed in the current process.
+
+    Examples
+    --------
+    >>> archive = ConfigArchive('experiments/')
+    >>> archive.refresh()
+    >>> archive.query('opt.optimizer=SGD', 'data.batch_size>16')
+    ['run_12/config.yaml', 'run_31/config.yaml']
+    """
+    def __init__(self, folder, pattern='**/*.yaml', config_name=None, engine='safe', index_file=None,
+                 max_workers=None):
+        self.folder = Path(folder)
+        self.pattern = pattern
+        self.config_name = config_name
+        if engine != 'auto':
+            resolve_engine(engine)
+        self.engine = engine
+        if index_file is None:
+            index_file = self.folder.joinpath('.configmypy_archive.pickle')
+        self.index_file = index_file
+        self.max_workers = max_workers
+        # {file: (fingerprint of the file, flat keys)}
+        self.files = dict()
+        # {flat_key: {file: value}}
+        self.columns = dict()
+        # {file: (fingerprint of the file, error)} for the files that could not be parsed
+        self.errors = dict()
+        # Held while reading or updating the index
+        self._lock = threading.RLock()
+        self._load_index()
+
+    def _options(self):
+        return (INDEX_VERSION, self.pattern, self.config_name, self.engine)
+
+    def _load_index(self):
+        if not self.index_file:
+            return
+        try:
+            with open(self.index_file, 'rb') as f:
+                options, files, columns, errors = _IndexUnpickler(f).load()
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.warning(f'Could not read the archive index {self.index_file}, indexing the files again.',
+                           exc_info=True)
+            return
+        # Indexed differently: index the files again
+        if options == self._options():
+            self.files, self.columns, self.errors = files, columns, errors
+
+    def _save_index(self):
+        if not self.index_file:
+            return
+        filepath = Path(self.index_file)
+        tmp_path = filepath.with_name(f'{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with tmp_path.open('wb') as f:
+                pickle.dump((self._options(), self.files, self.columns, self.errors), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def refresh(self):
+        """Indexes the files added or modified since the last refresh, and removes the deleted ones
+
+        Returns
+        -------
+        ArchiveChanges
+            the files added, updated and removed
+        """
+        with self._lock:
+            fingerprints = dict()
+            for filepath in self.folder.glob(self.pattern):
+                if filepath.is_file():
+                    fingerprints[filepath.relative_to(self.folder).as_posix()] = file_fingerprint(filepath)
+
+            removed = [file for file in self.files if file not in fingerprints]
+            added, updated = [], []
+            for file, fingerprint in fingerprints.items():
+                if file in self.files:
+                    if self.files[file][0] != fingerprint:
+                        updated.append(file)
+                # Files that could not be parsed are only parsed again if they changed
+                elif file not in self.errors or self.errors[file][0] != fingerprint:
+                    added.append(file)
+
+            for file in removed + updated:
+                self._remove(file)
+            deleted_errors = [file for file in self.errors if file not in fingerprints]
+            for file in deleted_errors:
+                del self.errors[file]
+            to_index = sorted(added + updated)
+            for file, (items, error) in zip(to_index, self._index_files(to_index)):
+                if error is not None:
+                    logger.warning(f'Could not index {file}: {error}')
+                    self.errors[file] = (fingerprints[file], error)
+                    continue
+                self.errors.pop(file, None)
+                self._add(file, fingerprints[file], items)
+
+            changes = ArchiveChanges(sorted(added), sorted(updated), sorted(removed))
+            if to_index or removed or deleted_errors:
+                self._save_index()
+        return changes
+
+    def _index_files(self, files):
+        """Parses and flattens files, in a pool of processes if there are several"""
+        args = [(self.folder.joinpath(file).as_posix(), self.engine, self.config_name) for file in files]
+        max_workers = self.max_workers or os.cpu_count() or 1
+        if max_workers == 1 or len(files) < 2:
+            return [_index_file(*arguments) for arguments in args]
+        max_workers = min(max_workers, len(files))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_index_file_args, args, chunksize=max(1, len(files) // (4*max_workers))))
+
+    def _add(self, file, fingerprint, items):
+        columns = self.columns
+        for key, value in items:
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = dict()
+            column[file] = value
+        self.files[file] = (fingerprint, tuple(key for key, _ in items))
+
+    def _remove(self, file):
+        entry = self.files.pop(file, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            column = self.columns[key]
+            del column[file]
+            if not column:
+                del self.columns[key]
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, file):
+        return file in self.files
+
+    def keys(self):
+        """The dotted keys of all the configs"""
+        with self._lock:
+            return list(self.columns)
+
+    def column(self, key):
+        """The values of a dotted key, as {file: value}, for the configs that have it"""
+        with self._lock:
+            return dict(self.columns.get(key, ()))
+
+    def config(self, file):
+        """The config of a file, rebuilt from the index as a Bunch"""
+        config = Bunch()
+        with self._lock:
+            for key in self.files[file][1]:
+                set_dotted(config, key, self.columns[key][file])
+        return config
+
+    def query(self, *conditions):
+        """Returns the files whose config matches all the conditions
+
+        Parameters
+        ----------
+        conditions : str or (str, callable)
+            either a string such as 'opt.optimizer=SGD' or 'data.batch_size>16'
+            (with one of the operators =, ==, !=, >, >=, <, <=),
+            or (dotted_key, predicate), with predicate(value) returning whether the value matches.
+            Configs without the key never match.
+
+        Returns
+        -------
+        list of str
+            the matching files, relative to the folder, sorted
+        """
+        parsed = [parse_condition(condition) if isinstance(condition, str) else condition
+                  for condition in conditions]
+        with self._lock:
+            if not parsed:
+                return sorted(self.files)
+            # Start from the smallest column, then only check the remaining files
+            parsed.sort(key=lambda condition: len(self.columns.get(condition[0], ())))
+            key, predicate = parsed[0]
+            matches = [file for file, value in self.columns.get(key, dict()).items() if predicate(value)]
+            for key, predicate in parsed[1:]:
+                column = self.columns.get(key, dict())
+                matches = [file for file in matches if file in column and predicate(column[file])]
+        return sorted(matches)
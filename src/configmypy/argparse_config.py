@@ -1,10 +1,17 @@
 import argparse
+import re
+import sys
 from copy import deepcopy
 from ctypes import ArgumentError
+from .arrays import is_array
 from .bunch import Bunch
-from .utils import iter_nested_dict_flat
+from .utils import flat_index, iter_nested_dict_flat
 from .utils import update_nested_dict_from_flat
-from .type_inference import TypeInferencer
+from .utils import trim_overwritten_nested_keys
+from .type_inference import get_type_inferencer
+
+# Values starting with '-' that argparse reads as values rather than as options, e.g. -1 or -0.5
+_NEGATIVE_NUMBER = re.compile(r'^-\d+$|^-\d*\.\d+$')
 
 class ArgparseConfig:
     """Read config from the command-line using argparse
@@ -29,11 +36,27 @@ class ArgparseConfig:
         then users could set `mlp.in_features` or disable mlp alltogether by
         setting `mlp=None`
 
+    inplace : bool, default is False
+        if True, the config passed to `read_conf` is updated in place, if already a Bunch,
+        instead of being copied first. Use it when the caller hands over the config,
+        e.g. within a ConfigPipeline.
+
+    lazy : bool, default is False
+        if True, the command-line is first scanned for `--key value` and `--key=value` arguments,
+        and only the values of these keys are converted, without building an argparse parser
+        with an argument for every key of the config (slow for large configs).
+        The parser is only built when needed, e.g. for `--help`, unknown or abbreviated keys,
+        or values that cannot be converted: the config read and the errors are the same as with lazy=False.
+        Ignored if overwrite_nested_config is True.
+
     **additional_config : dict
         key, values to read from command-line and pass on to the next config
     """
-    def __init__(self, infer_types="fuzzy", overwrite_nested_config=False, **additional_config):
+    def __init__(self, infer_types="fuzzy", overwrite_nested_config=False, inplace=False, lazy=False,
+                 **additional_config):
         self.additional_config = Bunch(additional_config)
+        self.inplace = inplace
+        self.lazy = lazy
         if infer_types in [False, "fuzzy", "strict"]:
             self.infer_types = infer_types
         elif infer_types:
@@ -68,56 +91,34 @@ class ArgparseConfig:
         Bunch : empty dict
             additional_config to be passed to the next config
         """
-        config = Bunch(config)
+        if not (self.inplace and isinstance(config, Bunch)):
+            config = Bunch(config)
         additional_config = Bunch(additional_config)
         
         additional_config.update(self.additional_config)
         config.update(self.additional_config)
         
-        parser = argparse.ArgumentParser(description='Read the config from the commandline.')
-        for key, value in iter_nested_dict_flat(config, return_intermediate_keys=self.overwrite_nested_config):
-                # smartly infer types if infer_types is turned on 
-                # otherwise force default typecasting
-                if self.infer_types:
-                    if self.infer_types == 'strict':
-                        strict=True
-                    elif  self.infer_types == 'fuzzy':
-                        strict=False
-                    type_inferencer = TypeInferencer(orig_type=type(value), strict=strict)
-                else:
-                    type_inferencer = type(value)
-
-                parser.add_argument(f'--{key}', type=type_inferencer, default=value)
-
-        args = parser.parse_args()
-        self.config = Bunch(args.__dict__)        
+        values = None
+        if self.lazy and not self.overwrite_nested_config:
+            values = self._parse_args_lazy(config)
+        if values is None:
+            values = self._parse_args(config)
+        self.config = Bunch(values)
 
         if config is not None:
-            config = Bunch(config)
             if self.overwrite_nested_config:
-                # Create a copy
-                trimmed_config = Bunch(self.config)
-
                 # Remove subdict if overwritten by users
-                for key, value in self.config.items():
-                    if value is None or not value:
-                        for subkey in self.config.keys():
-                            if subkey.startswith(key) and (key != subkey):
-                                print('removing subdict', subkey)
-                                trimmed_config.pop(subkey)
-                    elif key in trimmed_config:
-                        # Value is True: delete the key if it has leafs
-                        for subkey in self.config.keys():
-                            if subkey.startswith(key) and (key != subkey):
-                                print('removing root', key)
-                                print(subkey.startswith(key), subkey, key)
-                                trimmed_config.pop(key)
-                                break
-                self.config = trimmed_config
+                trim_overwritten_nested_keys(self.config)
 
             # Update the config passed by the user with the new one
+            # Existing leaves are directly set through the flat index of the config
+            index = flat_index(config)
             for key, value in self.config.items():
-                update_nested_dict_from_flat(config, key, value)
+                if key in index:
+                    parent, leaf_key = index[key]
+                    parent[leaf_key] = value
+                else:
+                    update_nested_dict_from_flat(config, key, value)
         else:
             config = self.config
         
@@ -125,6 +126,89 @@ class ArgparseConfig:
 
         return config, kwargs
 
+    def _type(self, value):
+        """Type of the argument for a key with the given (default) value"""
+        # smartly infer types if infer_types is turned on
+        # otherwise force default typecasting
+        if self.infer_types:
+            return get_type_inferencer(type(value), strict=self.infer_types == 'strict')
+        # array.array(str) and numpy.ndarray(str) cannot parse a list
+        if is_array(value):
+            return get_type_inferencer(type(value), strict=True)
+        return type(value)
+
+    def _parse_args(self, config):
+        """Parses the command-line with an argument for each key of the config
+
+        Returns
+        -------
+        dict
+            {flat_key: value} for all the keys
+        """
+        parser = argparse.ArgumentParser(description='Read the config from the commandline.')
+        for key, value in iter_nested_dict_flat(config, return_intermediate_keys=self.overwrite_nested_config):
+            parser.add_argument(f'--{key}', type=self._type(value), default=value)
+        return parser.parse_args().__dict__
+
+    def _parse_args_lazy(self, config):
+        """Same as `_parse_args`, only converting the values of the keys passed on the command-line
+
+        Returns
+        -------
+        dict or None
+            {flat_key: value} for the keys whose value changed,
+            or None if the command-line has to be parsed by argparse
+            (e.g. --help, unknown or abbreviated keys, values that cannot be converted)
+        """
+        index = flat_index(config)
+        values = dict()
+        argv = sys.argv[1:]
+        i = 0
+        while i < len(argv):
+            argument = argv[i]
+            if not argument.startswith('--') or argument == '--':
+                return None
+            key, equal, value = argument[2:].partition('=')
+            if equal:
+                i += 1
+            elif i + 1 < len(argv) and (not argv[i + 1].startswith('-') or _NEGATIVE_NUMBER.match(argv[i + 1])):
+                value = argv[i + 1]
+                i += 2
+            else:
+                return None
+            if key not in index:
+                return None
+            parent, leaf_key = index[key]
+            try:
+                values[key] = self._type(parent[leaf_key])(value)
+            except (TypeError, ValueError, argparse.ArgumentTypeError):
+                return None
+
+        for key, (parent, leaf_key) in index.items():
+            # argparse renames these keys, or cannot add them
+            if '-' in key or '=' in key or key == 'help':
+                return None
+            # argparse converts the string defaults, e.g. ruamel's strings to str
+            if key not in values:
+                value = parent[leaf_key]
+                if isinstance(value, str) and type(value) is not str:
+                    try:
+                        values[key] = self._type(value)(value)
+                    except (TypeError, ValueError, argparse.ArgumentTypeError):
+                        return None
+        return values
+
+    def fingerprint(self, **additional_config):
+        """Identifies the inputs of `read_conf`, to know whether its result can be reused
+
+        Returns
+        -------
+        tuple
+            the command-line arguments and the reading options
+        """
+        return (tuple(sys.argv[1:]), self.infer_types, self.overwrite_nested_config,
+                dict(self.additional_config), additional_config)
+
     def __str__(self):
         return f'{self.__class__.__name__} with additional config={self.additional_config}'
         
@@ -0,0 +1,119 @@
+# Compact storage of long numeric lists, as typed arrays (array.array, or numpy arrays)
+
+import array
+import sys
+
+from .utils import flat_index
+
+ARRAY_BACKENDS = ('array', 'numpy')
+# Shorter lists are kept as lists
+MIN_ARRAY_SIZE = 16
+
+# Typecodes of array.array holding ints and floats
+_INT_TYPECODES = frozenset('bBhHiIlLqQ')
+_FLOAT_TYPECODES = frozenset('fd')
+
+
+def is_array(value):
+    """True for an array.array or numpy array"""
+    if isinstance(value, array.array):
+        return True
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def _is_bool_type(value_type):
+    """bool, or ruamel's ScalarBoolean (which subclasses int), only checked for if ruamel was imported"""
+    scalarbool = sys.modules.get('ruamel.yaml.scalarbool')
+    return issubclass(value_type, bool) or (scalarbool is not None
+                                            and issubclass(value_type, scalarbool.ScalarBoolean))
+
+
+def _typecode(values):
+    """'q' if the values are all ints, 'd' if they are all numbers, None otherwise"""
+    # Only check each distinct type, not each value
+    types = set(map(type, values))
+    if any(_is_bool_type(value_type) for value_type in types):
+        return None
+    if all(issubclass(value_type, int) for value_type in types):
+        return 'q'
+    if all(issubclass(value_type, (int, float)) for value_type in types):
+        return 'd'
+    return None
+
+
+def pack_sequence(values, backend='array'):
+    """Returns values as a typed array if they are all numbers, None otherwise
+
+    Parameters
+    ----------
+    values : list or tuple
+    backend : {'array', 'numpy'}, default is 'array'
+        'array' returns an array.array, of int64 ('q') if the values are all ints, of float64 ('d') otherwise.
+        'numpy' returns a numpy array, of int64 or float64.
+
+    Returns
+    -------
+    array.array, numpy.ndarray or None
+        None if the values are not all numbers, or too large ints
+    """
+    typecode = _typecode(values)
+    if typecode is None:
+        return None
+    try:
+        if backend == 'numpy':
+            import numpy
+            return numpy.array(values, dtype=numpy.int64 if typecode == 'q' else numpy.float64)
+        return array.array(typecode, values)
+    except OverflowError:
+        return None
+
+
+def pack_arrays(config, backend='array', min_size=MIN_ARRAY_SIZE, separator='.'):
+    """Replaces, in place, the numeric lists of config with at least min_size values by typed arrays
+
+    Parameters
+    ----------
+    config : Bunch
+    backend : {'array', 'numpy'}, default is 'array'
+        see `pack_sequence`
+    min_size : int, default is MIN_ARRAY_SIZE
+        shorter lists are kept as lists
+    separator : str, default is '.'
+
+    Returns
+    -------
+    Bunch
+        config
+    """
+    for parent, key in flat_index(config, separator).values():
+        value = parent[key]
+        if isinstance(value, list) and len(value) >= min_size:
+            packed = pack_sequence(value, backend=backend)
+            if packed is not None:
+                parent[key] = packed
+    return config
+
+
+def coerce_array(value, item_type):
+    """Coerces a typed array to an array of item_type (int or float), without unpacking it
+
+    Returns
+    -------
+    array.array, numpy.ndarray or None
+        value itself if it already has the right type, None if it cannot be coerced
+    """
+    if isinstance(value, array.array):
+        is_int = value.typecode in _INT_TYPECODES
+        is_float = value.typecode in _FLOAT_TYPECODES
+    else:
+        kind = value.dtype.kind
+        is_int = kind in 'iu'
+        is_float = kind == 'f'
+    if (item_type is int and is_int) or (item_type is float and is_float):
+        return value
+    if item_type is float and is_int:
+        if isinstance(value, array.array):
+            return array.array('d', value)
+        return value.astype(float)
+    return None
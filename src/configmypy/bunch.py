@@ -1,3 +1,7 @@
+from copy import deepcopy
+from weakref import ref
+
+
 class Bunch(dict):
     """A dict exposing its keys as attributes
     
@@ -13,6 +17,12 @@ class Bunch(dict):
       make sure that a nested dict becomes a nested Bunch.
     * We override the update to make sure that a nested Bunch is 
       updated correctly. This may be a surprising behaviour.
+    * Nested values can be accessed with dotted keys, e.g. `get_dotted(bunch, 'a.b')`,
+      see `configmypy.utils`. The flattened keys are cached (see `configmypy.utils.flat_index`)
+      and only recomputed for the nested Bunch whose keys changed:
+      a change invalidates the caches of the Bunch containing it, up to the root.
+    * Likewise, the content hash of each nested Bunch is cached (see `configmypy.digest.digest`),
+      so unchanged subtrees can be compared in O(1) (see `configmypy.utils.diff_nested_dicts`).
       
     Examples
     --------
@@ -27,19 +37,70 @@ class Bunch(dict):
     >>> test.update(dict(a=dict(b=5)))
     {'a': {'b': 5}, 'd': 5}
     """
-    __slots__ = () 
+    # Cached flat index and digest, see configmypy.utils.flat_index and configmypy.digest.digest,
+    # and the Bunch whose caches depend on this one, invalidated with it
+    __slots__ = ('_flat', '_digest', '_parents', '__weakref__')
 
     def __init__(self, init={}):
         super().__init__()
+        _set_flat(self, None)
+        _set_digest(self, None)
+        _set_parents(self, None)
         for key, value in init.items():
             if isinstance(value, dict):
                 value = Bunch(value)
-            elif value is not None and (value == 'None' or value == 'none'):
+            elif isinstance(value, str) and (value == 'None' or value == 'none'):
                 value = None
-            self[key] = value
+            dict.__setitem__(self, key, value)
+
+    # Only changes to the structure (keys, nested dicts) invalidate the flat index:
+    # changing the value of a leaf does not
+    def __setitem__(self, key, value):
+        if self._flat is not None and (isinstance(value, dict) or isinstance(dict.get(self, key, value), dict)
+                                       or not dict.__contains__(self, key)):
+            _invalidate(self)
+        elif self._digest is not None:
+            _invalidate(self, flat=False)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        _invalidate(self)
+        dict.__delitem__(self, key)
+
+    def pop(self, *args):
+        _invalidate(self)
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        _invalidate(self)
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        _invalidate(self)
+        return dict.setdefault(self, key, default)
+
+    def clear(self):
+        _invalidate(self)
+        dict.clear(self)
+
+    def __ior__(self, other):
+        _invalidate(self)
+        return dict.__ior__(self, other)
 
     __getattr__ = dict.__getitem__
-    __setattr__ = dict.__setitem__
+    __setattr__ = __setitem__
+
+    # Missing attributes raise a KeyError, not an AttributeError:
+    # define explicitly what copy and pickle would otherwise look up on the instance
+    def __deepcopy__(self, memo):
+        result = self.__class__()
+        memo[id(self)] = result
+        for key, value in self.items():
+            dict.__setitem__(result, key, deepcopy(value, memo))
+        return result
+
+    def __reduce__(self):
+        return self.__class__, (), None, None, iter(self.items())
 
     def update(self, mapping):
         for key in mapping:
@@ -48,3 +109,44 @@ class Bunch(dict):
                 self[key].update(value)
             else:
                 self[key] = value
+
+
+_set_flat = Bunch._flat.__set__
+_set_digest = Bunch._digest.__set__
+_set_parents = Bunch._parents.__set__
+
+
+def _cache(bunch, set_cache, value, children):
+    """Caches value in bunch, computed from its nested Bunch children: changing them invalidates it"""
+    key = id(bunch)
+    for child in children:
+        # {id(parent): weak reference to the parent}, without keeping the parents alive
+        parents = child._parents
+        if parents is None:
+            _set_parents(child, {key: ref(bunch)})
+            continue
+        n_parents = len(parents)
+        if n_parents >= 16 and not n_parents & (n_parents - 1) and key not in parents:
+            # Occasionally forget the parents that no longer exist (e.g. discarded copies)
+            for parent_key in [parent_key for parent_key, parent in parents.items() if parent() is None]:
+                del parents[parent_key]
+        parents[key] = ref(bunch)
+    set_cache(bunch, value)
+
+
+def _invalidate(bunch, flat=True):
+    """Invalidates the cached digest (and flat index) of bunch, and of the Bunch containing it"""
+    stack = [bunch]
+    while stack:
+        node = stack.pop()
+        if node._digest is None and (not flat or node._flat is None):
+            # A Bunch is only cached with its children: the parents are already invalid
+            continue
+        _set_digest(node, None)
+        if flat:
+            _set_flat(node, None)
+        if node._parents:
+            for parent in node._parents.values():
+                parent = parent()
+                if parent is not None:
+                    stack.append(parent)
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import pickle
+import stat
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from pathlib import Path
+
+from .utils import file_fingerprint
+
+
+class ParseCache:
+    """Cache of parsed config files, in memory and optionally on disk
+
+    Entries are keyed by the resolved filepath (and any extra key, e.g. the engine used),
+    and are only considered valid if the file's mtime, size and content hash still match.
+    A file whose mtime and size are unchanged is not even read.
+
+    Parameters
+    ----------
+    max_entries : int, default is 32
+        maximum number of parsed files kept in memory (least recently used are evicted)
+    cache_dir : str or None, default is None
+        if not None, parsed files are also pickled in that folder
+        so they can be reused by other processes.
+        Loading a pickle can run arbitrary code: only use a folder that no one else can write to.
+        Entries are only read if the folder and the file are owned by the current user
+        and not writable by the group or others.
+    max_disk_bytes : int, default is 256MB
+        maximum total size of the on-disk cache (least recently used are evicted)
+
+    Notes
+    -----
+    The cached values are shared: use `load`, which returns a deep copy,
+    unless you are sure not to modify the result.
+    """
+    def __init__(self, max_entries=32, cache_dir=None, max_disk_bytes=256*2**20):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filepath, parse, key=None):
+        """Returns the parsed content of filepath, parsing it only if needed
+
+        Parameters
+        ----------
+        filepath : str
+            resolved path to the file
+        parse : callable
+            function taking the content of the file (str) and returning the parsed value
+        key : hashable, optional
+            additional key, e.g. to distinguish between parsers
+
+        Returns
+        -------
+        parsed value, shared with the cache: do not modify it!
+        """
+        cache_key = (filepath, key)
+        fingerprint = file_fingerprint(filepath)
+
+        entry = self._get_memory(cache_key)
+        if entry is None:
+            entry = self._get_disk(cache_key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[2]
+
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        if entry is not None and entry[1] == digest:
+            # File touched but unchanged
+            value = entry[2]
+        else:
+            value = parse(content.decode('utf-8'))
+        entry = (fingerprint, digest, value)
+        self._set_memory(cache_key, entry)
+        self._set_disk(cache_key, entry)
+        return value
+
+    def load(self, filepath, parse, key=None):
+        """Same as `get` but returns a copy of the parsed value, safe to modify"""
+        return deepcopy(self.get(filepath, parse, key=key))
+
+    def clear(self):
+        """Empties the in-memory cache (the on-disk one is left untouched)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _get_memory(self, cache_key):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+            return entry
+
+    def _set_memory(self, cache_key, entry):
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, cache_key):
+        name = hashlib.sha256(repr(cache_key).encode('utf-8')).hexdigest()
+        return Path(self.cache_dir).joinpath(f'{name}.pkl')
+
+    def _get_disk(self, cache_key):
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(cache_key)
+        if not (_is_private(self.cache_dir) and _is_private(path)):
+            return None
+        try:
+            with path.open('rb') as f:
+                stored_key, entry = pickle.load(f)
+        except Exception:
+            # Missing or corrupted entry: simply re-parse
+            return None
+        if stored_key != cache_key:
+            return None
+        # Mark as recently used for the eviction
+        os.utime(path)
+        self._set_memory(cache_key, entry)
+        return entry
+
+    def _set_disk(self, cache_key, entry):
+        if self.cache_dir is None:
+            return
+        path = self._disk_path(cache_key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            with tmp_path.open('wb') as f:
+                pickle.dump((cache_key, entry), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = []
+        for path in Path(self.cache_dir).glob('*.pkl'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def _is_private(path):
+    """Whether path is owned by the current user and not writable by anyone else"""
+    if not hasattr(os, 'getuid'):
+        # No ownership to check (e.g. on Windows)
+        return True
+    try:
+        status = os.stat(path)
+    except OSError:
+        return False
+    return status.st_uid == os.getuid() and not status.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """The cache shared by all the YamlConfig created with cache=True, created on first use
+
+    Set the environment variable CONFIGMYPY_CACHE_DIR to also cache on disk.
+    """
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ParseCache(cache_dir=os.environ.get('CONFIGMYPY_CACHE_DIR'))
+    return _default_cache
+
+
+def __getattr__(name):
+    # `default_cache` is only created when first accessed
+    if name == 'default_cache':
+        return get_default_cache()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
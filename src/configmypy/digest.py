@@ -0,0 +1,150 @@
+# Stable content hashes of configs, cached for each nested Bunch
+
+import array
+import sys
+from collections.abc import Mapping
+from hashlib import blake2b
+
+from .bunch import Bunch, _cache, _set_digest
+
+DIGEST_SIZE = 16
+
+
+def _is_scalarbool(value):
+    """ruamel's ScalarBoolean subclasses int: only check for it if ruamel was imported"""
+    scalarbool = sys.modules.get('ruamel.yaml.scalarbool')
+    return scalarbool is not None and isinstance(value, scalarbool.ScalarBoolean)
+
+
+def _encode(value, out):
+    """Appends to out a canonical encoding of value, the same in all processes
+
+    Subclasses (e.g. ruamel's ScalarFloat, CommentedSeq) are encoded like their builtin type,
+    and lists like tuples.
+    """
+    if value is None:
+        out.append(b'n')
+    elif isinstance(value, bool) or _is_scalarbool(value):
+        out.append(b'T' if value else b'F')
+    elif isinstance(value, int):
+        out.append(b'i%d;' % int(value))
+    elif isinstance(value, float):
+        out.append(b'f' + float.hex(float(value)).encode() + b';')
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8', 'surrogatepass')
+        out.append(b's%d:' % len(encoded))
+        out.append(encoded)
+    elif isinstance(value, bytes):
+        out.append(b'b%d:' % len(value))
+        out.append(value)
+    elif isinstance(value, (list, tuple)):
+        out.append(b'l%d:' % len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, Mapping):
+        out.append(b'd')
+        out.append(item_digest(value))
+    elif isinstance(value, array.array):
+        # Typed arrays (see configmypy.arrays) are hashed in bulk
+        data = value.tobytes()
+        out.append(b'a%s%d:' % (value.typecode.encode(), len(data)))
+        out.append(data)
+    elif hasattr(value, 'dtype') and hasattr(value, 'tobytes'):
+        # numpy arrays
+        data = value.tobytes()
+        out.append(b'A%s%s%d:' % (value.dtype.str.encode(), str(value.shape).encode(), len(data)))
+        out.append(data)
+    else:
+        # Not guaranteed to be stable
+        encoded = f'{type(value).__qualname__}:{value!r}'.encode('utf-8', 'surrogatepass')
+        out.append(b'o%d:' % len(encoded))
+        out.append(encoded)
+
+
+def digest(config):
+    """Content hash of a config, the same in all processes for the same content
+
+    The digest of each nested Bunch is cached, and only recomputed if it changed:
+    e.g. after setting a value, only the digests of the Bunch on its path are recomputed.
+    The order of the keys does not matter.
+
+    .. warning::
+
+       Values modified in place (e.g. appending to a list) are not detected:
+       set them again (e.g. `config.sizes = config.sizes`) to update the digest.
+
+    Parameters
+    ----------
+    config : Bunch or dict
+
+    Returns
+    -------
+    bytes
+    """
+    if not isinstance(config, Bunch):
+        return item_digest(config)
+    cached = config._digest
+    if cached is not None:
+        return cached
+
+    items = []
+    children = []
+    cacheable = True
+    for key, value in dict.items(config):
+        if isinstance(value, Bunch):
+            items.append((key, digest(value)))
+            children.append(value)
+            cacheable = cacheable and value._digest is not None
+        else:
+            # We cannot track changes to a regular dict
+            cacheable = cacheable and not isinstance(value, dict)
+            items.append((key, item_digest(value)))
+    config_digest = mapping_digest(items)
+    if cacheable:
+        _cache(config, _set_digest, config_digest, children)
+    return config_digest
+
+
+def hexdigest(config):
+    """Same as `digest`, as a hex string (e.g. to identify a config)"""
+    return digest(config).hex()
+
+
+def cached_digest(config):
+    """Returns the digest of a Bunch if it is already computed and up to date, None otherwise (without computing it)"""
+    if isinstance(config, Bunch):
+        return config._digest
+    return None
+
+
+def item_digest(value):
+    """Digest of a value of a config: nested configs are hashed from the digests of their items"""
+    if isinstance(value, Mapping):
+        if isinstance(value, Bunch):
+            return digest(value)
+        return mapping_digest((key, item_digest(nested_value)) for key, nested_value in value.items())
+    return blake2b(_canonical_bytes(value), digest_size=DIGEST_SIZE).digest()
+
+
+def _canonical_bytes(value):
+    """Canonical encoding of a (non-mapping) value: two values are the same in a config if their encodings are"""
+    out = []
+    _encode(value, out)
+    return b''.join(out)
+
+
+def mapping_digest(items):
+    """Digest of a mapping, given its (key, item_digest) items
+
+    The order of the keys does not matter, as for dict equality.
+    """
+    encoded_items = []
+    for key, item_digest in items:
+        out = []
+        _encode(key, out)
+        encoded_items.append(b''.join(out) + item_digest)
+    encoded_items.sort()
+    hasher = blake2b(b'd%d:' % len(encoded_items), digest_size=DIGEST_SIZE)
+    for encoded_item in encoded_items:
+        hasher.update(encoded_item)
+    return hasher.digest()
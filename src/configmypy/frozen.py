@@ -0,0 +1,192 @@
+# Immutable, slotted version of a Bunch, for fast attribute access
+
+import array
+import keyword
+import threading
+from collections.abc import Mapping
+from copy import deepcopy
+
+from .arrays import is_array
+from .bunch import Bunch
+
+
+class FrozenConfig(Mapping):
+    """Immutable config, with its keys stored in __slots__ rather than a dict
+
+    Created by `freeze`: each node of the config is an instance of a class
+    generated for its keys (and cached, so configs with the same keys share the same class).
+    Reading `config.opt.lr` is then a slot access per level, and each node is much smaller than a dict.
+
+    Keys that cannot be attributes (e.g. 'a-b', or 'items' which is a method) are still stored
+    in slots, but can only be read as `config['a-b']`, as with a Bunch.
+
+    Notes
+    -----
+    * Nested dicts are frozen, lists become tuples.
+    * Typed arrays (see `configmypy.arrays`) are copied into read-only arrays:
+      array.array become read-only memoryviews, numpy arrays are not writeable.
+    * Other mutable values (e.g. sets) are deep-copied by `freeze` and `thaw`:
+      a FrozenConfig never shares them with the config it was frozen from, or thawed into.
+    * A FrozenConfig is a read-only Mapping: use `thaw` to get back a Bunch you can modify.
+    """
+    __slots__ = ()
+    # Set for each generated class, see _frozen_class
+    _keys = ()
+    _slot_names = {}
+
+    def __getitem__(self, key):
+        try:
+            name = self._slot_names[key]
+        except (KeyError, TypeError):
+            raise KeyError(key) from None
+        return getattr(self, name)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        try:
+            return key in self._slot_names
+        except TypeError:
+            return False
+
+    def __setattr__(self, name, value):
+        raise TypeError(f'{self.__class__.__name__} is immutable, use thaw() to get a modifiable Bunch.')
+
+    __delattr__ = __setattr__
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenConfig) and self._keys == other._keys:
+            return all(getattr(self, name) == getattr(other, name) for name in self._slot_names.values())
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self):
+        return hash(tuple(self.items()))
+
+    def __reduce__(self):
+        return _unpickle_frozen, (self._keys, tuple(_picklable(value) for value in self.values()))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({dict(self.items())})'
+
+    def get_dotted(self, key, default=None, separator='.'):
+        """Returns the value of a nested key, e.g. `config.get_dotted('a.b')` for `config.a.b`"""
+        value = self
+        for part in key.split(separator):
+            if not isinstance(value, Mapping) or part not in value:
+                return default
+            value = value[part]
+        return value
+
+    def thaw(self):
+        """Returns a (modifiable) Bunch with the same content, tuples becoming lists and arrays writable copies"""
+        return _thaw(self)
+
+
+# Values kept as is by freeze and thaw, others are copied
+_IMMUTABLE_TYPES = (str, int, float, complex, bytes, frozenset, range, type(None))
+
+# Generated classes, by keys
+_classes = dict()
+_classes_lock = threading.Lock()
+
+
+def _frozen_class(keys):
+    """Returns the class (generated once) for a FrozenConfig with the given keys, in that order"""
+    cls = _classes.get(keys)
+    if cls is not None:
+        return cls
+
+    slot_names = dict()
+    for i, key in enumerate(keys):
+        if (isinstance(key, str) and key.isidentifier() and not keyword.iskeyword(key)
+                and not key.startswith('_') and not hasattr(FrozenConfig, key)):
+            slot_names[key] = key
+        else:
+            # Only accessible with config[key]
+            slot_names[key] = f'_slot_{i}'
+    cls = type('FrozenConfig', (FrozenConfig, ),
+               {'__slots__': tuple(slot_names.values()), '_keys': keys, '_slot_names': slot_names})
+    with _classes_lock:
+        return _classes.setdefault(keys, cls)
+
+
+def _make_frozen(keys, values):
+    cls = _frozen_class(keys)
+    config = object.__new__(cls)
+    for name, value in zip(cls._slot_names.values(), values):
+        object.__setattr__(config, name, value)
+    return config
+
+
+def _unpickle_frozen(keys, values):
+    return _make_frozen(keys, tuple(freeze(value) for value in values))
+
+
+def _picklable(value):
+    """Memoryviews cannot be pickled: they are pickled as arrays, and frozen again when unpickled"""
+    if isinstance(value, memoryview):
+        return _thaw(value)
+    if isinstance(value, tuple):
+        return tuple(_picklable(nested_value) for nested_value in value)
+    return value
+
+
+def _freeze_array(value):
+    """Read-only copy of a typed array"""
+    if isinstance(value, array.array):
+        return memoryview(value[:]).toreadonly()
+    value = value.copy()
+    value.flags.writeable = False
+    return value
+
+
+def freeze(config, _memo=None):
+    """Converts a (nested) config into an immutable FrozenConfig
+
+    Parameters
+    ----------
+    config : dict or Bunch
+
+    Returns
+    -------
+    FrozenConfig
+        subtrees shared within config (e.g. sweep variants) are frozen only once, and still shared
+    """
+    if _memo is None:
+        _memo = dict()
+    if isinstance(config, FrozenConfig):
+        return config
+    if isinstance(config, dict):
+        frozen = _memo.get(id(config))
+        if frozen is None:
+            frozen = _make_frozen(tuple(config), tuple(freeze(value, _memo) for value in config.values()))
+            _memo[id(config)] = frozen
+        return frozen
+    if isinstance(config, (list, tuple)):
+        return tuple(freeze(value, _memo) for value in config)
+    if isinstance(config, (_IMMUTABLE_TYPES, memoryview)):
+        return config
+    if is_array(config):
+        return _freeze_array(config)
+    return deepcopy(config)
+
+
+def _thaw(value):
+    if isinstance(value, FrozenConfig):
+        bunch = Bunch()
+        for key, nested_value in value.items():
+            dict.__setitem__(bunch, key, _thaw(nested_value))
+        return bunch
+    if isinstance(value, tuple):
+        return [_thaw(nested_value) for nested_value in value]
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    if isinstance(value, memoryview):
+        return array.array(value.format, value)
+    if is_array(value):
+        return value.copy()
+    return deepcopy(value)
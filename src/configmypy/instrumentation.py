@@ -0,0 +1,88 @@
+# Measure the cost of each step of a ConfigPipeline
+
+import time
+import tracemalloc
+from collections import namedtuple
+
+from .bunch import Bunch
+from .utils import flat_index, iter_nested_dict_flat
+
+StepStats = namedtuple('StepStats', ['step', 'wall_time', 'cpu_time', 'memory', 'peak_memory', 'n_keys', 'reused'])
+StepStats.__doc__ = """Cost of a step of a ConfigPipeline
+
+Parameters
+----------
+step : str
+    description of the step
+wall_time, cpu_time : float
+    time taken by the step, in seconds
+memory, peak_memory : int or None
+    memory allocated by the step (still allocated at the end, and at the peak), in bytes.
+    None unless the memory is traced.
+n_keys : int
+    number of leaves of the config after the step
+reused : bool
+    True if the output of the step was reused, without running it (incremental pipelines)
+"""
+
+
+def count_keys(config):
+    """Number of leaves of a (nested) config"""
+    if isinstance(config, Bunch):
+        return len(flat_index(config))
+    if isinstance(config, dict):
+        return sum(1 for _ in iter_nested_dict_flat(config))
+    return 0
+
+
+class StepTimer:
+    """Measures the time (and optionally memory) taken by a step
+
+    Parameters
+    ----------
+    trace_memory : bool, default is False
+        if True, also measure the memory allocated with tracemalloc
+        (started if needed, this slows down the step)
+    """
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+
+    def __enter__(self):
+        if self.trace_memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._memory_start, _ = tracemalloc.get_traced_memory()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.wall_time = time.perf_counter() - self._wall_start
+        self.cpu_time = time.process_time() - self._cpu_start
+        self.memory = self.peak_memory = None
+        if self.trace_memory:
+            memory, peak = tracemalloc.get_traced_memory()
+            self.memory = memory - self._memory_start
+            self.peak_memory = peak - self._memory_start
+            if self._started_tracing:
+                tracemalloc.stop()
+
+
+def format_stats(stats):
+    """Returns a table summarizing the StepStats of a pipeline"""
+    def kb(memory):
+        return '-' if memory is None else f'{memory/2**10:.1f}'
+
+    lines = [f'{"step":>6} {"wall (ms)":>10} {"cpu (ms)":>10} {"mem (KB)":>10} {"peak (KB)":>10} {"keys":>7}']
+    for i, step_stats in enumerate(stats):
+        if step_stats.reused:
+            lines.append(f'{f"({i+1})":>6} {"reused":>10} {"":>10} {"":>10} {"":>10} {step_stats.n_keys:>7}')
+            continue
+        lines.append(f'{f"({i+1})":>6} {step_stats.wall_time*1000:>10.2f} {step_stats.cpu_time*1000:>10.2f} '
+                     f'{kb(step_stats.memory):>10} {kb(step_stats.peak_memory):>10} {step_stats.n_keys:>7}')
+    total_wall = sum(step_stats.wall_time for step_stats in stats)
+    total_cpu = sum(step_stats.cpu_time for step_stats in stats)
+    lines.append(f'{"total":>6} {total_wall*1000:>10.2f} {total_cpu*1000:>10.2f}')
+    return '\n'.join(lines)
@@ -0,0 +1,292 @@
+# ${dotted.key} references between the values of a config, resolved lazily
+
+import re
+from graphlib import CycleError, TopologicalSorter
+
+from .bunch import Bunch
+from .utils import get_dotted, prefix_range, set_dotted
+
+REFERENCE_PATTERN = re.compile(r'\$\{([^${}]+)\}')
+
+
+class InterpolationError(KeyError):
+    """Raised for references to missing keys, or cyclic references"""
+    def __str__(self):
+        return str(self.args[0])
+
+
+def references(value):
+    """Returns the (dotted) keys referenced in value, e.g. ['data.batch_size'] for '${data.batch_size}'"""
+    if isinstance(value, str) and '${' in value:
+        return REFERENCE_PATTERN.findall(value)
+    return []
+
+
+def _same(value, other):
+    return value is other or (type(value) is type(other) and value == other)
+
+
+class _Resolver:
+    """Resolves and memoizes the references of an interpolated config
+
+    Each resolved value is memoized along with the values of the keys it references:
+    it is only resolved again if these (or the value itself) changed.
+    Until the config is modified (see `generation`), memoized values are returned without checking them.
+    """
+    def __init__(self, root, separator='.'):
+        self.root = root
+        self.separator = separator
+        # {key: [raw_value, ((referenced_key, referenced_value), ...), resolved_value, generation]}
+        self.memo = dict()
+        # Incremented each time the config is modified
+        self.generation = 0
+        # {key: function} applied to the resolved values of these keys, e.g. to coerce them (see set_coercer)
+        self.coercers = dict()
+
+    def set_coercer(self, key, function):
+        """Applies function to the value of key each time it is resolved (e.g. to coerce it to its type)
+
+        The functions are kept by deepcopy, but not pickled.
+        """
+        self.coercers[key] = function
+        self.memo.pop(key, None)
+
+    def raw(self, key):
+        """The value of key, as stored, without resolving it"""
+        node = self.root
+        for part in key.split(self.separator):
+            if not isinstance(node, dict) or not dict.__contains__(node, part):
+                raise InterpolationError(f'Reference to a missing key ${{{key}}}.')
+            node = dict.__getitem__(node, part)
+        return node
+
+    def value(self, key, resolving=()):
+        """The value of key, resolved"""
+        raw_value = self.raw(key)
+        if references(raw_value):
+            return self.resolve(key, raw_value, resolving)
+        return raw_value
+
+    def resolve(self, key, raw_value, resolving=()):
+        memo = self.memo.get(key)
+        if memo is not None and memo[3] == self.generation:
+            # Nothing was modified since it was resolved
+            return memo[2]
+
+        if key in resolving:
+            raise InterpolationError(f'Cyclic reference: {" -> ".join(resolving + (key, ))}.')
+        resolving = resolving + (key, )
+
+        if memo is not None and _same(memo[0], raw_value) and all(
+                _same(self.value(referenced_key, resolving), referenced_value)
+                for referenced_key, referenced_value in memo[1]):
+            memo[3] = self.generation
+            return memo[2]
+
+        referenced = tuple((referenced_key, self.value(referenced_key, resolving))
+                           for referenced_key in dict.fromkeys(references(raw_value)))
+        match = REFERENCE_PATTERN.fullmatch(raw_value)
+        if match is not None:
+            # The value is a single reference: keep the type of the referenced value
+            resolved = referenced[0][1]
+        else:
+            values = dict(referenced)
+            resolved = REFERENCE_PATTERN.sub(lambda match: str(values[match.group(1)]), raw_value)
+        coerce = self.coercers.get(key)
+        if coerce is not None:
+            resolved = coerce(resolved)
+        self.memo[key] = [raw_value, referenced, resolved, self.generation]
+        return resolved
+
+
+class InterpolatingBunch(Bunch):
+    """A Bunch whose string values can reference other values, as `${dotted.key}`
+
+    References are resolved when accessed (`config.key`, `config['key']`, `config.get('key')`),
+    and memoized: a resolved value is only resolved again if a value it references changed.
+    A value that is a single reference (e.g. '${data.batch_size}') takes the value (and type) of the referenced key,
+    otherwise the references are replaced by the referenced values in the string (e.g. '${folder}/${name}.ckpt').
+
+    Created with `interpolate`. Use `configmypy.interpolation.resolve` to get a regular Bunch
+    with all the references resolved.
+
+    Notes
+    -----
+    Iterating over the values (`values()`, `items()`) gives the values as stored, with their references.
+    """
+    __slots__ = ('_resolver', '_prefix')
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, str) and '${' in value:
+            return self._resolver.resolve(self._prefix + key, value)
+        return value
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key):
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        # New sub-configs can also have references
+        if isinstance(value, dict) and not (isinstance(value, InterpolatingBunch)
+                                            and value._resolver is self._resolver):
+            value = _convert(value, self._resolver, f'{self._prefix}{key}{self._resolver.separator}')
+        # The memoized values have to be checked again
+        self._resolver.generation += 1
+        Bunch.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._resolver.generation += 1
+        Bunch.__delitem__(self, key)
+
+    def pop(self, *args):
+        self._resolver.generation += 1
+        return Bunch.pop(self, *args)
+
+    def popitem(self):
+        self._resolver.generation += 1
+        return Bunch.popitem(self)
+
+    def setdefault(self, key, default=None):
+        self._resolver.generation += 1
+        return Bunch.setdefault(self, key, default)
+
+    def clear(self):
+        self._resolver.generation += 1
+        Bunch.clear(self)
+
+    def __ior__(self, other):
+        self._resolver.generation += 1
+        return Bunch.__ior__(self, other)
+
+    __getattr__ = __getitem__
+    __setattr__ = __setitem__
+
+    def __deepcopy__(self, memo):
+        config = interpolate(_raw_copy(self), separator=self._resolver.separator)
+        prefix = self._prefix
+        config._resolver.coercers.update((key[len(prefix):], function)
+                                         for key, function in self._resolver.coercers.items()
+                                         if key.startswith(prefix))
+        return config
+
+    def __reduce__(self):
+        return _restore, (_raw_copy(self._resolver.root), self._prefix, self._resolver.separator)
+
+
+def resolve(config):
+    """Returns a regular Bunch with all the references of an interpolated config resolved
+
+    The values are resolved in a topological order of their references.
+
+    Parameters
+    ----------
+    config : InterpolatingBunch
+        created with `interpolate` (other configs are returned as is)
+
+    Returns
+    -------
+    Bunch
+    """
+    if not isinstance(config, InterpolatingBunch):
+        return config
+    resolver = config._resolver
+    separator = resolver.separator
+    graph = dict()
+    for key, value in _iter_raw_leaves(config, config._prefix, separator):
+        if references(value):
+            graph[key] = value
+    # Referencing a sub-config depends on all the references within it
+    sorted_keys = sorted(graph)
+    sorter = TopologicalSorter()
+    for key, value in graph.items():
+        dependencies = []
+        for referenced_key in references(value):
+            # Raises an error if the key is missing
+            resolver.raw(referenced_key)
+            if referenced_key in graph:
+                dependencies.append(referenced_key)
+            start, end = prefix_range(sorted_keys, referenced_key + separator)
+            dependencies.extend(sorted_keys[start:end])
+        sorter.add(key, *dependencies)
+    try:
+        order = list(sorter.static_order())
+    except CycleError as error:
+        raise InterpolationError(f'Cyclic reference: {" -> ".join(error.args[1])}.') from None
+
+    resolved = dict()
+    for key in order:
+        resolved[key] = resolver.resolve(key, graph[key])
+
+    bunch = _raw_copy(config)
+    for key, value in resolved.items():
+        set_dotted(bunch, key[len(config._prefix):], resolve(value), separator=separator)
+    return bunch
+
+
+def _convert(config, resolver, prefix):
+    node = InterpolatingBunch()
+    _set_resolver(node, resolver)
+    _set_prefix(node, prefix)
+    for key, value in config.items():
+        if isinstance(value, dict):
+            value = _convert(value, resolver, f'{prefix}{key}{resolver.separator}')
+        elif isinstance(value, str) and (value == 'None' or value == 'none'):
+            value = None
+        dict.__setitem__(node, key, value)
+    return node
+
+
+def _raw_copy(config):
+    """A regular Bunch with the values as stored, with their references"""
+    bunch = Bunch()
+    for key, value in dict.items(config):
+        dict.__setitem__(bunch, key, _raw_copy(value) if isinstance(value, dict) else value)
+    return bunch
+
+
+def _iter_raw_leaves(config, prefix, separator):
+    for key, value in dict.items(config):
+        if isinstance(value, dict):
+            yield from _iter_raw_leaves(value, f'{prefix}{key}{separator}', separator)
+        else:
+            yield f'{prefix}{key}', value
+
+
+def _restore(root, prefix, separator):
+    config = interpolate(root, separator=separator)
+    return get_dotted(config, prefix[:-len(separator)], separator=separator) if prefix else config
+
+
+_set_resolver = InterpolatingBunch._resolver.__set__
+_set_prefix = InterpolatingBunch._prefix.__set__
+
+
+def interpolate(config, separator='.'):
+    """Returns a version of config whose `${dotted.key}` references are resolved lazily
+
+    The nested dicts are copied, the values are shared with config.
+
+    Parameters
+    ----------
+    config : dict or Bunch
+    separator : str, default is '.'
+        separator of the levels of the referenced keys
+
+    Returns
+    -------
+    InterpolatingBunch
+
+    Examples
+    --------
+    >>> config = interpolate({'data': {'batch_size': 32}, 'eval_batch_size': '${data.batch_size}'})
+    >>> config.eval_batch_size
+    32
+    >>> config.data.batch_size = 64
+    >>> config.eval_batch_size
+    64
+    """
+    resolver = _Resolver(None, separator=separator)
+    resolver.root = _convert(config, resolver, '')
+    return resolver.root
@@ -0,0 +1,147 @@
+# Share the current config with many threads, updated without blocking the readers (read-copy-update)
+
+import threading
+from collections import namedtuple
+
+from .frozen import FrozenConfig, freeze
+from .interpolation import resolve
+
+ConfigVersion = namedtuple('ConfigVersion', ['config', 'generation'])
+ConfigVersion.__doc__ = """A version of the config held by a LiveConfig
+
+Parameters
+----------
+config : FrozenConfig
+    immutable config
+generation : int
+    incremented each time a new version is published, starting from 0
+"""
+
+
+class LiveConfig:
+    """Holds the current version of a config, read by many threads and updated without locking the readers
+
+    Each version is immutable (a `FrozenConfig`): readers get a consistent config, never a half-applied update.
+    Publishing a new version replaces the reference to the current one at once (read-copy-update):
+    readers do not take any lock, and those still using the previous version keep it until they are done.
+    Writers are serialized.
+
+    Parameters
+    ----------
+    config : dict, Bunch or FrozenConfig, optional
+        the first version of the config
+
+    Examples
+    --------
+    >>> live = LiveConfig.from_pipeline(pipe, watch=True)
+    >>> # In each request, read one version of the config:
+    >>> config = live.config
+    >>> lr = config.opt.lr
+    """
+    def __init__(self, config=None):
+        self._current = ConfigVersion(None if config is None else _freeze(config), 0)
+        self._write_lock = threading.Lock()
+        self._published = threading.Condition(threading.Lock())
+        self.watcher = None
+
+    @classmethod
+    def from_pipeline(cls, pipeline, watch=False, **watch_kwargs):
+        """Holds the config read by a ConfigPipeline
+
+        Parameters
+        ----------
+        pipeline : ConfigPipeline
+        watch : bool, default is False
+            if True, a new version is published each time the files of the pipeline change,
+            see `ConfigPipeline.watch`. Call `live.watcher.stop()` to stop watching them.
+        watch_kwargs : dict
+            passed to `ConfigPipeline.watch`
+
+        Returns
+        -------
+        LiveConfig
+        """
+        live = cls(pipeline.read_conf())
+        if watch:
+            live.watcher = pipeline.watch(callback=lambda config, changes: live.publish(config), **watch_kwargs)
+        return live
+
+    def current(self):
+        """The current ConfigVersion (config and generation), read without locking"""
+        return self._current
+
+    @property
+    def config(self):
+        """The current version of the config, read without locking"""
+        return self._current.config
+
+    @property
+    def generation(self):
+        return self._current.generation
+
+    def publish(self, config):
+        """Publishes a new version of the config, seen by the readers from now on
+
+        The config is frozen before being published: modifying it afterwards does not affect the readers.
+
+        Returns
+        -------
+        ConfigVersion
+            the version published
+        """
+        # Build the new version before taking the lock: only the swap is serialized
+        frozen = _freeze(config)
+        with self._write_lock:
+            return self._swap(frozen)
+
+    def update(self, function):
+        """Publishes function(config), computed from the current version of the config
+
+        Unlike `live.publish(function(live.config))`, no other version can be published in between.
+
+        Parameters
+        ----------
+        function : callable
+            called with a (mutable) Bunch copy of the current config, returns the new config
+
+        Returns
+        -------
+        ConfigVersion
+            the version published
+        """
+        with self._write_lock:
+            config = self._current.config
+            return self._swap(_freeze(function(None if config is None else config.thaw())))
+
+    def _swap(self, frozen):
+        version = ConfigVersion(frozen, self._current.generation + 1)
+        # A single reference assignment: readers see either the previous or the new version
+        self._current = version
+        with self._published:
+            self._published.notify_all()
+        return version
+
+    def wait(self, generation, timeout=None):
+        """Waits until a version more recent than generation is published
+
+        Parameters
+        ----------
+        generation : int
+        timeout : float, optional
+            in seconds
+
+        Returns
+        -------
+        ConfigVersion or None
+            the current version, or None if it timed out
+        """
+        with self._published:
+            if self._published.wait_for(lambda: self._current.generation > generation, timeout=timeout):
+                return self._current
+        return None
+
+
+def _freeze(config):
+    if isinstance(config, FrozenConfig):
+        return config
+    return freeze(resolve(config))
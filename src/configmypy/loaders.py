@@ -0,0 +1,230 @@
+# Parsers used to read config files
+# Each takes the content of the file (str) and returns the parsed document
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+
+# ruamel is imported lazily, only when actually parsing yaml
+
+
+def load_rt(content):
+    """Parse yaml with ruamel's round-trip loader (keeps comments, slowest)"""
+    from ruamel.yaml import YAML
+    return YAML().load(content)
+
+
+def _construct_int(loader, node):
+    """YAML 1.2 integers: leading zeros are not octal (0o10 is) and there are no base 60 integers"""
+    value = loader.construct_scalar(node).replace('_', '')
+    sign = -1 if value[0] == '-' else 1
+    value = value.lstrip('+-')
+    for prefix, base in (('0b', 2), ('0o', 8), ('0x', 16)):
+        if value.startswith(prefix):
+            return sign*int(value[2:], base)
+    return sign*int(value)
+
+
+@lru_cache(maxsize=None)
+def _safe_loader():
+    """Returns a yaml loading function, using libyaml if available
+
+    PyYAML's C loader is used if installed with libyaml,
+    otherwise we fallback to ruamel's safe loader.
+    """
+    try:
+        import yaml
+        CSafeLoader = yaml.CSafeLoader
+    except (ImportError, AttributeError):
+        from ruamel.yaml import YAML
+        return YAML(typ='safe').load
+
+    class SafeLoader(CSafeLoader):
+        pass
+
+    # PyYAML implements YAML 1.1, where e.g. yes and off are booleans, 010 is octal, 1:20 is 80
+    # and 1e-3 is a string: use the YAML 1.2 resolution of booleans and numbers instead, like ruamel
+    replaced = {'tag:yaml.org,2002:bool', 'tag:yaml.org,2002:int', 'tag:yaml.org,2002:float'}
+    SafeLoader.yaml_implicit_resolvers = {
+        first: [(tag, regexp) for tag, regexp in resolvers if tag not in replaced]
+        for first, resolvers in CSafeLoader.yaml_implicit_resolvers.items()}
+    SafeLoader.add_implicit_resolver(
+        'tag:yaml.org,2002:bool',
+        re.compile(r'^(?:true|True|TRUE|false|False|FALSE)$'),
+        list('tTfF'))
+    SafeLoader.add_implicit_resolver(
+        'tag:yaml.org,2002:int',
+        re.compile(r'''^(?:[-+]?0b[0-1_]+
+                       |[-+]?0o?[0-7_]+
+                       |[-+]?[0-9_]+
+                       |[-+]?0x[0-9a-fA-F_]+)$''', re.X),
+        list('-+0123456789'))
+    SafeLoader.add_implicit_resolver(
+        'tag:yaml.org,2002:float',
+        re.compile(r'''^(?:[-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+                       |[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
+                       |[-+]?\.[0-9_]+(?:[eE][-+][0-9]+)?
+                       |[-+]?\.(?:inf|Inf|INF)
+                       |\.(?:nan|NaN|NAN))$''', re.X),
+        list('-+0123456789.'))
+    SafeLoader.add_constructor('tag:yaml.org,2002:int', _construct_int)
+
+    def load(content):
+        return yaml.load(content, Loader=SafeLoader)
+    return load
+
+
+def load_safe(content):
+    """Parse yaml with a safe loader (plain Python types, no comments)
+
+    Uses libyaml (C) when available, with a pure-Python fallback.
+    """
+    return _safe_loader()(content)
+
+
+def load_json(content):
+    """Parse json with the standard library"""
+    return json.loads(content)
+
+
+def load_toml(content):
+    """Parse toml with tomllib (Python >= 3.11) or tomli"""
+    try:
+        import tomllib
+    except ImportError:
+        import tomli as tomllib
+    return tomllib.loads(content)
+
+
+ENGINES = {
+    'rt': load_rt,
+    'safe': load_safe,
+    'json': load_json,
+    'toml': load_toml,
+}
+
+SUFFIX_TO_ENGINE = {
+    '.json': 'json',
+    '.toml': 'toml',
+}
+
+
+def resolve_engine(engine, filepath=None):
+    """Returns the name of the engine to use for a given file
+
+    Parameters
+    ----------
+    engine : {'rt', 'safe', 'json', 'toml', 'auto'}
+        if 'auto', the engine is chosen from the extension of filepath,
+        defaulting to 'safe' for yaml files
+    filepath : str, optional
+    """
+    if engine == 'auto':
+        suffix = Path(filepath).suffix.lower() if filepath is not None else ''
+        return SUFFIX_TO_ENGINE.get(suffix, 'safe')
+    if engine not in ENGINES:
+        raise ValueError(f'Got engine={engine}, but it should be one of {list(ENGINES) + ["auto"]}.')
+    return engine
+
+
+def _parse_events(content):
+    """Iterates over the yaml events of content, without composing any node"""
+    try:
+        import yaml
+        return yaml.parse(content, Loader=yaml.CSafeLoader)
+    except (ImportError, AttributeError):
+        from ruamel.yaml import YAML
+        return YAML(typ='safe').parse(content)
+
+
+def index_sections(content, byte_offsets=False):
+    """Locates the top-level sections of a yaml document, without building it
+
+    Only the parser's events are used: the subtrees are skipped without
+    composing or constructing any node.
+
+    Parameters
+    ----------
+    content : str
+        content of a yaml file
+    byte_offsets : bool, default is False
+        if True, return offsets in bytes (utf-8) rather than in characters,
+        e.g. to seek directly into the file
+
+    Returns
+    -------
+    dict or None
+        {key: (start, end, column)} for each top-level key, where start and end
+        delimit its value in content and column is the indentation of its first line.
+        None if the document cannot be safely split into sections
+        (not a mapping, multiple documents, anchors or aliases).
+    """
+    sections = {}
+    depth = 0
+    key = None
+    start = column = None
+    n_documents = 0
+    for event in _parse_events(content):
+        name = type(event).__name__
+        # Aliases could refer to anchors in other sections
+        if name == 'AliasEvent' or getattr(event, 'anchor', None) is not None:
+            return None
+        if name == 'DocumentStartEvent':
+            n_documents += 1
+            if n_documents > 1:
+                return None
+        elif name in ('StreamStartEvent', 'StreamEndEvent', 'DocumentEndEvent'):
+            continue
+        elif depth == 0:
+            if name != 'MappingStartEvent':
+                return None
+            depth = 1
+        elif depth == 1:
+            if key is None:
+                if name == 'MappingEndEvent':
+                    depth = 0
+                    continue
+                if name != 'ScalarEvent':
+                    return None
+                key = event.value
+                continue
+            start, column = event.start_mark.index, event.start_mark.column
+            if name == 'ScalarEvent':
+                sections[key] = (start, event.end_mark.index, column)
+                key = None
+            else:
+                depth = 2
+        elif name in ('MappingStartEvent', 'SequenceStartEvent'):
+            depth += 1
+        elif name in ('MappingEndEvent', 'SequenceEndEvent'):
+            depth -= 1
+            if depth == 1:
+                sections[key] = (start, event.end_mark.index, column)
+                key = None
+
+    if byte_offsets and not content.isascii():
+        positions = sorted({i for start, end, _ in sections.values() for i in (start, end)})
+        offsets = dict()
+        previous = n_bytes = 0
+        for position in positions:
+            n_bytes += len(content[previous:position].encode('utf-8'))
+            offsets[position] = n_bytes
+            previous = position
+        sections = {key: (offsets[start], offsets[end], column)
+                    for key, (start, end, column) in sections.items()}
+
+    return sections
+
+
+def load_section(content, config_name, engine='rt'):
+    """Parses only the top-level section config_name of a yaml document
+
+    Falls back to parsing the whole document if it cannot be split into sections.
+    """
+    sections = index_sections(content)
+    if sections is None:
+        return ENGINES[engine](content)[config_name]
+    start, end, column = sections[config_name]
+    # Re-indent the first line like the others
+    return ENGINES[engine](' ' * column + content[start:end])
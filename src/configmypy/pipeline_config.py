@@ -1,4 +1,8 @@
-from .utils import iter_nested_dict_flat
+from copy import deepcopy
+from functools import partial
+
+from .instrumentation import StepStats, StepTimer, count_keys, format_stats
+from .utils import file_fingerprint, iter_nested_dict_flat
 
 class ConfigPipeline:
     """Read configuration from a variety of places and compose them
@@ -8,20 +12,280 @@ class ConfigPipeline:
     automatically overwritten via the command-line.
     
     Optionally, the command-line also lets you read yet another config. 
+
+    Parameters
+    ----------
+    steps : list
+        steps to run, in order. Each has a `read_conf(config, **kwargs)` method
+        returning the updated config and the kwargs for the next step.
+    inplace : bool or None, default is None
+        if not None, sets the `inplace` attribute of the steps that have one.
+        Since the config is created within the pipeline, the steps can safely update it
+        in place rather than copying it: use inplace=True to avoid these copies.
+    incremental : bool, default is False
+        if True, the output of each step is cached along with the fingerprint of its inputs
+        (e.g. the file read, the command-line arguments).
+        When reading the configuration again, the steps are only run again
+        from the first one whose inputs changed.
+        Steps without a `fingerprint(**kwargs)` method are always run again, as are the following ones.
+        The files listed in the `file_states` attribute of a step after it ran ({filepath: fingerprint},
+        e.g. the files included by a YamlConfig) are also checked.
+    max_workers : int or None, default is None
+        if not None, the files of the steps that support it (with a `prefetch(executor)` method, e.g. YamlConfig)
+        are all read and parsed concurrently, in a pool of max_workers threads, then merged in order.
+        Steps reading a file given by a previous step (e.g. a config_file passed on the command-line)
+        still wait for that step. The resulting config is the same as when reading the steps sequentially.
+    instrument : bool, default is False
+        if True, the wall time, CPU time and number of keys after each step are recorded in `self.stats`,
+        a list of `configmypy.instrumentation.StepStats`, and summarized by `log()`.
+    trace_memory : bool, default is False
+        if True, also record the memory allocated by each step, with tracemalloc (slower).
+        Implies instrument=True.
+    interpolate : bool, default is False
+        if True, the values of the config can reference other values, as `${dotted.key}`:
+        the config returned is an `configmypy.interpolation.InterpolatingBunch`,
+        which resolves the references when they are accessed.
+    schema : dataclass, TypedDict, dict or Schema, optional
+        if given, the config read is validated against it, and its values coerced to the types of the schema
+        (e.g. an int to a float), with the missing keys set to their default.
+        Raises a `configmypy.schema.ValidationError` listing all the violations.
+        The schema is compiled once, see `configmypy.schema.compile_schema`.
     """
-    def __init__(self, steps):
+    def __init__(self, steps, inplace=None, incremental=False, max_workers=None,
+                 instrument=False, trace_memory=False, interpolate=False, schema=None):
         self.steps = steps
+        if inplace is not None:
+            for step in steps:
+                if hasattr(step, 'inplace'):
+                    step.inplace = inplace
+        self.incremental = incremental
+        self.max_workers = max_workers
+        self.instrument = instrument or trace_memory
+        self.trace_memory = trace_memory
+        self.interpolate = interpolate
+        if schema is not None:
+            from .schema import compile_schema
+            schema = compile_schema(schema)
+        self.schema = schema
+        self.stats = []
+        self.before_step_hooks = []
+        self.after_step_hooks = []
+        # Fingerprint of the inputs, states of the files read, output config and kwargs of each step
+        self._step_cache = []
     
     def read_conf(self):
+        if self.max_workers:
+            return self._read_conf_concurrent(self.max_workers)
+        return self._read_conf()
+
+    async def aread_conf(self, max_workers=None):
+        """Reads the configuration without blocking the event loop
+
+        The files are read and parsed concurrently, as with `max_workers`,
+        and the steps are run in a worker thread.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            number of threads used to read the files,
+            by default `self.max_workers` or one per step
+        """
+        import asyncio
+        max_workers = max_workers or self.max_workers or len(self.steps)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self._read_conf_concurrent, max_workers))
+
+    def _read_conf_concurrent(self, max_workers):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='configmypy') as executor:
+            self._prefetch(executor)
+            return self._read_conf()
+
+    def _prefetch(self, executor):
+        """Starts reading the files of all the steps that can prefetch them"""
+        for i, step in enumerate(self.steps):
+            if not hasattr(step, 'prefetch'):
+                continue
+            # Steps that will likely be reused do not need to read their file
+            if (self.incremental and hasattr(step, 'fingerprint')
+                    and self._cached_output(i, step.fingerprint()) is not None):
+                continue
+            step.prefetch(executor)
+
+    def _cached_output(self, i, fingerprint):
+        """The cached (config, kwargs) of the i-th step, or None if its inputs or the files it read changed"""
+        if fingerprint is None or i >= len(self._step_cache):
+            return None
+        cached_fingerprint, file_states, config, kwargs = self._step_cache[i]
+        if cached_fingerprint != fingerprint or any(
+                file_fingerprint(filepath) != state for filepath, state in file_states.items()):
+            return None
+        return config, kwargs
+
+    def add_hook(self, before=None, after=None):
+        """Adds functions called before and after running each step
+
+        Parameters
+        ----------
+        before : callable, optional
+            called as before(i, step, config, kwargs), with the inputs of the i-th step
+        after : callable, optional
+            called as after(i, step, config, stats), with the output config of the i-th step
+            and its StepStats
+        """
+        if before is not None:
+            self.before_step_hooks.append(before)
+        if after is not None:
+            self.after_step_hooks.append(after)
+
+    def _read_conf(self):
         config = None
         kwargs = dict()
-        for step in self.steps:
-            config, kwargs = step.read_conf(config, **kwargs)
+        instrumented = self.instrument or self.before_step_hooks or self.after_step_hooks
+        if instrumented:
+            self.stats = []
+        # Whether the previous steps all reused their cached output
+        reused = self.incremental
+        for i, step in enumerate(self.steps):
+            if self.incremental:
+                fingerprint = step.fingerprint(**kwargs) if hasattr(step, 'fingerprint') else None
+
+            if reused:
+                # The inputs of a step are the outputs of the previous one and its own fingerprint
+                cached = self._cached_output(i, fingerprint)
+                if cached is not None:
+                    config, kwargs = cached
+                    if instrumented:
+                        self.stats.append(StepStats(str(step), 0.0, 0.0, None, None, count_keys(config), True))
+                    continue
+                # Do not modify the cached outputs
+                reused = False
+                del self._step_cache[i:]
+                config, kwargs = deepcopy((config, kwargs))
+
+            if instrumented:
+                config, kwargs = self._run_instrumented(i, step, config, kwargs)
+            else:
+                config, kwargs = step.read_conf(config, **kwargs)
+
+            if self.incremental and fingerprint is not None and len(self._step_cache) == i:
+                file_states = dict(getattr(step, 'file_states', None) or {})
+                self._step_cache.append((fingerprint, file_states, deepcopy(config), deepcopy(kwargs)))
+
+        if reused:
+            config = deepcopy(config)
+
+        if self.interpolate:
+            from .interpolation import interpolate
+            config = interpolate(config)
+
+        if self.schema is not None:
+            config = self.schema.validate(config)
         
         self.config = config
 
         return config
+
+    def _run_instrumented(self, i, step, config, kwargs):
+        for hook in self.before_step_hooks:
+            hook(i, step, config, kwargs)
+        with StepTimer(trace_memory=self.trace_memory) as timer:
+            config, kwargs = step.read_conf(config, **kwargs)
+        stats = StepStats(str(step), timer.wall_time, timer.cpu_time, timer.memory, timer.peak_memory,
+                          count_keys(config), False)
+        self.stats.append(stats)
+        for hook in self.after_step_hooks:
+            hook(i, step, config, stats)
+        return config, kwargs
     
+    def read_conf_shared(self, name, publish, timeout=60.0):
+        """Reads the configuration in a single process and shares it with the others
+
+        In multi-process jobs, only one process (e.g. rank 0) runs the steps and publishes the config
+        in shared memory: the others just attach to it, without running any step.
+
+        Parameters
+        ----------
+        name : str
+            name under which the config is published, the same for all the processes (e.g. from the job id)
+        publish : bool
+            True in the process that reads and publishes the config, False in the others
+        timeout : float, default is 60.0
+            time the other processes wait for the config to be published, in seconds
+
+        Returns
+        -------
+        Bunch
+            the config
+
+        Notes
+        -----
+        The publishing process keeps the config in shared memory (`self.shared`) until it exits:
+        call `self.shared.unlink()` to free it earlier, once all the processes read it.
+        """
+        from .shared import SharedConfig
+        if publish:
+            config = self.read_conf()
+            self.shared = SharedConfig.publish(config, name)
+            return config
+
+        with SharedConfig.attach(name, timeout=timeout) as shared:
+            self.config = shared.to_bunch()
+        return self.config
+
+    def sweep(self, spec, mode='grid', n_samples=None, seed=None):
+        """Reads the config once, then lazily yields a variant of it for each point of a sweep
+
+        The variants share their unchanged subtrees: do not modify them in place.
+        With interpolate=True, the references are resolved in each variant (see `configmypy.sweep.expand_sweep`).
+        With a schema, each variant is validated when it is yielded.
+
+        Parameters
+        ----------
+        spec : dict
+            {dotted_key: values} for each swept key, e.g. {'opt.lr': [0.1, 0.01]}
+        mode : {'grid', 'zip', 'random'}, default is 'grid'
+            see `configmypy.sweep.sweep_params`
+        n_samples : int, optional
+            number of samples, required if mode='random'
+        seed : int, optional
+
+        Returns
+        -------
+        generator of Bunch
+        """
+        from .sweep import expand_sweep
+        variants = expand_sweep(self.read_conf(), spec, mode=mode, n_samples=n_samples, seed=seed)
+        if self.schema is None:
+            return variants
+        # The shared subtrees were validated with the config read: they are not modified again
+        return (self.schema.validate(config) for config in variants)
+
+    def watch(self, callback=None, interval=1.0, debounce=0.2, backend='auto'):
+        """Reads the config again whenever the files it was read from change
+
+        Parameters
+        ----------
+        callback : callable, optional
+            called as callback(config, changes) each time the config changes,
+            with changes {flat_key: (old_value, new_value)} for each changed leaf.
+            More can be added with `watcher.subscribe(callback)`.
+        interval : float, default is 1.0
+            time between checks of the files, in seconds, when polling
+        debounce : float, default is 0.2
+            only read the config once the files have not changed for that long, in seconds
+        backend : {'auto', 'inotify', 'polling'}
+            'auto' uses inotify when available and polls the files otherwise
+
+        Returns
+        -------
+        ConfigWatcher
+            the started watcher, call `watcher.stop()` to stop watching the files
+        """
+        from .watch import ConfigWatcher
+        return ConfigWatcher(self, callback=callback, interval=interval,
+                             debounce=debounce, backend=backend).start()
+
     def log(self):
         print('###############################')
         print('#####    CONFIGURATION    #####')
@@ -30,6 +294,10 @@ class ConfigPipeline:
         print('------')
         for i, step in enumerate(self.steps):
             print(f' ({i+1}) {step}')
+        if self.stats:
+            print('\nCost:')
+            print('-----')
+            print(format_stats(self.stats))
         print('\n-------------------------------')
         print('\nConfiguration:')
         print('--------------\n')
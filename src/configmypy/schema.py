@@ -0,0 +1,516 @@
+# Validate and coerce configs against a schema, compiled once into a flat dispatch table
+
+import dataclasses
+import operator
+import re
+import threading
+import types
+import typing
+from collections.abc import Mapping
+from copy import deepcopy
+from enum import Enum
+from functools import partial
+
+from .arrays import coerce_array, is_array
+from .bunch import Bunch
+from .digest import _is_scalarbool
+from .interpolation import InterpolatingBunch, references
+from .utils import flat_index, get_dotted, set_dotted
+
+_NONE_TYPE = type(None)
+# typing.Union[int, str], and int | str
+_UNION_TYPES = (typing.Union, getattr(types, 'UnionType', typing.Union))
+_MISSING = object()
+# Default of the keys that can be missing, without being set (e.g. not required in a TypedDict)
+_OPTIONAL = object()
+
+
+class ValidationError(ValueError):
+    """Raised when a config does not match its schema, listing all the violations
+
+    Attributes
+    ----------
+    errors : list of (str, str)
+        (flat_key, message) for each violation
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        lines = [f'{len(errors)} error(s) validating the config:']
+        lines.extend(f'  {key}: {message}' for key, message in errors)
+        super().__init__('\n'.join(lines))
+
+
+class _Invalid(Exception):
+    pass
+
+
+def _coerce_resolved(flat_key, coerce, value):
+    """Coerces the resolved value of a reference"""
+    try:
+        return coerce(value)
+    except _Invalid as error:
+        raise ValidationError([(flat_key, str(error))]) from None
+
+
+def _parent(config, flat_key, separator):
+    """(parent, key) of an existing flat_key"""
+    *parents, key = flat_key.split(separator)
+    for part in parents:
+        config = dict.__getitem__(config, part)
+    return config, key
+
+
+def _type_name(tp):
+    if isinstance(tp, type):
+        return tp.__name__
+    return str(tp).replace('typing.', '')
+
+
+def _identity(value):
+    return value
+
+
+def _scalar_coercer(tp):
+    """Coercer of a value to a builtin type, e.g. ruamel's ScalarFloat to float, or an int to a float"""
+    if tp is bool:
+        def coerce(value):
+            if isinstance(value, bool) or _is_scalarbool(value):
+                return bool(value)
+            raise _Invalid(f'expected bool, got {value!r}')
+    elif tp is int:
+        def coerce(value):
+            if isinstance(value, int) and not (isinstance(value, bool) or _is_scalarbool(value)):
+                return int(value)
+            raise _Invalid(f'expected int, got {value!r}')
+    elif tp is float:
+        def coerce(value):
+            if isinstance(value, (int, float)) and not (isinstance(value, bool) or _is_scalarbool(value)):
+                return float(value)
+            raise _Invalid(f'expected float, got {value!r}')
+    elif tp is str:
+        def coerce(value):
+            if isinstance(value, str):
+                return str(value)
+            raise _Invalid(f'expected str, got {value!r}')
+    elif tp is _NONE_TYPE:
+        def coerce(value):
+            if value is None:
+                return None
+            raise _Invalid(f'expected None, got {value!r}')
+    elif issubclass(tp, Enum):
+        def coerce(value):
+            try:
+                return tp(value)
+            except ValueError:
+                raise _Invalid(f'expected one of {[member.value for member in tp]}, got {value!r}') from None
+    else:
+        # Other classes (e.g. pathlib.Path) are built from the value
+        def coerce(value):
+            if isinstance(value, tp):
+                return value
+            try:
+                return tp(value)
+            except (TypeError, ValueError):
+                raise _Invalid(f'expected {tp.__name__}, got {value!r}') from None
+    return coerce
+
+
+def _coercer(tp):
+    """Returns a function coercing a value to tp, raising _Invalid if it cannot"""
+    if tp is typing.Any or tp is object:
+        return _identity
+    if isinstance(tp, str):
+        return _coercer(_parse_type_name(tp))
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+
+    if origin in _UNION_TYPES:
+        optional = _NONE_TYPE in args
+        coercers = [_coercer(arg) for arg in args if arg is not _NONE_TYPE]
+        name = _type_name(tp)
+
+        def coerce(value):
+            if value is None and optional:
+                return None
+            for coercer in coercers:
+                try:
+                    return coercer(value)
+                except _Invalid:
+                    pass
+            raise _Invalid(f'expected {name}, got {value!r}')
+        return coerce
+
+    if origin is typing.Literal:
+        def coerce(value):
+            # 1 == True: also check the types
+            for choice in args:
+                if value == choice and isinstance(value, bool) == isinstance(choice, bool):
+                    return choice
+            raise _Invalid(f'expected one of {list(args)}, got {value!r}')
+        return coerce
+
+    if tp in (list, tuple) or origin in (list, tuple):
+        container = origin or tp
+        if container is tuple and args and args[-1] is not Ellipsis:
+            # Fixed length tuple
+            item_coercers = [_coercer(arg) for arg in args]
+        else:
+            item_coercers = None
+            item_coercer = _coercer(args[0]) if args else _identity
+            item_type = args[0] if args else typing.Any
+
+        def coerce(value):
+            if item_coercers is None and is_array(value):
+                # Typed arrays are kept as arrays, see configmypy.arrays
+                if item_type is typing.Any:
+                    return value
+                packed = coerce_array(value, item_type)
+                if packed is not None:
+                    return packed
+                value = value.tolist()
+            if not isinstance(value, (list, tuple)):
+                raise _Invalid(f'expected {_type_name(tp)}, got {value!r}')
+            if item_coercers is not None:
+                if len(value) != len(item_coercers):
+                    raise _Invalid(f'expected {len(item_coercers)} items, got {len(value)}')
+                items = zip(item_coercers, value)
+            else:
+                items = ((item_coercer, item) for item in value)
+            result = []
+            for i, (coercer, item) in enumerate(items):
+                try:
+                    result.append(coercer(item))
+                except _Invalid as error:
+                    raise _Invalid(f'item {i}: {error}') from None
+            # Already valid (e.g. validated again): keep it, rather than replacing it by a copy
+            if type(value) is container and all(map(operator.is_, result, value)):
+                return value
+            return container(result)
+        return coerce
+
+    if tp is dict or origin in (dict, Mapping):
+        value_coercer = _coercer(args[1]) if len(args) == 2 else _identity
+
+        def coerce(value):
+            if not isinstance(value, Mapping):
+                raise _Invalid(f'expected a dict, got {value!r}')
+            if value_coercer is _identity:
+                return value
+            result = Bunch()
+            for key, item in value.items():
+                try:
+                    dict.__setitem__(result, key, value_coercer(item))
+                except _Invalid as error:
+                    raise _Invalid(f'key {key!r}: {error}') from None
+            if type(value) is Bunch and all(result[key] is item for key, item in value.items()):
+                return value
+            return result
+        return coerce
+
+    if isinstance(tp, type):
+        return _scalar_coercer(tp)
+    raise TypeError(f'Unsupported type in schema: {tp!r}')
+
+
+_TYPE_NAMES = {'int': int, 'float': float, 'str': str, 'bool': bool,
+               'any': typing.Any, 'dict': dict, 'list': list, 'none': _NONE_TYPE}
+_LIST_PATTERN = re.compile(r'list\[(.+)\]')
+
+
+def _parse_type_name(name):
+    """Type of a type name in a YAML schema, e.g. 'float', 'list[int]', 'int?' (optional)"""
+    name = name.strip()
+    if name.endswith('?'):
+        return typing.Optional[_parse_type_name(name[:-1])]
+    match = _LIST_PATTERN.fullmatch(name)
+    if match is not None:
+        return typing.List[_parse_type_name(match.group(1))]
+    try:
+        return _TYPE_NAMES[name.lower()]
+    except KeyError:
+        raise ValueError(f'Unknown type {name!r} in schema, expected one of {list(_TYPE_NAMES)}, '
+                         f'list[...] or an optional type ending with ?') from None
+
+
+def _is_optional(tp):
+    if isinstance(tp, str):
+        tp = _parse_type_name(tp)
+    return tp is _NONE_TYPE or (typing.get_origin(tp) in _UNION_TYPES and _NONE_TYPE in typing.get_args(tp))
+
+
+def _is_opaque(tp):
+    """Whether values of type tp can be dicts, validated as a whole rather than leaf by leaf"""
+    if isinstance(tp, str):
+        tp = _parse_type_name(tp)
+    if tp is typing.Any or tp is object or tp is dict:
+        return True
+    origin = typing.get_origin(tp)
+    if origin in (dict, Mapping):
+        return True
+    if origin in _UNION_TYPES:
+        return any(_is_opaque(arg) for arg in typing.get_args(tp))
+    return False
+
+
+def _is_typeddict(spec):
+    return isinstance(spec, type) and issubclass(spec, dict) and hasattr(spec, '__total__')
+
+
+def _spec_fields(spec):
+    """(key, type, default, default_factory) of each field of a dataclass, TypedDict or dict schema"""
+    if dataclasses.is_dataclass(spec):
+        hints = typing.get_type_hints(spec)
+        for field in dataclasses.fields(spec):
+            if not field.init:
+                continue
+            default_factory = None if field.default_factory is dataclasses.MISSING else field.default_factory
+            default = _MISSING if field.default is dataclasses.MISSING else field.default
+            yield field.name, hints[field.name], default, default_factory
+    elif _is_typeddict(spec):
+        hints = typing.get_type_hints(spec)
+        for key, tp in hints.items():
+            default = _MISSING if key in spec.__required_keys__ else _OPTIONAL
+            yield key, tp, default, None
+    elif isinstance(spec, Mapping):
+        for key, tp in spec.items():
+            # Optional keys default to None
+            yield key, tp, None if _is_optional(tp) else _MISSING, None
+    else:
+        raise TypeError(f'Expected a dataclass, TypedDict or dict as schema, got {spec!r}.')
+
+
+def _is_nested(tp):
+    return isinstance(tp, Mapping) or (dataclasses.is_dataclass(tp) and isinstance(tp, type)) or _is_typeddict(tp)
+
+
+def _without_none(tp):
+    """The type X of Optional[X], tp otherwise"""
+    if typing.get_origin(tp) in _UNION_TYPES:
+        args = [arg for arg in typing.get_args(tp) if arg is not _NONE_TYPE]
+        if len(args) == 1:
+            return args[0]
+    return tp
+
+
+class Schema:
+    """A schema compiled into a flat dispatch table, to validate and coerce configs
+
+    Use `compile_schema` rather than creating it directly, to reuse the compiled schemas.
+
+    Parameters
+    ----------
+    spec : dataclass, TypedDict or dict
+        the schema: the fields of a dataclass (or TypedDict) are the keys of the config,
+        and nested dataclasses (or dicts) are sub-configs, which can be None if Optional (None if missing).
+        In a dict (e.g. read from a YAML schema), optional keys default to None, and the types can be given by name:
+        'int', 'float', 'str', 'bool', 'any', 'dict', 'list', 'list[int]', or 'int?' for an optional int.
+    allow_extra : bool, default is False
+        if False, keys that are not in the schema are errors
+    separator : str, default is '.'
+
+    Notes
+    -----
+    The schema is compiled once into a table {flat_key: (coerce, default, default_factory)},
+    so validating a config is a single pass over its (cached) flat index, linear in its number of leaves.
+    Fields that can hold a whole dict (`dict`, `Dict[str, int]`, `Any`) are looked up and validated as a whole.
+    """
+    def __init__(self, spec, allow_extra=False, separator='.'):
+        self.spec = spec
+        self.allow_extra = allow_extra
+        self.separator = separator
+        # {flat_key: (coerce, default, default_factory)}
+        self.fields = dict()
+        # Fields validated as a whole
+        self.opaque = dict()
+        # {flat_key: (optional, default)} of the sub-configs, optional if they can be None
+        self.nested = dict()
+        self._compile(spec, '')
+
+    def _compile(self, spec, prefix):
+        for key, tp, default, default_factory in _spec_fields(spec):
+            flat_key = f'{prefix}{key}'
+            nested_tp = _without_none(tp)
+            if _is_nested(nested_tp):
+                self.nested[flat_key] = (nested_tp is not tp, default)
+                self._compile(nested_tp, flat_key + self.separator)
+            elif _is_opaque(tp):
+                self.opaque[flat_key] = (_coercer(tp), default, default_factory)
+            else:
+                self.fields[flat_key] = (_coercer(tp), default, default_factory)
+
+    def __repr__(self):
+        return f'Schema({_type_name(self.spec) if isinstance(self.spec, type) else self.spec!r})'
+
+    def _within(self, flat_key, keys):
+        """Whether flat_key is nested within one of keys, e.g. a field validated as a whole"""
+        if not keys:
+            return False
+        start = 0
+        while True:
+            start = flat_key.find(self.separator, start)
+            if start < 0:
+                return False
+            if flat_key[:start] in keys:
+                return True
+            start += len(self.separator)
+
+    def errors(self, config, coerce=True):
+        """Validates config, returning the list of (flat_key, message) of the violations
+
+        Parameters
+        ----------
+        config : Bunch
+            validated in place: if coerce is True, the values are coerced to the types of the schema
+            (e.g. an int to a float), and the missing keys with a default are set.
+            The values referencing other values (see `configmypy.interpolation`) are validated once resolved,
+            and coerced each time they are resolved (raising a ValidationError if they become invalid).
+        coerce : bool, default is True
+        """
+        separator = self.separator
+        fields = self.fields
+        errors = []
+        seen = 0
+        # Sub-configs that are None (or invalid): the keys they should contain are not checked
+        skipped = set()
+
+        for flat_key, (parent, key) in flat_index(config, separator).items():
+            field = fields.get(flat_key)
+            if field is None:
+                if flat_key in self.opaque:
+                    continue
+                if flat_key in self.nested:
+                    skipped.add(flat_key)
+                    if not (parent[key] is None and self.nested[flat_key][0]):
+                        errors.append((flat_key, f'expected a sub-config, got {parent[key]!r}'))
+                elif not self.allow_extra and not self._within(flat_key, self.opaque):
+                    errors.append((flat_key, 'unexpected key'))
+                continue
+            seen += 1
+            value = parent[key]
+            try:
+                coerced = field[0](value)
+            except _Invalid as error:
+                errors.append((flat_key, str(error)))
+                continue
+            if coerce:
+                self._set_coerced(parent, key, flat_key, value, coerced, field[0])
+
+        # Missing optional sub-configs without defaults are None
+        for flat_key, (optional, default) in self.nested.items():
+            if (optional and default is None and not self._within(flat_key, skipped)
+                    and get_dotted(config, flat_key, _MISSING, separator=separator) is _MISSING):
+                skipped.add(flat_key)
+                if coerce:
+                    set_dotted(config, flat_key, None, separator=separator)
+
+        if seen < len(fields):
+            index = flat_index(config, separator)
+            missing = [(flat_key, field) for flat_key, field in fields.items()
+                       if flat_key not in index and not self._within(flat_key, skipped)]
+        else:
+            missing = []
+        for flat_key, (coerce_value, default, default_factory) in self.opaque.items():
+            if self._within(flat_key, skipped):
+                continue
+            value = get_dotted(config, flat_key, _MISSING, separator=separator)
+            if value is _MISSING:
+                missing.append((flat_key, (coerce_value, default, default_factory)))
+                continue
+            try:
+                coerced = coerce_value(value)
+            except _Invalid as error:
+                errors.append((flat_key, str(error)))
+                continue
+            if coerce:
+                parent, key = _parent(config, flat_key, separator)
+                self._set_coerced(parent, key, flat_key, value, coerced, coerce_value)
+
+        for flat_key, (_, default, default_factory) in missing:
+            if default_factory is not None:
+                default = default_factory()
+                if dataclasses.is_dataclass(default):
+                    default = dataclasses.asdict(default)
+            elif default is _MISSING:
+                errors.append((flat_key, 'missing required key'))
+                continue
+            elif default is _OPTIONAL:
+                continue
+            else:
+                default = deepcopy(default)
+            if coerce:
+                set_dotted(config, flat_key, Bunch(default) if isinstance(default, dict) else default,
+                           separator=separator)
+        return errors
+
+    @staticmethod
+    def _set_coerced(parent, key, flat_key, value, coerced, coerce_value):
+        """Replaces the value of parent[key] by its coerced value"""
+        if isinstance(parent, InterpolatingBunch) and references(dict.__getitem__(parent, key)):
+            # References to other values are kept, and coerced when resolved
+            parent._resolver.set_coercer(parent._prefix + key, partial(_coerce_resolved, flat_key, coerce_value))
+        elif coerced is not value:
+            parent[key] = coerced
+
+    def validate(self, config, coerce=True):
+        """Validates (and coerces) config, raising a ValidationError listing all the violations
+
+        Parameters
+        ----------
+        config : dict or Bunch
+        coerce : bool, default is True
+            see `errors`
+
+        Returns
+        -------
+        Bunch
+            config, validated in place (or converted to a Bunch if it was a regular dict)
+        """
+        if not isinstance(config, Bunch):
+            config = Bunch(config)
+        errors = self.errors(config, coerce=coerce)
+        if errors:
+            raise ValidationError(errors)
+        return config
+
+
+_schemas = dict()
+_schemas_lock = threading.Lock()
+
+
+def _schema_key(spec):
+    """Hashable key of a schema spec: dict specs (e.g. from YAML) are keyed by their content"""
+    if isinstance(spec, Mapping):
+        return tuple((key, _schema_key(value)) for key, value in spec.items())
+    return spec
+
+
+def compile_schema(spec, allow_extra=False, separator='.'):
+    """Returns the Schema for spec, compiled once and cached
+
+    Parameters
+    ----------
+    spec : dataclass, TypedDict, dict or Schema
+        see Schema
+    allow_extra : bool, default is False
+    separator : str, default is '.'
+
+    Returns
+    -------
+    Schema
+    """
+    if isinstance(spec, Schema):
+        return spec
+    key = (_schema_key(spec), allow_extra, separator)
+    with _schemas_lock:
+        schema = _schemas.get(key)
+        if schema is None:
+            schema = _schemas[key] = Schema(spec, allow_extra=allow_extra, separator=separator)
+    return schema
+
+
+def load_schema(filepath, allow_extra=False):
+    """Reads a schema from a YAML file, e.g. `opt: {lr: float, optimizer: str}`, see Schema"""
+    from ruamel.yaml import YAML
+    with open(filepath, 'r') as f:
+        spec = YAML(typ='safe').load(f)
+    return compile_schema(spec, allow_extra=allow_extra)
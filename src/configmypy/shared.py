@@ -0,0 +1,144 @@
+# Share a resolved config between processes, through shared memory
+
+import atexit
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+from .snapshot import Snapshot, dump_snapshot
+
+# Written last, once the snapshot is complete
+READY = b'CMPYSHM1'
+_HEADER = struct.Struct('<8sQ')
+
+
+def _attach_untracked(name):
+    """Opens an existing shared memory block, without letting this process' resource tracker unlink it
+
+    Otherwise, a process attaching with its own resource tracker would destroy the block when it exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13
+        pass
+    from multiprocessing import resource_tracker
+    # The tracker is shared with the process that created the block (e.g. multiprocessing workers)
+    # when it was already running: that one is responsible for the block
+    own_tracker = getattr(resource_tracker._resource_tracker, '_fd', None) is None
+    block = shared_memory.SharedMemory(name=name)
+    if own_tracker and os.name == 'posix':
+        resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+
+class SharedConfig:
+    """A config published in shared memory by one process, and read by the others
+
+    The config is stored as a snapshot (see `configmypy.snapshot`):
+    attached processes read it in place, read-only, without running any step.
+    Values such as lists or typed arrays are decoded into new copies: modifying them does not modify the shared config.
+
+    Use `SharedConfig.publish` in the process resolving the config, and `SharedConfig.attach` in the others,
+    or directly `ConfigPipeline.read_conf_shared`.
+
+    Examples
+    --------
+    >>> # In the process resolving the config (e.g. rank 0)
+    >>> shared = SharedConfig.publish(pipe.read_conf(), 'my_job_config')
+    >>> # In the other processes
+    >>> with SharedConfig.attach('my_job_config') as shared:
+    ...     lr = shared.snapshot['opt.lr']
+    """
+    def __init__(self, block, owner=False):
+        self.block = block
+        self.owner = owner
+        _, size = _HEADER.unpack_from(block.buf)
+        self.snapshot = Snapshot(block.buf[_HEADER.size:_HEADER.size + size])
+
+    @property
+    def name(self):
+        return self.block.name
+
+    @classmethod
+    def publish(cls, config, name=None):
+        """Writes config in a new shared memory block
+
+        The block is unlinked when this process exits, or by calling `unlink`:
+        the other processes must attach before that.
+
+        Parameters
+        ----------
+        config : dict or Bunch
+        name : str, optional
+            name of the block, to attach to. By default, a random name is used (see the `name` attribute)
+
+        Returns
+        -------
+        SharedConfig
+        """
+        data = dump_snapshot(config)
+        block = shared_memory.SharedMemory(name=name, create=True, size=_HEADER.size + len(data))
+        block.buf[_HEADER.size:_HEADER.size + len(data)] = data
+        _HEADER.pack_into(block.buf, 0, bytes(len(READY)), len(data))
+        # Only mark the block as ready once complete
+        block.buf[:len(READY)] = READY
+        shared = cls(block, owner=True)
+        atexit.register(shared.unlink)
+        return shared
+
+    @classmethod
+    def attach(cls, name, timeout=60.0, interval=0.01):
+        """Attaches to the config published under name, waiting for it to be published
+
+        Parameters
+        ----------
+        name : str
+        timeout : float, default is 60.0
+            time to wait for the config to be published, in seconds
+        interval : float, default is 0.01
+            time between attempts, in seconds
+
+        Returns
+        -------
+        SharedConfig
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                block = _attach_untracked(name)
+                if bytes(block.buf[:len(READY)]) == READY:
+                    return cls(block)
+                block.close()
+            except (FileNotFoundError, ValueError):
+                # Not created yet, or still empty
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'No config was published as {name} after {timeout}s.')
+            time.sleep(interval)
+
+    def to_bunch(self):
+        """Returns the config as a Bunch"""
+        return self.snapshot.to_bunch()
+
+    def close(self):
+        """Detaches from the shared memory block"""
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+            self.block.close()
+
+    def unlink(self):
+        """Detaches from and destroys the shared memory block (for the process that published it)"""
+        self.close()
+        if self.owner:
+            self.owner = False
+            atexit.unregister(self.unlink)
+            self.block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,358 @@
+# Compact binary snapshot of a resolved config, read lazily from a memory-map
+#
+# Layout (little-endian):
+#   header  : magic, version, n_entries, and the offsets of the sections below
+#   entries : one record per leaf, in the order of the config:
+#             offset and length of its key in the keys blob, offset and length of its value, type of the value
+#   order   : the indices of the entries, sorted by key, to binary search the keys
+#   keys    : the flat keys (utf-8), with the levels separated by '\0'
+#   values  : the encoded values; identical strings are only stored once
+
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+from pathlib import Path
+
+from .bunch import Bunch
+from .utils import file_fingerprint, prefix_range
+from .yaml_config import YamlConfig
+
+MAGIC = b'CMPYSNAP'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sHHIQQQQ')
+_ENTRY = struct.Struct('<IIQIB')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+
+# Types of the values
+_NONE, _FALSE, _TRUE, _INT_TAG, _FLOAT_TAG, _STR, _EMPTY_DICT, _PICKLE = range(8)
+
+# Separates the levels of the flat keys: unlike '.', it cannot appear in a key
+_SEPARATOR = '\0'
+
+
+def _is_scalarbool(value):
+    """ruamel's ScalarBoolean subclasses int: only check for it if ruamel was imported"""
+    scalarbool = sys.modules.get('ruamel.yaml.scalarbool')
+    return scalarbool is not None and isinstance(value, scalarbool.ScalarBoolean)
+
+
+def _to_plain(value):
+    """Converts ruamel's types (CommentedSeq, ScalarFloat, etc) to the builtin ones, to pickle them"""
+    if isinstance(value, dict):
+        bunch = Bunch()
+        for key, nested_value in value.items():
+            dict.__setitem__(bunch, key, _to_plain(nested_value))
+        return bunch
+    if isinstance(value, list):
+        return [_to_plain(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_to_plain(v) for v in value)
+    if isinstance(value, bool) or _is_scalarbool(value):
+        return bool(value)
+    for builtin_type in (int, float, str):
+        if isinstance(value, builtin_type):
+            return builtin_type(value)
+    return value
+
+
+def _encode(value, strings):
+    """Returns the type and encoded value (or, for already stored strings, their offset)"""
+    if value is None:
+        return _NONE, b''
+    if isinstance(value, bool) or _is_scalarbool(value):
+        return (_TRUE if value else _FALSE), b''
+    if isinstance(value, int) and -2**63 <= value < 2**63:
+        return _INT_TAG, _INT.pack(value)
+    if isinstance(value, float):
+        return _FLOAT_TAG, _FLOAT.pack(value)
+    if isinstance(value, str):
+        return _STR, strings.get(value) or value.encode('utf-8')
+    if isinstance(value, dict) and not value:
+        return _EMPTY_DICT, b''
+    return _PICKLE, pickle.dumps(_to_plain(value), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _iter_leaves(config, prefix=()):
+    """Iterates over the (path, value) of the leaves of config. Empty dicts are leaves."""
+    for key, value in config.items():
+        if not isinstance(key, str):
+            raise ValueError(f'Only str keys can be stored in a snapshot, got {key!r} in {".".join(prefix)}.')
+        if _SEPARATOR in key:
+            # It would be read as a nested key
+            raise ValueError(f'Keys stored in a snapshot cannot contain "\\0", got {key!r} in {".".join(prefix)}.')
+        if isinstance(value, dict) and value:
+            yield from _iter_leaves(value, prefix + (key, ))
+        else:
+            yield prefix + (key, ), value
+
+
+def dump_snapshot(config):
+    """Encodes a (nested) config into the bytes of a snapshot
+
+    Parameters
+    ----------
+    config : dict or Bunch
+
+    Returns
+    -------
+    bytes
+    """
+    entries = []
+    keys = bytearray()
+    values = bytearray()
+    # Offset and length of the strings already stored
+    stored_strings = dict()
+    for path, value in _iter_leaves(config):
+        key = _SEPARATOR.join(path).encode('utf-8')
+        tag, encoded = _encode(value, stored_strings)
+        if isinstance(encoded, tuple):
+            value_offset, value_length = encoded
+        else:
+            value_offset, value_length = len(values), len(encoded)
+            values += encoded
+            if tag == _STR:
+                stored_strings[value] = (value_offset, value_length)
+        entries.append((key, len(keys), value_offset, value_length, tag))
+        keys += key
+
+    order = sorted(range(len(entries)), key=lambda i: entries[i][0])
+
+    entries_offset = _HEADER.size
+    order_offset = entries_offset + _ENTRY.size*len(entries)
+    keys_offset = order_offset + 4*len(entries)
+    values_offset = keys_offset + len(keys)
+
+    buffer = bytearray(_HEADER.pack(MAGIC, VERSION, 0, len(entries), entries_offset,
+                                    order_offset, keys_offset, values_offset))
+    for key, key_offset, value_offset, value_length, tag in entries:
+        buffer += _ENTRY.pack(key_offset, len(key), value_offset, value_length, tag)
+    buffer += struct.pack(f'<{len(order)}I', *order)
+    buffer += keys
+    buffer += values
+    return bytes(buffer)
+
+
+def write_snapshot(config, filepath):
+    """Writes config to a snapshot file, see `dump_snapshot`
+
+    The file is replaced atomically, so readers never see a partially written snapshot.
+    """
+    filepath = Path(filepath)
+    tmp_path = filepath.with_name(f'{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with tmp_path.open('wb') as f:
+            f.write(dump_snapshot(config))
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class _SortedKeys:
+    """The keys of a snapshot, in sorted order, decoded on access (to binary search them)"""
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return self.snapshot.n_entries
+
+    def __getitem__(self, i):
+        return self.snapshot._key(self.snapshot._order[i])
+
+
+class Snapshot:
+    """Read-only view of a snapshot, decoding only the keys read
+
+    Nested keys are read with dotted keys: the leaves are returned as is,
+    and the nested configs are built as a Bunch.
+    Looking up a key is a binary search over the sorted keys, the rest of the snapshot is not read.
+    Values other than None, bools, ints, floats and strings (e.g. lists or typed arrays) are pickled:
+    each read decodes a new copy, so modifying it does not modify the snapshot.
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        content of the snapshot, e.g. a memory-map of the file (see `Snapshot.open`)
+
+    Examples
+    --------
+    >>> write_snapshot(pipe.read_conf(), 'config.snap')
+    >>> # In each worker
+    >>> with Snapshot.open('config.snap') as snapshot:
+    ...     lr = snapshot['opt.lr']
+    """
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer)
+        (magic, version, _, self.n_entries, self._entries_offset,
+         order_offset, self._keys_offset, self._values_offset) = _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise ValueError('Not a configmypy snapshot.')
+        if version != VERSION:
+            raise ValueError(f'Unsupported snapshot version {version}, expected {VERSION}.')
+        order = self._buffer[order_offset:order_offset + 4*self.n_entries]
+        if sys.byteorder == 'little' and struct.calcsize('I') == 4:
+            # Read in place
+            self._order = order.cast('I')
+        else:
+            self._order = struct.unpack(f'<{self.n_entries}I', order)
+        self._sorted_keys = _SortedKeys(self)
+        self._mmap = None
+
+    @classmethod
+    def open(cls, filepath):
+        """Memory-maps a snapshot file"""
+        with open(filepath, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        snapshot = cls(buffer)
+        snapshot._mmap = buffer
+        return snapshot
+
+    def close(self):
+        if isinstance(self._order, memoryview):
+            self._order.release()
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _entry(self, i):
+        return _ENTRY.unpack_from(self._buffer, self._entries_offset + _ENTRY.size*i)
+
+    def _key(self, i):
+        key_offset, key_length, _, _, _ = self._entry(i)
+        start = self._keys_offset + key_offset
+        return str(self._buffer[start:start + key_length], 'utf-8')
+
+    def _value(self, i):
+        _, _, value_offset, value_length, tag = self._entry(i)
+        if tag == _NONE:
+            return None
+        elif tag == _FALSE:
+            return False
+        elif tag == _TRUE:
+            return True
+        elif tag == _EMPTY_DICT:
+            return Bunch()
+        start = self._values_offset + value_offset
+        if tag == _INT_TAG:
+            return _INT.unpack_from(self._buffer, start)[0]
+        elif tag == _FLOAT_TAG:
+            return _FLOAT.unpack_from(self._buffer, start)[0]
+        data = self._buffer[start:start + value_length]
+        if tag == _STR:
+            return str(data, 'utf-8')
+        return pickle.loads(data)
+
+    def _find(self, key, separator):
+        """Returns the entry of the leaf key, or the entries of the subtree key (None if missing)"""
+        if not key:
+            return None, []
+        key = key.replace(separator, _SEPARATOR)
+        start, end = prefix_range(self._sorted_keys, key)
+        if start == end:
+            return None, []
+        i = self._order[start]
+        if self._key(i) == key:
+            return i, []
+        start, end = prefix_range(self._sorted_keys, key + _SEPARATOR, start)
+        return None, sorted(self._order[start:end])
+
+    def get(self, key, default=None, separator='.'):
+        """Returns the value of a (dotted) key, a Bunch if it is a nested config
+
+        Parameters
+        ----------
+        key : str
+            e.g. 'opt.lr'
+        default : Object, default is None
+            returned if the key does not exist
+        separator : str, default is '.'
+        """
+        leaf, entries = self._find(key, separator)
+        if leaf is not None:
+            return self._value(leaf)
+        if not entries:
+            return default
+        return self._build(entries, prefix_length=key.count(separator) + 1)
+
+    def __getitem__(self, key):
+        value = self.get(key, default=_MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        leaf, entries = self._find(key, '.')
+        return leaf is not None or bool(entries)
+
+    def __len__(self):
+        return self.n_entries
+
+    def keys(self, separator='.'):
+        """Iterates over the flat keys of the leaves, in the order of the config"""
+        for i in range(self.n_entries):
+            yield self._key(i).replace(_SEPARATOR, separator)
+
+    def to_bunch(self):
+        """Decodes the whole config"""
+        return self._build(range(self.n_entries), prefix_length=0)
+
+    def _build(self, entries, prefix_length):
+        config = Bunch()
+        for i in entries:
+            *parents, last = self._key(i).split(_SEPARATOR)[prefix_length:]
+            node = config
+            for part in parents:
+                child = dict.get(node, part)
+                if child is None:
+                    child = Bunch()
+                    dict.__setitem__(node, part, child)
+                node = child
+            dict.__setitem__(node, last, self._value(i))
+        return config
+
+
+_MISSING = object()
+
+
+class SnapshotConfig(YamlConfig):
+    """Read a config from a snapshot file, in place of a YamlConfig
+
+    The files are resolved and read as by a YamlConfig (e.g. `fingerprint` and `prefetch` are the same),
+    only the parsing differs.
+
+    Parameters
+    ----------
+    config_file : str, default is None
+        snapshot file, written by `write_snapshot`
+    config_name : str, default is None
+        if given, only read that (dotted) nested config
+    config_folder : str, default is '.'
+    inplace : bool, default is False
+        if True, the config passed to `read_conf` is updated in place, if already a Bunch,
+        instead of being copied first.
+    """
+    def __init__(self, config_file=None, config_name=None, config_folder='.', inplace=False):
+        super().__init__(config_file=config_file, config_name=config_name, config_folder=config_folder,
+                         inplace=inplace)
+
+    def _load(self, filepath, config_name):
+        """Reads the (dotted) nested config config_name (or all) of the snapshot filepath as a new Bunch
+
+        Returns the config and the fingerprint of the file, see `YamlConfig._load`.
+        """
+        file_states = {filepath: file_fingerprint(filepath)}
+        with Snapshot.open(filepath) as snapshot:
+            if config_name is None:
+                return snapshot.to_bunch(), file_states
+            return snapshot[config_name], file_states
@@ -0,0 +1,141 @@
+# Expand hyperparameter sweeps over a base config
+
+import itertools
+import random
+
+from .bunch import Bunch
+from .interpolation import InterpolatingBunch, _raw_copy, interpolate
+
+SWEEP_MODES = ('grid', 'zip', 'random')
+
+
+def sweep_params(spec, mode='grid', n_samples=None, seed=None):
+    """Iterates over the values taken by the swept keys
+
+    Parameters
+    ----------
+    spec : dict
+        {dotted_key: values} for each swept key.
+        For mode='random', values can also be a callable, called as values(rng) to draw a value.
+    mode : {'grid', 'zip', 'random'}, default is 'grid'
+        * 'grid' : all the combinations of values (the last key changes fastest)
+        * 'zip' : the i-th values of all the keys together (all must have the same number of values)
+        * 'random' : n_samples random combinations
+    n_samples : int, optional
+        number of samples, required if mode='random'
+    seed : int, optional
+        seed of the random number generator, for mode='random'
+
+    Yields
+    ------
+    dict
+        {dotted_key: value}
+    """
+    keys = list(spec)
+    if mode == 'grid':
+        for values in itertools.product(*(spec[key] for key in keys)):
+            yield dict(zip(keys, values))
+    elif mode == 'zip':
+        lengths = {key: len(spec[key]) for key in keys}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f'In zip mode, all the keys should have the same number of values, got {lengths}.')
+        for values in zip(*(spec[key] for key in keys)):
+            yield dict(zip(keys, values))
+    elif mode == 'random':
+        if n_samples is None:
+            raise ValueError('n_samples should be given when mode="random".')
+        rng = random.Random(seed)
+        for _ in range(n_samples):
+            yield {key: spec[key](rng) if callable(spec[key]) else rng.choice(spec[key]) for key in keys}
+    else:
+        raise ValueError(f'Got mode={mode}, but it should be one of {SWEEP_MODES}.')
+
+
+def _shallow_copy(node):
+    if isinstance(node, Bunch):
+        copy = Bunch()
+        # Not Bunch.update, which would update the nested Bunch of node
+        dict.update(copy, node)
+        return copy
+    return dict(node)
+
+
+def with_values(base, values, separator='.'):
+    """Returns a copy of base with the given nested values, sharing the unchanged subtrees with base
+
+    Only the nested dicts on the path of the changed keys are copied (shallowly):
+    the rest of the config is the same objects as in base.
+
+    Parameters
+    ----------
+    base : Bunch
+    values : dict
+        {dotted_key: value}, missing intermediate levels are created
+    separator : str, default is '.'
+
+    Returns
+    -------
+    Bunch
+    """
+    config = _shallow_copy(base)
+    # Nested dicts already copied, by path
+    copies = dict()
+    for key, value in values.items():
+        *parents, last = key.split(separator)
+        node = config
+        for i, part in enumerate(parents):
+            path = tuple(parents[:i+1])
+            child = copies.get(path)
+            if child is None:
+                child = node.get(part)
+                child = _shallow_copy(child) if isinstance(child, dict) else Bunch()
+                node[part] = child
+                copies[path] = child
+            node = child
+        if isinstance(value, dict) and not isinstance(value, Bunch):
+            value = Bunch(value)
+        node[last] = value
+    return config
+
+
+def expand_sweep(base, spec, mode='grid', n_samples=None, seed=None, separator='.'):
+    """Lazily yields a config for each point of a sweep
+
+    .. warning::
+
+       The configs share their unchanged subtrees with base and with each other,
+       so building each only costs the keys changed, and memory stays flat however many are iterated over.
+       Do not modify them in place: set values on a `copy.deepcopy` of the config instead.
+
+    If base is an `configmypy.interpolation.InterpolatingBunch`, the swept values are set in its raw values,
+    and each config is interpolated again: references follow the swept values (e.g. '${data.batch_size}').
+    The configs are then complete copies, not sharing their subtrees.
+
+    Parameters
+    ----------
+    base : Bunch
+        config to start from
+    spec : dict
+        {dotted_key: values} for each swept key, see `sweep_params`
+    mode : {'grid', 'zip', 'random'}, default is 'grid'
+    n_samples : int, optional
+        number of samples, required if mode='random'
+    seed : int, optional
+    separator : str, default is '.'
+
+    Yields
+    ------
+    Bunch
+
+    Examples
+    --------
+    >>> for config in expand_sweep(base, {'opt.lr': [0.1, 0.01], 'data.batch_size': [16, 32]}):
+    ...     train(config)
+    """
+    if isinstance(base, InterpolatingBunch):
+        raw = _raw_copy(base)
+        for values in sweep_params(spec, mode=mode, n_samples=n_samples, seed=seed):
+            yield interpolate(with_values(raw, values, separator=separator), separator=base._resolver.separator)
+        return
+    for values in sweep_params(spec, mode=mode, n_samples=n_samples, seed=seed):
+        yield with_values(base, values, separator=separator)
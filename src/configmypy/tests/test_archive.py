@@ -0,0 +1,64 @@
+import logging
+import os
+import pickle
+
+from ..archive import ConfigArchive
+
+
+def write_run(folder, name, optimizer, batch_size, mtime_ns=None):
+    filepath = folder.joinpath(name, 'config.yaml')
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    filepath.write_text(f'default:\n  opt:\n    optimizer: {optimizer}\n  data:\n    batch_size: {batch_size}\n')
+    if mtime_ns is not None:
+        os.utime(filepath, ns=(mtime_ns, mtime_ns))
+
+
+def test_ConfigArchive(tmp_path):
+    for i, (optimizer, batch_size) in enumerate([('SGD', 8), ('SGD', 32), ('Adam', 32), ('SGD', 64)]):
+        write_run(tmp_path, f'run_{i}', optimizer, batch_size)
+    tmp_path.joinpath('broken.yaml').write_text('a: [')
+
+    archive = ConfigArchive(tmp_path, config_name='default', max_workers=2)
+    changes = archive.refresh()
+    assert len(changes.added) == 5 and len(archive) == 4 and list(archive.errors) == ['broken.yaml']
+    assert archive.query('opt.optimizer=SGD', 'data.batch_size>16') == ['run_1/config.yaml', 'run_3/config.yaml']
+    assert archive.query(('data.batch_size', lambda value: value == 32)) == ['run_1/config.yaml',
+                                                                              'run_2/config.yaml']
+    assert archive.query('opt.optimizer != "SGD"', 'missing.key=1') == []
+    assert archive.column('data.batch_size')['run_0/config.yaml'] == 8
+    assert archive.config('run_2/config.yaml') == {'opt': {'optimizer': 'Adam'}, 'data': {'batch_size': 32}}
+
+    # Only the files that changed are parsed again, from the saved index
+    write_run(tmp_path, 'run_0', 'Adam', 8, mtime_ns=1)
+    write_run(tmp_path, 'run_4', 'SGD', 128)
+    tmp_path.joinpath('run_3', 'config.yaml').unlink()
+    archive = ConfigArchive(tmp_path, config_name='default', max_workers=1)
+    assert len(archive) == 4
+    assert archive.refresh() == (['run_4/config.yaml'], ['run_0/config.yaml'], ['run_3/config.yaml'])
+    assert archive.query('opt.optimizer=SGD', 'data.batch_size>16') == ['run_1/config.yaml', 'run_4/config.yaml']
+    assert archive.refresh() == ([], [], [])
+
+    # Indexed with other options: indexed again
+    assert len(ConfigArchive(tmp_path, max_workers=1)) == 0
+
+
+class _Payload:
+    def __reduce__(self):
+        return os.system, ('exit 1', )
+
+
+def test_ConfigArchive_index(tmp_path, caplog):
+    # Values are parsed as YAML 1.2: 'yes' is a string
+    tmp_path.joinpath('config.yaml').write_text('flag: yes\nlr: 1e-3\n')
+    archive = ConfigArchive(tmp_path, max_workers=1)
+    archive.refresh()
+    assert archive.query('flag=yes', 'lr<0.01') == ['config.yaml']
+    assert ConfigArchive(tmp_path, max_workers=1).query('flag=yes') == ['config.yaml']
+
+    # Objects are never loaded from the index
+    with tmp_path.joinpath('.configmypy_archive.pickle').open('wb') as f:
+        pickle.dump((archive._options(), _Payload(), {}, {}), f)
+    with caplog.at_level(logging.WARNING):
+        archive = ConfigArchive(tmp_path, max_workers=1)
+    assert len(archive) == 0 and 'cannot be loaded' in caplog.text
+    assert archive.refresh().added == ['config.yaml']
@@ -1,3 +1,5 @@
+import pytest
+
 from ..argparse_config import ArgparseConfig
 from ..bunch import Bunch
 
@@ -52,3 +54,28 @@ def test_ArgparseConfig(monkeypatch):
     config['data'] = 0
     assert config == args
     assert kwargs == Bunch(dict(config_name='test'))
+
+    # Update the config in place
+    monkeypatch.setattr("sys.argv", ['test', '--data.batch_size', '24'])
+    config = Bunch(TEST_CONFIG_DICT['default'])
+    parser = ArgparseConfig(infer_types='fuzzy', inplace=True)
+    args, _ = parser.read_conf(config)
+    assert args is config
+    assert config.data.batch_size == 24
+
+
+def test_ArgparseConfig_lazy(monkeypatch):
+    # The lazy parsing gives the same config as argparse, including when falling back to it
+    for argv in [[], ['--data.batch_size', '24', '--opt.lr=-1e-3', '--data.test_resolutions', '[8, None]'],
+                 ['--opt.lr', '-1', '--opt.regularizer', 'False', '--config_name', 'test', '--opt.lr', '.5'],
+                 ['--data.batch', '24'], ['--data.dataset', '-']]:
+        monkeypatch.setattr("sys.argv", ['test'] + argv)
+        expected = ArgparseConfig(config_name=None).read_conf(Bunch(TEST_CONFIG_DICT['default']))
+        parser = ArgparseConfig(config_name=None, lazy=True)
+        assert parser.read_conf(Bunch(TEST_CONFIG_DICT['default'])) == expected
+
+    # Errors are reported by argparse
+    for argv in [['--help'], ['--unknown', '1'], ['--data.batch_size', 'a'], ['--opt.lr'], ['1']]:
+        monkeypatch.setattr("sys.argv", ['test'] + argv)
+        with pytest.raises(SystemExit):
+            ArgparseConfig(infer_types='strict', lazy=True).read_conf(Bunch(TEST_CONFIG_DICT['default']))
@@ -0,0 +1,55 @@
+import array
+from argparse import ArgumentTypeError
+
+import pytest
+
+from ..argparse_config import ArgparseConfig
+from ..arrays import pack_arrays, pack_sequence
+from ..bunch import Bunch
+from ..digest import digest
+from ..pipeline_config import ConfigPipeline
+from ..schema import compile_schema
+from ..type_inference import infer_array
+from ..yaml_config import YamlConfig
+
+
+def test_pack_arrays():
+    assert pack_sequence([1, 2, 3]) == array.array('q', [1, 2, 3])
+    assert pack_sequence([1, 2.5]) == array.array('d', [1.0, 2.5])
+    assert pack_sequence([1, True]) is None and pack_sequence([1, 'a']) is None
+    assert pack_sequence([2**70]) is None
+
+    config = Bunch({'weights': list(range(20)), 'short': [1, 2], 'names': ['a'] * 20, 'a': {'b': [0.5] * 20}})
+    config_digest = digest(config)
+    pack_arrays(config)
+    assert config.weights == array.array('q', range(20)) and config.short == [1, 2]
+    assert config.names == ['a'] * 20 and config.a.b.typecode == 'd'
+    assert digest(config) != config_digest
+
+    assert infer_array('[1, 2, 3.5]') == array.array('d', [1, 2, 3.5])
+    assert infer_array('None', strict=False) is None
+    with pytest.raises(ArgumentTypeError):
+        infer_array('["a"]')
+
+    # Validated without unpacking them
+    schema = compile_schema({'weights': 'list[float]', 'short': 'list[int]', 'names': list, 'a': {'b': 'list[int]'}})
+    assert [key for key, _ in schema.errors(config)] == ['a.b']
+    assert config.weights.typecode == 'd'
+
+
+def test_YamlConfig_arrays(tmp_path, monkeypatch):
+    tmp_path.joinpath('config.yaml').write_text(
+        f'weights: {list(range(100))}\nmilestones: [10, 20]\nopt:\n  betas: {[0.9] * 16}\n')
+    monkeypatch.setattr("sys.argv", ['test', '--weights', str(list(range(50)))])
+    for engine in ['rt', 'safe']:
+        pipe = ConfigPipeline([YamlConfig('config.yaml', config_folder=tmp_path, engine=engine, arrays=True),
+                               ArgparseConfig(lazy=True)])
+        config = pipe.read_conf()
+        assert config.weights == array.array('q', range(50))
+        assert config.opt.betas == array.array('d', [0.9] * 16) and config.milestones == [10, 20]
+    for lazy in [False, True]:
+        config, _ = ArgparseConfig(infer_types=False, lazy=lazy).read_conf({'weights': array.array('q', [0])})
+        assert config.weights == array.array('q', range(50))
+
+    with pytest.raises(ValueError):
+        YamlConfig('config.yaml', arrays='list')
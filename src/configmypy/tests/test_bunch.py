@@ -1,4 +1,10 @@
+import pickle
+from copy import deepcopy
+
 from ..bunch import Bunch
+from .. import digest as digest_module
+from ..digest import cached_digest, digest, hexdigest
+from ..utils import MISSING, del_dotted, diff_nested_dicts, flat_index, flat_items, get_dotted, set_dotted
 
 def test_bunch():
     """Test for Bunch
@@ -16,3 +22,79 @@ def test_bunch():
     bunch.update(dict(a=dict(b=5)))
     assert bunch.a.b == 5
     assert bunch.a.c == 4 #You still here?
+
+
+def test_bunch_dotted():
+    """Test for the dotted access and (cached) flat index of Bunch"""
+    bunch = Bunch(dict(a=dict(b=3, c=dict(d=4)), e=5))
+    assert get_dotted(bunch, 'a.c.d') == 4
+    assert get_dotted(bunch, 'a.x.d', 'missing') == 'missing'
+    set_dotted(bunch, 'a.c.d', 6)
+    assert bunch.a.c.d == 6
+    set_dotted(bunch, 'f.g', 7)
+    assert bunch.f.g == 7 and isinstance(bunch.f, Bunch)
+    del_dotted(bunch, 'f.g')
+    assert bunch.f == {}
+
+    index = flat_index(bunch)
+    assert list(index) == ['a.b', 'a.c.d', 'e']
+    # Setting leaves keeps the index
+    bunch.a.c.d = 8
+    assert flat_index(bunch) is index
+    assert dict(flat_items(bunch)) == {'a.b': 3, 'a.c.d': 8, 'e': 5}
+    # Changing the structure of a nested Bunch invalidates it
+    bunch.a.c.h = 9
+    assert dict(flat_items(bunch)) == {'a.b': 3, 'a.c.d': 8, 'a.c.h': 9, 'e': 5}
+    bunch.a.pop('c')
+    assert dict(flat_items(bunch)) == {'a.b': 3, 'e': 5}
+    bunch.a.c = dict(d=1)
+    assert dict(flat_items(bunch)) == {'a.b': 3, 'a.c.d': 1, 'e': 5}
+    # A Bunch shared by several configs invalidates all of them
+    other = Bunch(dict(x=1))
+    other.a = bunch.a
+    assert list(flat_index(other)) == ['x', 'a.b', 'a.c.d'] and flat_index(bunch)
+    bunch.a.k = 2
+    assert 'a.k' in flat_index(other) and 'a.k' in flat_index(bunch)
+    del bunch.a['k']
+    # Regular dicts are not cached
+    bunch.a.c['d'] = dict(x=1)
+    assert dict(flat_items(bunch)) == {'a.b': 3, 'a.c.d.x': 1, 'e': 5}
+
+    # Copies still work
+    assert deepcopy(bunch) == bunch
+    assert pickle.loads(pickle.dumps(bunch)).a.c['d']['x'] == 1
+
+
+def test_bunch_digest(mocker):
+    """Test for the Merkle digests of Bunch"""
+    bunch = Bunch(dict(a=dict(b=3, c=dict(d=4)), e=[1, 2], f='text'))
+    bunch_digest = digest(bunch)
+    assert len(bunch_digest) == 16 and hexdigest(bunch) == bunch_digest.hex()
+    # The order of the keys does not matter, the types do
+    assert digest(Bunch(dict(f='text', e=[1, 2], a=dict(c=dict(d=4), b=3)))) == bunch_digest
+    assert digest(Bunch(dict(a=dict(b=3.0, c=dict(d=4)), e=[1, 2], f='text'))) != bunch_digest
+    # Stable across copies and processes
+    assert digest(deepcopy(bunch)) == bunch_digest
+    assert digest(pickle.loads(pickle.dumps(bunch))) == bunch_digest
+
+    # Only the subtrees on the path of a change are hashed again
+    spy = mocker.spy(digest_module, 'digest')
+    assert digest_module.digest(bunch) == bunch_digest
+    assert spy.call_count == 1
+    bunch.a.b = 5
+    assert digest_module.digest(bunch) != bunch_digest
+    # bunch, bunch.a and bunch.a.c (cached)
+    assert spy.call_count == 4
+    bunch.a.b = 3
+    assert digest(bunch) == bunch_digest
+
+    other = deepcopy(bunch)
+    other.a.c.d = 5
+    other.g = 1
+    spy.reset_mock()
+    assert diff_nested_dicts(bunch, other, digests=True) == {'a.c.d': (4, 5), 'g': (MISSING, 1)}
+    assert cached_digest(bunch.a.c) is not None
+    # Regular dicts cannot be tracked
+    bunch.h = dict(i=1)
+    digest(bunch)
+    assert cached_digest(bunch) is None
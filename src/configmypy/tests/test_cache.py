@@ -0,0 +1,89 @@
+import os
+
+from ..cache import ParseCache
+from ..yaml_config import YamlConfig, parse_to_bunch
+from ..bunch import Bunch
+
+
+TEST_CONFIG_FILE = """\
+default:
+  opt:
+    optimizer: 'adam'
+    lr: 0.1
+  data:
+    dataset: 'ns'
+    batch_size: 12
+
+test:
+  opt:
+    optimizer: 'SGD'
+"""
+
+
+def test_ParseCache(tmp_path):
+    """Test for ParseCache
+
+    We make sure files are only parsed again if they changed
+    """
+    filepath = tmp_path.joinpath('config.yaml')
+    filepath.write_text(TEST_CONFIG_FILE)
+    cache_dir = tmp_path.joinpath('cache')
+    cache = ParseCache(cache_dir=cache_dir)
+
+    n_calls = []
+    def parse(content):
+        n_calls.append(1)
+        return parse_to_bunch(content)
+
+    res = cache.get(filepath.as_posix(), parse)
+    assert isinstance(res, Bunch)
+    assert res.default.opt.lr == 0.1
+    cache.get(filepath.as_posix(), parse)
+    assert len(n_calls) == 1
+
+    # Touching the file without changing it does not trigger a parse
+    os.utime(filepath, ns=(0, 0))
+    cache.get(filepath.as_posix(), parse)
+    assert len(n_calls) == 1
+
+    # Another process (new cache) reuses the entry saved on disk
+    other_cache = ParseCache(cache_dir=cache_dir)
+    assert other_cache.get(filepath.as_posix(), parse) == res
+    assert len(n_calls) == 1
+
+    # Entries in a folder others can write to are not unpickled
+    cache_dir.chmod(0o777)
+    assert ParseCache(cache_dir=cache_dir).get(filepath.as_posix(), parse) == res
+    assert len(n_calls) == 2
+    cache_dir.chmod(0o700)
+
+    # Changing the file invalidates the entry
+    filepath.write_text(TEST_CONFIG_FILE.replace('0.1', '0.2'))
+    assert cache.get(filepath.as_posix(), parse).default.opt.lr == 0.2
+    assert len(n_calls) == 3
+
+    # Loaded values can be modified without corrupting the cache
+    config = cache.load(filepath.as_posix(), parse)
+    config.default.opt.lr = 1
+    assert cache.get(filepath.as_posix(), parse).default.opt.lr == 0.2
+
+    # Size-bounded eviction
+    small_cache = ParseCache(max_entries=1, cache_dir=tmp_path.joinpath('small'), max_disk_bytes=0)
+    small_cache.get(filepath.as_posix(), parse)
+    small_cache.get(filepath.as_posix(), parse, key='other')
+    assert len(small_cache._entries) == 1
+    assert not list(tmp_path.joinpath('small').glob('*.pkl'))
+
+
+def test_YamlConfig_cache(tmp_path):
+    filepath = tmp_path.joinpath('config.yaml')
+    filepath.write_text(TEST_CONFIG_FILE)
+    cache = ParseCache()
+
+    reader = YamlConfig('config.yaml', config_name='default', config_folder=tmp_path, cache=cache)
+    config, _ = reader.read_conf()
+    assert config == YamlConfig('config.yaml', config_name='default', config_folder=tmp_path).read_conf()[0]
+
+    config.opt.lr = 1
+    config, _ = reader.read_conf()
+    assert config.opt.lr == 0.1
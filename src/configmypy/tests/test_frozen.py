@@ -0,0 +1,54 @@
+import array
+import pickle
+
+import pytest
+
+from ..bunch import Bunch
+from ..frozen import FrozenConfig, freeze
+
+
+def test_freeze():
+    bunch = Bunch({'opt': {'lr': 0.1, 'optimizer': 'adam'},
+                   'data': {'batch_size': 12, 'sizes': [16, 32], 'a-b': 1, 'items': 2}})
+    config = freeze(bunch)
+    assert isinstance(config, FrozenConfig) and isinstance(config.opt, FrozenConfig)
+    assert config.opt.lr == 0.1 and config['opt']['optimizer'] == 'adam'
+    assert config.data.sizes == (16, 32)
+    # Keys that cannot be attributes are only accessible as items
+    assert config.data['a-b'] == 1 and config.data['items'] == 2
+    assert config.get_dotted('data.batch_size') == 12
+    assert list(config) == ['opt', 'data'] and len(config.data) == 4
+    assert 'opt' in config and 'missing' not in config
+    with pytest.raises(KeyError):
+        config['missing']
+
+    # Slotted: no dict per node
+    assert not hasattr(config.opt, '__dict__')
+    with pytest.raises(TypeError):
+        config.opt.lr = 1
+    with pytest.raises(TypeError):
+        config.new_key = 1
+
+    # Classes are cached by keys
+    assert type(freeze({'lr': 1, 'optimizer': 'SGD'})) is type(config.opt)
+    assert type(freeze({'optimizer': 'SGD', 'lr': 1})) is not type(config.opt)
+
+    assert config == freeze(bunch) and hash(config) == hash(freeze(bunch))
+    assert config.opt == {'lr': 0.1, 'optimizer': 'adam'}
+    assert pickle.loads(pickle.dumps(config)) == config
+
+    thawed = config.thaw()
+    assert isinstance(thawed, Bunch) and isinstance(thawed.opt, Bunch)
+    assert thawed == bunch
+
+    # Typed arrays are copied into read-only views, and thawed into writable copies
+    weights = array.array('d', [0.5, 1.0])
+    config = freeze({'weights': weights, 'layers': [weights]})
+    weights[0] = 0.0
+    assert config.weights == array.array('d', [0.5, 1.0]) and config.layers[0].readonly
+    with pytest.raises(TypeError):
+        config.weights[0] = 0.0
+    assert pickle.loads(pickle.dumps(config)) == config
+    thawed = config.thaw()
+    thawed.weights[0] = 0.0
+    assert thawed.weights == weights and config.weights[0] == 0.5
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+import configmypy
+
+
+def test_lazy_imports():
+    """Importing configmypy (e.g. for Bunch) should not import ruamel or argparse"""
+    code = ('import sys, configmypy; from configmypy.utils import iter_nested_dict_flat; '
+            'configmypy.Bunch(dict(a=1)); '
+            'print(any(name.startswith("ruamel") for name in sys.modules), "argparse" in sys.modules)')
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)})
+    assert res.stdout.split() == ['False', 'False']
+
+    # Nor does creating a pipeline import asyncio or the thread pools, only used to read the files concurrently
+    code = ('import sys; from configmypy import ConfigPipeline; ConfigPipeline([]); '
+            'print("asyncio" in sys.modules, "concurrent.futures" in sys.modules)')
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)})
+    assert res.stdout.split() == ['False', 'False']
+
+    # The classes are still available as attributes
+    from ..yaml_config import YamlConfig
+    assert configmypy.YamlConfig is YamlConfig
+    assert 'ConfigPipeline' in dir(configmypy)
@@ -0,0 +1,70 @@
+import pickle
+from copy import deepcopy
+
+import pytest
+
+from ..bunch import Bunch
+from ..interpolation import InterpolatingBunch, InterpolationError, _Resolver, interpolate, resolve
+from ..utils import flat_index, flat_items
+from ..argparse_config import ArgparseConfig
+from ..pipeline_config import ConfigPipeline
+from ..yaml_config import YamlConfig
+
+
+def test_interpolate(mocker):
+    config = interpolate({'data': {'batch_size': 32, 'name': 'ns'},
+                          'eval': {'batch_size': '${data.batch_size}', 'data': '${data}'},
+                          'path': '/data/${data.name}/${eval.batch_size}',
+                          'unchanged': 1})
+    assert isinstance(config.eval, InterpolatingBunch)
+    assert config.eval.batch_size == 32 and config['eval']['batch_size'] == 32
+    assert config.get('path') == '/data/ns/32'
+    assert config.eval.data is config.data
+    assert flat_index(config) and dict(flat_items(config))['path'] == '/data/ns/32'
+
+    # Memoized, and only resolved again when a referenced value changes
+    spy = mocker.spy(_Resolver, 'value')
+    assert config.path == '/data/ns/32' and config.eval.batch_size == 32
+    # Without checking the references again, until the config is modified
+    assert spy.call_count == 0
+    memo = dict(config._resolver.memo)
+    config.unchanged = 2
+    assert config.path == '/data/ns/32'
+    assert config._resolver.memo['path'] is memo['path']
+    config.data.batch_size = 64
+    assert config.eval.batch_size == 64
+    assert config.path == '/data/ns/64'
+    assert config._resolver.memo['eval.batch_size'] is not memo['eval.batch_size']
+
+    # New sub-configs can also have references
+    config.model = {'batch_size': '${eval.batch_size}'}
+    assert config.model.batch_size == 64
+
+    resolved = resolve(config)
+    assert type(resolved) is Bunch and type(resolved.eval) is Bunch
+    assert resolved.path == '/data/ns/64' and resolved.eval.data == {'batch_size': 64, 'name': 'ns'}
+
+    assert deepcopy(config).path == '/data/ns/64'
+    assert pickle.loads(pickle.dumps(config)).path == '/data/ns/64'
+    assert pickle.loads(pickle.dumps(config.eval)).batch_size == 64
+
+    config = interpolate({'a': '${b}', 'b': '${c.d}', 'c': {'d': '${a}'}})
+    with pytest.raises(InterpolationError, match='Cyclic'):
+        config.a
+    with pytest.raises(InterpolationError, match='Cyclic'):
+        resolve(config)
+    config = interpolate({'e': '${missing}'})
+    with pytest.raises(InterpolationError, match='missing'):
+        config.e
+    with pytest.raises(InterpolationError, match='missing'):
+        resolve(config)
+
+
+def test_ConfigPipeline_interpolate(tmp_path, monkeypatch):
+    tmp_path.joinpath('config.yaml').write_text(
+        'data:\n  batch_size: 32\neval_batch_size: ${data.batch_size}\n')
+    monkeypatch.setattr("sys.argv", ['test', '--data.batch_size', '64'])
+    pipe = ConfigPipeline([YamlConfig('config.yaml', config_folder=tmp_path),
+                           ArgparseConfig(infer_types='fuzzy')], interpolate=True)
+    config = pipe.read_conf()
+    assert config.eval_batch_size == 64
@@ -0,0 +1,80 @@
+import array
+import threading
+
+import pytest
+
+from ..frozen import FrozenConfig
+from ..live_config import LiveConfig
+from ..pipeline_config import ConfigPipeline
+from ..yaml_config import YamlConfig
+
+
+def test_LiveConfig():
+    live = LiveConfig({'a': 0, 'b': {'c': 0}})
+    version = live.current()
+    assert isinstance(version.config, FrozenConfig) and version.generation == 0
+    with pytest.raises(TypeError):
+        live.config.a = 1
+
+    # Readers always see consistent versions, without locking
+    stop = threading.Event()
+    inconsistent = []
+
+    def read():
+        while not stop.is_set():
+            config = live.config
+            if config.a != config.b.c:
+                inconsistent.append(config)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for i in range(1, 201):
+        config = {'a': i, 'b': {'c': i}}
+        assert live.publish(config).generation == i
+        # Published versions are copies
+        config['a'] = -1
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert not inconsistent and live.config.a == 200 and live.generation == 200
+
+    def increment(config):
+        config.a += 1
+        return config
+    threads = [threading.Thread(target=live.update, args=(increment, )) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert live.config.a == 210 and live.generation == 210
+
+    assert live.wait(210, timeout=0.01) is None
+    threading.Timer(0.01, live.publish, args=({'a': 0}, )).start()
+    assert live.wait(210, timeout=10).config == {'a': 0}
+
+
+def test_LiveConfig_from_pipeline(tmp_path):
+    tmp_path.joinpath('config.yaml').write_text('opt:\n  lr: 0.1\n')
+    pipe = ConfigPipeline([YamlConfig('config.yaml', config_folder=tmp_path)])
+    live = LiveConfig.from_pipeline(pipe, watch=True, backend='polling', interval=0.01, debounce=0.01)
+    try:
+        assert live.config.opt.lr == 0.1 and live.generation == 0
+        tmp_path.joinpath('config.yaml').write_text('opt:\n  lr: 0.01\n')
+        assert live.wait(0, timeout=10).config.opt.lr == 0.01
+    finally:
+        live.watcher.stop()
+
+
+def test_LiveConfig_mutable_values():
+    live = LiveConfig({'weights': array.array('d', [0.5, 1.0]), 'tags': {'a'}})
+    previous = live.config
+
+    def modify(config):
+        config.weights[0] = 0.0
+        config.tags.add('b')
+        return config
+    live.update(modify)
+    # The previous version is not modified
+    assert previous.weights == array.array('d', [0.5, 1.0]) and previous.tags == {'a'}
+    assert live.config.weights[0] == 0.0 and live.config.tags == {'a', 'b'}
@@ -1,3 +1,6 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from ..bunch import Bunch
 from ..yaml_config import YamlConfig
 from ..argparse_config import ArgparseConfig
@@ -54,3 +57,107 @@ def test_ConfigPipeline(mocker, monkeypatch):
     config = pipe.read_conf()
     
     assert config == true_config
+
+    # Steps updating the config in place should give the same config
+    pipe = ConfigPipeline([
+                            YamlConfig('./config.yaml', config_name='default'),
+                            ArgparseConfig(config_file=None, config_name=None, infer_types='fuzzy'),
+                            YamlConfig()
+                            ], inplace=True)
+    assert all(step.inplace for step in pipe.steps)
+    config = pipe.read_conf()
+    assert config == true_config
+    assert config is pipe.steps[0].config
+
+
+def test_ConfigPipeline_incremental(tmp_path, mocker, monkeypatch):
+    """Only the steps whose inputs changed, and the following ones, should be run again"""
+    tmp_path.joinpath('config.yaml').write_text(TEST_CONFIG_FILE)
+    tmp_path.joinpath('other.yaml').write_text('opt:\n  optimizer: SGD\n')
+    monkeypatch.setattr("sys.argv", ['test', '--data.batch_size', '24'])
+
+    steps = [YamlConfig('config.yaml', config_name='default', config_folder=tmp_path),
+             ArgparseConfig(infer_types='fuzzy'),
+             YamlConfig('other.yaml', config_folder=tmp_path)]
+    spies = [mocker.spy(step, 'read_conf') for step in steps]
+    pipe = ConfigPipeline(steps, incremental=True)
+
+    config = pipe.read_conf()
+    assert config.data.batch_size == 24 and config.opt.optimizer == 'SGD'
+    assert [spy.call_count for spy in spies] == [1, 1, 1]
+
+    # Nothing changed: the cached config is returned
+    config.opt.optimizer = 'changed'
+    assert pipe.read_conf().opt.optimizer == 'SGD'
+    assert [spy.call_count for spy in spies] == [1, 1, 1]
+
+    # The last file changed
+    tmp_path.joinpath('other.yaml').write_text('opt:\n  optimizer: adamw\n')
+    assert pipe.read_conf().opt.optimizer == 'adamw'
+    assert [spy.call_count for spy in spies] == [1, 1, 2]
+
+    # The command-line changed
+    monkeypatch.setattr("sys.argv", ['test', '--data.batch_size', '32'])
+    config = pipe.read_conf()
+    assert config.data.batch_size == 32 and config.opt.optimizer == 'adamw'
+    assert [spy.call_count for spy in spies] == [1, 2, 3]
+
+
+def test_ConfigPipeline_concurrent(tmp_path, mocker, monkeypatch):
+    """Reading the files concurrently should give the same config as reading them sequentially"""
+    tmp_path.joinpath('config.yaml').write_text(TEST_CONFIG_FILE)
+    tmp_path.joinpath('cluster.yaml').write_text('data:\n  batch_size: 64\n')
+    monkeypatch.setattr("sys.argv", ['test', '--opt.lr', '0.01', '--config_file', 'config.yaml',
+                                     '--config_name', 'test'])
+
+    def make_steps():
+        return [YamlConfig('config.yaml', config_name='default', config_folder=tmp_path),
+                YamlConfig('cluster.yaml', config_folder=tmp_path),
+                ArgparseConfig(config_file=None, config_name=None, infer_types='fuzzy'),
+                YamlConfig(config_folder=tmp_path)]
+
+    true_config = ConfigPipeline(make_steps()).read_conf()
+    assert true_config.data.batch_size == 64 and true_config.opt.optimizer == 'SGD'
+
+    steps = make_steps()
+    spies = [mocker.spy(step, 'prefetch') for step in steps if hasattr(step, 'prefetch')]
+    config = ConfigPipeline(steps, max_workers=4).read_conf()
+    assert config == true_config
+    # The last file is only known once the command-line was read
+    assert [spy.spy_return is not None for spy in spies] == [True, True, False]
+    assert all(step._prefetched is None for step in steps if hasattr(step, 'prefetch'))
+
+    config = asyncio.run(ConfigPipeline(make_steps()).aread_conf())
+    assert config == true_config
+
+    # A file changed after being prefetched is read again
+    reader = YamlConfig('cluster.yaml', config_folder=tmp_path)
+    with ThreadPoolExecutor(1) as executor:
+        reader.prefetch(executor).result()
+    tmp_path.joinpath('cluster.yaml').write_text('data:\n  batch_size: 128\n')
+    config, _ = reader.read_conf()
+    assert config.data.batch_size == 128
+
+
+def test_ConfigPipeline_instrument(tmp_path, monkeypatch, capsys):
+    tmp_path.joinpath('config.yaml').write_text(TEST_CONFIG_FILE)
+    monkeypatch.setattr("sys.argv", ['test', '--data.batch_size', '24'])
+
+    pipe = ConfigPipeline([YamlConfig('config.yaml', config_name='default', config_folder=tmp_path),
+                           ArgparseConfig(infer_types='fuzzy')])
+    pipe.read_conf()
+    assert pipe.stats == []
+
+    pipe = ConfigPipeline([YamlConfig('config.yaml', config_name='default', config_folder=tmp_path),
+                           ArgparseConfig(infer_types='fuzzy')], trace_memory=True)
+    calls = []
+    pipe.add_hook(before=lambda i, step, config, kwargs: calls.append(('before', i, config is None)),
+                  after=lambda i, step, config, stats: calls.append(('after', i, stats.n_keys)))
+    pipe.read_conf()
+    assert calls == [('before', 0, True), ('after', 0, 7), ('before', 1, False), ('after', 1, 7)]
+    assert len(pipe.stats) == 2
+    assert all(stats.wall_time > 0 and stats.memory is not None and not stats.reused for stats in pipe.stats)
+    assert pipe.stats[0].step.startswith('YamlConfig')
+
+    pipe.log()
+    assert 'wall (ms)' in capsys.readouterr().out
@@ -0,0 +1,111 @@
+from copy import deepcopy
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Optional, TypedDict
+
+import pytest
+
+from ..bunch import Bunch
+from ..interpolation import interpolate
+from ..pipeline_config import ConfigPipeline
+from ..schema import ValidationError, compile_schema, load_schema
+from ..yaml_config import YamlConfig
+
+
+@dataclass
+class Opt:
+    lr: float
+    optimizer: Literal['SGD', 'Adam'] = 'SGD'
+    betas: List[float] = field(default_factory=lambda: [0.9, 0.999])
+
+
+@dataclass
+class Experiment:
+    opt: Opt
+    name: str
+    seed: Optional[int] = None
+    extra: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class Model:
+    opt: Opt = field(default_factory=lambda: Opt(lr=0.1))
+    scheduler: Optional[Opt] = None
+
+
+class Data(TypedDict, total=False):
+    batch_size: int
+
+
+def test_schema():
+    schema = compile_schema(Experiment)
+    assert compile_schema(Experiment) is schema
+
+    config = schema.validate({'opt': {'lr': 1, 'betas': [1, 0.99]}, 'name': 'ns', 'extra': {'a': 1}})
+    assert config == {'opt': {'lr': 1.0, 'optimizer': 'SGD', 'betas': [1.0, 0.99]},
+                      'name': 'ns', 'seed': None, 'extra': {'a': 1}}
+    assert type(config.opt.lr) is float and type(config.opt.betas[0]) is float
+    assert schema.validate(config) is config
+
+    # All the violations are reported at once
+    with pytest.raises(ValidationError) as error:
+        schema.validate({'opt': {'lr': 'fast', 'optimizer': 'Adagrad', 'betas': [0.9, 'a']},
+                         'seed': True, 'extra': {'a': 'b'}, 'unknown': 1})
+    assert dict(error.value.errors) == {
+        'opt.lr': "expected float, got 'fast'",
+        'opt.optimizer': "expected one of ['SGD', 'Adam'], got 'Adagrad'",
+        'opt.betas': "item 1: expected float, got 'a'",
+        'seed': 'expected Optional[int], got True',
+        'extra': "key 'a': expected int, got 'b'",
+        'unknown': 'unexpected key',
+        'name': 'missing required key'}
+    assert compile_schema(Experiment, allow_extra=True).errors(
+        Bunch({'opt': {'lr': 0.1}, 'name': 'ns', 'unknown': 1})) == []
+
+    # Sub-configs that are not dicts are reported, without checking their keys
+    schema = compile_schema(Model)
+    for value in [None, 5]:
+        with pytest.raises(ValidationError) as error:
+            schema.validate({'opt': value})
+        assert error.value.errors == [('opt', f'expected a sub-config, got {value}')]
+    with pytest.raises(ValidationError):
+        compile_schema({'opt': {'lr': 'float?'}}).validate({'opt': None})
+    # Optional sub-configs can be None
+    assert schema.validate({'opt': {'lr': 1}})['scheduler'] is None
+    assert schema.validate({'opt': {'lr': 1}, 'scheduler': None})['scheduler'] is None
+    assert schema.validate({'opt': {'lr': 1}, 'scheduler': {'lr': 0.2}}).scheduler == {
+        'lr': 0.2, 'optimizer': 'SGD', 'betas': [0.9, 0.999]}
+    with pytest.raises(ValidationError) as error:
+        schema.validate({'opt': {'lr': 1}, 'scheduler': {'lr': 'fast'}})
+    assert [key for key, _ in error.value.errors] == ['scheduler.lr']
+
+    # TypedDict and dict (e.g. YAML) schemas
+    schema = compile_schema({'data': Data, 'sizes': 'list[int]', 'dropout': 'float?'})
+    assert schema is compile_schema({'data': Data, 'sizes': 'list[int]', 'dropout': 'float?'})
+    assert schema.validate({'data': {}, 'sizes': [1, 2]}) == {'data': {}, 'sizes': [1, 2], 'dropout': None}
+    assert [key for key, _ in schema.errors(Bunch({'data': 3, 'sizes': [0.5]}))] == ['data', 'sizes']
+
+    # References are validated once resolved, and kept, their values are coerced when resolved
+    config = interpolate({'opt': {'lr': '${base_lr}'}, 'name': 'ns', 'base_lr': 1})
+    compile_schema(Experiment, allow_extra=True).validate(config)
+    assert config.opt.lr == 1 and type(config.opt.lr) is float
+    assert dict.__getitem__(config.opt, 'lr') == '${base_lr}'
+    config.base_lr = 2
+    assert config.opt.lr == 2 and type(config.opt.lr) is float
+    assert type(deepcopy(config).opt.lr) is float
+    config.base_lr = 'fast'
+    with pytest.raises(ValidationError) as error:
+        config.opt.lr
+    assert error.value.errors == [('opt.lr', "expected float, got 'fast'")]
+
+
+def test_ConfigPipeline_schema(tmp_path):
+    tmp_path.joinpath('config.yaml').write_text('opt:\n  lr: 1\nname: ns\n')
+    tmp_path.joinpath('schema.yaml').write_text('opt:\n  lr: float\n  optimizer: str?\nname: str\n')
+    schema = load_schema(tmp_path.joinpath('schema.yaml'))
+    pipe = ConfigPipeline([YamlConfig('config.yaml', config_folder=tmp_path)], schema=schema)
+    config = pipe.read_conf()
+    assert type(config.opt.lr) is float
+
+    tmp_path.joinpath('config.yaml').write_text('opt:\n  lr: 1\n')
+    with pytest.raises(ValidationError, match='name: missing required key'):
+        pipe.read_conf()
@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+
+import pytest
+
+from ..pipeline_config import ConfigPipeline
+from ..shared import SharedConfig
+from ..yaml_config import YamlConfig
+
+
+def read_shared_config(name, queue):
+    # The file does not exist: reading it would fail
+    pipe = ConfigPipeline([YamlConfig('missing.yaml', config_folder='/nonexistent')])
+    config = pipe.read_conf_shared(name, publish=False, timeout=30)
+    queue.put(config)
+
+
+def test_read_conf_shared(tmp_path, monkeypatch):
+    tmp_path.joinpath('config.yaml').write_text('opt:\n  lr: 0.1\n  optimizer: adam\ndata:\n  sizes: [16, 32]\n')
+    monkeypatch.setattr("sys.argv", ['test'])
+    name = f'configmypy_test_{os.getpid()}'
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    # The workers start before the config is published, and wait for it
+    workers = [context.Process(target=read_shared_config, args=(name, queue)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+
+    pipe = ConfigPipeline([YamlConfig('config.yaml', config_folder=tmp_path)])
+    config = pipe.read_conf_shared(name, publish=True)
+    try:
+        results = [queue.get(timeout=30) for _ in workers]
+        for worker in workers:
+            worker.join(timeout=30)
+            assert worker.exitcode == 0
+    finally:
+        pipe.shared.unlink()
+
+    assert all(result == config for result in results)
+    assert results[0].data.sizes == [16, 32]
+
+    with pytest.raises(TimeoutError):
+        SharedConfig.attach(name, timeout=0.05)
+
+
+def test_SharedConfig():
+    shared = SharedConfig.publish({'a': {'b': 1}, 'c': 'text'})
+    with SharedConfig.attach(shared.name, timeout=1) as attached:
+        assert attached.snapshot['a.b'] == 1
+        assert attached.to_bunch() == {'a': {'b': 1}, 'c': 'text'}
+    shared.unlink()
@@ -0,0 +1,88 @@
+import array
+
+import pytest
+
+from ..bunch import Bunch
+from ..pipeline_config import ConfigPipeline
+from ..snapshot import Snapshot, SnapshotConfig, dump_snapshot, write_snapshot
+from ..yaml_config import YamlConfig
+
+
+TEST_CONFIG_FILE = """\
+opt:
+  optimizer: adam
+  lr: 0.1
+  use_amp: true
+data:
+  dataset: ns
+  batch_size: 12
+  test_batch_sizes: [16, 32]
+  transforms: {}
+  name: ns
+  seed: null
+opt_other: 1
+"""
+
+
+def test_Snapshot(tmp_path, monkeypatch):
+    tmp_path.joinpath('config.yaml').write_text(TEST_CONFIG_FILE)
+    # Round-trip types from ruamel are stored as builtin types
+    config, _ = YamlConfig('config.yaml', config_folder=tmp_path).read_conf()
+    write_snapshot(config, tmp_path.joinpath('config.snap'))
+
+    with Snapshot.open(tmp_path.joinpath('config.snap')) as snapshot:
+        assert len(snapshot) == 10
+        assert snapshot['opt.lr'] == 0.1 and type(snapshot['opt.lr']) is float
+        assert snapshot['opt.use_amp'] is True
+        assert snapshot['data.test_batch_sizes'] == [16, 32]
+        assert snapshot['data.transforms'] == {} and snapshot['data.seed'] is None
+        assert snapshot['opt_other'] == 1
+        assert snapshot['opt'] == {'optimizer': 'adam', 'lr': 0.1, 'use_amp': True}
+        assert isinstance(snapshot['opt'], Bunch)
+        assert 'data.dataset' in snapshot and 'data.missing' not in snapshot
+        assert snapshot.get('missing', 'default') == 'default'
+        with pytest.raises(KeyError):
+            snapshot['opt.missing']
+        with pytest.raises(KeyError):
+            snapshot['']
+
+        loaded = snapshot.to_bunch()
+        assert loaded == config
+        assert list(loaded) == list(config) and list(loaded.data) == list(config.data)
+        assert list(snapshot.keys())[:2] == ['opt.optimizer', 'opt.lr']
+
+    # The sorted keys are little-endian whatever the platform
+    monkeypatch.setattr('sys.byteorder', 'big')
+    with Snapshot.open(tmp_path.joinpath('config.snap')) as snapshot:
+        assert snapshot['opt.lr'] == 0.1 and snapshot['data.seed'] is None
+    monkeypatch.undo()
+
+    # Identical strings are stored once
+    assert len(dump_snapshot({'a': 'x'*100, 'b': 'x'*100})) < len(dump_snapshot({'a': 'x'*100, 'b': 'y'*100}))
+
+    # Typed arrays are decoded into a new copy on each read: modifying it does not modify the snapshot
+    snapshot = Snapshot(dump_snapshot({'weights': array.array('d', [0.5, 1.0])}))
+    snapshot['weights'][0] = 0.0
+    assert snapshot['weights'] == array.array('d', [0.5, 1.0])
+
+    with pytest.raises(ValueError):
+        dump_snapshot({1: 'a'})
+    with pytest.raises(ValueError):
+        dump_snapshot({'a': {'b\0c': 1}})
+    with pytest.raises(ValueError):
+        Snapshot(b'not a snapshot' + bytes(100))
+
+
+def test_SnapshotConfig(tmp_path, monkeypatch):
+    tmp_path.joinpath('config.yaml').write_text(TEST_CONFIG_FILE)
+    monkeypatch.setattr("sys.argv", ['test'])
+    config = ConfigPipeline([YamlConfig('config.yaml', config_folder=tmp_path)]).read_conf()
+    write_snapshot(config, tmp_path.joinpath('config.snap'))
+
+    pipe = ConfigPipeline([SnapshotConfig('config.snap', config_folder=tmp_path)])
+    assert pipe.read_conf() == config
+
+    step = SnapshotConfig('config.snap', config_name='data', config_folder=tmp_path)
+    data, _ = step.read_conf(Bunch({'data': {'batch_size': 4}, 'other': 1}))
+    assert data == Bunch({'data': {'batch_size': 4}, 'other': 1, **config.data})
+    assert step.fingerprint() is not None
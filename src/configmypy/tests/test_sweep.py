@@ -0,0 +1,76 @@
+import pytest
+
+from ..bunch import Bunch
+from ..pipeline_config import ConfigPipeline
+from ..schema import ValidationError
+from ..yaml_config import YamlConfig
+from ..sweep import expand_sweep, sweep_params, with_values
+
+
+def test_sweep_params():
+    spec = {'a': [1, 2], 'b.c': ['x', 'y', 'z']}
+    grid = list(sweep_params(spec))
+    assert len(grid) == 6
+    assert grid[0] == {'a': 1, 'b.c': 'x'} and grid[1] == {'a': 1, 'b.c': 'y'}
+
+    zipped = list(sweep_params({'a': [1, 2], 'b.c': ['x', 'y']}, mode='zip'))
+    assert zipped == [{'a': 1, 'b.c': 'x'}, {'a': 2, 'b.c': 'y'}]
+    with pytest.raises(ValueError):
+        list(sweep_params(spec, mode='zip'))
+
+    samples = list(sweep_params({'a': [1, 2], 'lr': lambda rng: rng.uniform(0, 1)},
+                                mode='random', n_samples=5, seed=0))
+    assert len(samples) == 5
+    assert all(s['a'] in (1, 2) and 0 <= s['lr'] <= 1 for s in samples)
+    assert samples == list(sweep_params({'a': [1, 2], 'lr': lambda rng: rng.uniform(0, 1)},
+                                        mode='random', n_samples=5, seed=0))
+
+    with pytest.raises(ValueError):
+        list(sweep_params(spec, mode='random'))
+    with pytest.raises(ValueError):
+        list(sweep_params(spec, mode='unknown'))
+
+
+def test_expand_sweep():
+    base = Bunch({'opt': {'lr': 0.1, 'optimizer': 'adam'},
+                  'data': {'batch_size': 12, 'dataset': {'name': 'ns', 'n': 100}}})
+    configs = list(expand_sweep(base, {'opt.lr': [0.01, 0.001], 'data.batch_size': [16, 32]}))
+    assert len(configs) == 4
+    assert [(c.opt.lr, c.data.batch_size) for c in configs] == [(0.01, 16), (0.01, 32), (0.001, 16), (0.001, 32)]
+    assert all(isinstance(c.opt, Bunch) and c.opt.optimizer == 'adam' for c in configs)
+
+    # The base is unchanged and the unchanged subtrees are shared
+    assert base.opt.lr == 0.1 and base.data.batch_size == 12
+    assert all(c.data.dataset is base.data.dataset for c in configs)
+    assert all(c.opt is not base.opt for c in configs)
+
+    # Missing keys are created
+    config = with_values(base, {'model.n_layers': 4, 'model.head': {'dim': 8}})
+    assert config.model.n_layers == 4 and config.model.head.dim == 8
+    assert 'model' not in base
+
+
+def test_ConfigPipeline_sweep(tmp_path, mocker, monkeypatch):
+    tmp_path.joinpath('config.yaml').write_text('opt:\n  lr: 0.1\n')
+    monkeypatch.setattr("sys.argv", ['test'])
+    step = YamlConfig('config.yaml', config_folder=tmp_path)
+    spy = mocker.spy(step, 'read_conf')
+    configs = ConfigPipeline([step]).sweep({'opt.lr': [1, 2, 3]})
+    assert [c.opt.lr for c in configs] == [1, 2, 3]
+    # The file is only read once
+    assert spy.call_count == 1
+
+
+def test_ConfigPipeline_sweep_interpolate(tmp_path, monkeypatch):
+    tmp_path.joinpath('config.yaml').write_text(
+        'data:\n  batch_size: 32\nbs: ${data.batch_size}\neval:\n  batch_size: ${data.batch_size}\n')
+    monkeypatch.setattr("sys.argv", ['test'])
+    pipe = ConfigPipeline([YamlConfig('config.yaml', config_folder=tmp_path)], interpolate=True,
+                          schema={'data': {'batch_size': 'int'}, 'bs': 'float', 'eval': {'batch_size': 'int'}})
+    configs = list(pipe.sweep({'data.batch_size': [8, 16]}))
+    assert [(c.bs, c.eval.batch_size) for c in configs] == [(8, 8), (16, 16)]
+    assert all(type(c.bs) is float for c in configs)
+
+    # Each variant is validated
+    with pytest.raises(ValidationError):
+        list(pipe.sweep({'data.batch_size': ['a']}))
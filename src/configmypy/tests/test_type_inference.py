@@ -0,0 +1,49 @@
+from argparse import ArgumentTypeError
+
+import pytest
+from ruamel.yaml import YAML
+
+from ..type_inference import TypeInferencer, get_type_inferencer, iterable_helper
+from ..type_inference import infer_boolean, infer_iterable, infer_numeric, infer_str
+
+
+def test_TypeInferencer():
+    """Plain Python types and ruamel's types should be inferred the same way"""
+    ruamel_config = YAML().load('a: 0.1\nb: 1\nc: true\nd: [1, 2]\ne: text\n')
+    plain_config = {'a': 0.1, 'b': 1, 'c': True, 'd': [1, 2], 'e': 'text'}
+    true_callables = {'a': infer_numeric, 'b': infer_numeric, 'c': infer_boolean,
+                      'd': infer_iterable, 'e': infer_str}
+
+    for config in [ruamel_config, plain_config]:
+        for key, value in config.items():
+            assert TypeInferencer(type(value)).type_callable is true_callables[key]
+
+    assert TypeInferencer(type(None)).type_callable is infer_str
+    assert TypeInferencer(float, strict=False)('0.5') == 0.5
+    assert TypeInferencer(bool, strict=False)('False') is False
+
+
+def test_infer_numeric():
+    for var, res in [('12', 12), ('-3', -3), ('+4', 4), ('0.5', 0.5), ('-1.5e-3', -1.5e-3),
+                     ('1e5', 1e5), ('.5', 0.5), ('1.', 1.), ('None', None)]:
+        assert infer_numeric(var) == res
+        assert type(infer_numeric(var)) is type(res)
+    assert infer_numeric('1.2.3', strict=False) == '1.2.3'
+    with pytest.raises(ArgumentTypeError):
+        infer_numeric('a.b', strict=True)
+
+
+def test_get_type_inferencer():
+    assert get_type_inferencer(int, strict=True) is get_type_inferencer(int, strict=True)
+    assert get_type_inferencer(int, strict=True) is not get_type_inferencer(int, strict=False)
+    assert get_type_inferencer(int, strict=False)('-2') == -2
+
+    # Already parsed values are kept as is
+    assert iterable_helper([1, 2.5, [None, 3]], infer_numeric) == [1, 2.5, [None, 3]]
+    assert iterable_helper((1, True), infer_numeric, strict=False) == (1, 'True')
+    assert iterable_helper([1, 'a'], infer_str) == ['1', 'a']
+
+    # Lists are parsed in bulk as json when possible, with literal_eval otherwise
+    assert infer_iterable('[1, 2.5, [3]]') == [1, 2.5, [3]]
+    assert infer_iterable("[8, None, 'a']") == [8, None, 'a']
+    assert infer_iterable('(1, 2)') == (1, 2)
@@ -1,5 +1,7 @@
 from ..utils import iter_nested_dict_flat
 from ..utils import update_nested_dict_from_flat
+from ..utils import trim_overwritten_nested_keys, prefix_range
+from ..utils import diff_nested_dicts, MISSING
 from ..bunch import Bunch
 
 
@@ -30,3 +32,31 @@ def test_update_nested_dict_from_flat():
     update_nested_dict_from_flat(test, 'g', 'cool')
     assert test.g == 'cool'
     
+
+def test_trim_overwritten_nested_keys():
+    """Test for trim_overwritten_nested_keys
+    """
+    flat_config = {'data': 0, 'data.size': 3, 'data.sub': 1, 'data.sub.a': 2, 'dataset': 'ns',
+                   'mlp': 1, 'mlp.in_features': 64, 'mlp.out_features': 128, 'mlp-2': None}
+    trim_overwritten_nested_keys(flat_config)
+    assert flat_config == {'data': 0, 'dataset': 'ns', 'mlp.in_features': 64, 'mlp.out_features': 128, 'mlp-2': None}
+    assert list(flat_config) == ['data', 'dataset', 'mlp.in_features', 'mlp.out_features', 'mlp-2']
+
+    assert prefix_range(['a', 'a b', 'a.b', 'a.c', 'ab'], 'a.') == (2, 4)
+
+def test_diff_nested_dicts():
+    """Test for diff_nested_dicts
+    """
+    shared = dict(x=1)
+    old = dict(a=dict(b=3, c=4), d=5, e=dict(f=1), s=shared)
+    new = dict(a=dict(b=3, c=6), d=dict(g=2), e=0, h=1, s=shared)
+    assert diff_nested_dicts(old, new) == {'a.c': (4, 6), 'd': (5, MISSING), 'd.g': (MISSING, 2),
+                                           'e.f': (1, MISSING), 'e': (MISSING, 0), 'h': (MISSING, 1)}
+    assert diff_nested_dicts(old, old) == {}
+    assert diff_nested_dicts(dict(a=1), dict(a=1.0)) == {'a': (1, 1.0)}
+
+    # Values are compared as by the digests, whether they were computed or not
+    from ruamel.yaml.scalarfloat import ScalarFloat
+    old = Bunch(dict(a=dict(b=[1, 2], c=ScalarFloat(0.5)), d=True))
+    new = Bunch(dict(a=dict(b=(1, 2), c=0.5), d=1))
+    assert diff_nested_dicts(old, new) == diff_nested_dicts(old, new, digests=True) == {'d': (True, 1)}
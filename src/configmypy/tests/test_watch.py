@@ -0,0 +1,45 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from ..yaml_config import YamlConfig
+from ..pipeline_config import ConfigPipeline
+
+
+TEST_CONFIG_FILE = """\
+opt:
+  optimizer: 'adam'
+  lr: 0.1
+"""
+
+backends = ['polling'] + (['inotify'] if sys.platform.startswith('linux') else [])
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_ConfigWatcher(tmp_path, backend):
+    filepath = tmp_path.joinpath('config.yaml')
+    filepath.write_text(TEST_CONFIG_FILE)
+    pipe = ConfigPipeline([YamlConfig('config.yaml', config_folder=tmp_path)])
+    pipe.read_conf()
+
+    calls = []
+    reloaded = threading.Event()
+    def callback(config, changes):
+        calls.append(changes)
+        reloaded.set()
+
+    with pipe.watch(callback, interval=0.05, debounce=0.2, backend=backend) as watcher:
+        assert watcher.subscribers == [callback]
+        # Several quick writes only trigger one reload
+        for lr in [0.2, 0.3, 0.4]:
+            filepath.write_text(TEST_CONFIG_FILE.replace('0.1', str(lr)))
+            time.sleep(0.02)
+        assert reloaded.wait(timeout=10)
+        time.sleep(0.3)
+
+    assert calls == [{'opt.lr': (0.1, 0.4)}]
+    assert pipe.config.opt.lr == 0.4
+    # Already stopped
+    watcher.stop()
@@ -1,5 +1,13 @@
+from pathlib import Path
+
+import pytest
+
 from ..yaml_config import YamlConfig
+from ..cache import ParseCache
+from ..loaders import index_sections, load_rt, load_safe, load_section
 from ..bunch import Bunch
+from ..pipeline_config import ConfigPipeline
+from ..watch import watched_files
 
 
 TEST_CONFIG_FILE = """\
@@ -34,3 +42,117 @@ def test_YamlConfig(mocker):
     new_config, _ = reader.read_conf(config)
     true_config.opt.optimizer = 'SGD'
     assert new_config == true_config
+
+
+def test_YamlConfig_engines(tmp_path):
+    """All the engines should read the same config"""
+    tmp_path.joinpath('config.yaml').write_text(TEST_CONFIG_FILE + '  lr: 1e-3\n')
+    true_config = Bunch(TEST_CONFIG_DICT['test'])
+    true_config['lr'] = 1e-3
+
+    for engine in ['rt', 'safe', 'auto']:
+        reader = YamlConfig('config.yaml', config_name='test', config_folder=tmp_path, engine=engine)
+        config, _ = reader.read_conf()
+        assert config == true_config
+        assert isinstance(config.lr, float)
+
+    tmp_path.joinpath('config.json').write_text('{"test": {"opt": {"optimizer": "SGD"}, "lr": 0.001}}')
+    tmp_path.joinpath('config.toml').write_text('[test]\nlr = 0.001\n[test.opt]\noptimizer = "SGD"\n')
+    for config_file in ['config.json', 'config.toml']:
+        reader = YamlConfig(config_file, config_name='test', config_folder=tmp_path, engine='auto')
+        config, _ = reader.read_conf()
+        assert config == true_config
+
+
+def test_yaml_engines_scalars():
+    """The yaml engines all follow YAML 1.2, where e.g. yes is a string and 010 is 10"""
+    from ruamel.yaml import YAML
+    content = 'a: yes\nb: off\nc: 010\nd: 1:20\ne: 0o10\nf: 0x1F\ng: 1_000\nh: TRUE\ni: 1e-3\nj: -.5\nk: ~\n'
+    expected = {'a': 'yes', 'b': 'off', 'c': 10, 'd': '1:20', 'e': 8, 'f': 31, 'g': 1000,
+                'h': True, 'i': 1e-3, 'j': -0.5, 'k': None}
+    for load in [load_rt, load_safe, YAML(typ='safe', pure=True).load]:
+        config = dict(load(content))
+        assert config == expected
+        # e.g. not True == 1
+        assert all(isinstance(config[key], type(value)) and isinstance(config[key], bool) == isinstance(value, bool)
+                   for key, value in expected.items())
+
+
+def test_YamlConfig_section_only(tmp_path):
+    """Reading only a section should give the same result as reading the whole file"""
+    content = '# Configs\nname: "é"\n' + TEST_CONFIG_FILE + 'other: [1, 2]\nlast:\n- 1\n- 2\n'
+    tmp_path.joinpath('config.yaml').write_text(content, encoding='utf-8')
+    tmp_path.joinpath('anchors.yaml').write_text('base: &base\n  a: 1\nderived:\n  <<: *base\n  b: 2\n')
+
+    for config_file, config_names in [('config.yaml', ['default', 'test']), ('anchors.yaml', ['base', 'derived'])]:
+        for config_name in config_names:
+            reader = YamlConfig(config_file, config_name=config_name, config_folder=tmp_path)
+            true_config = reader.read_conf()[0]
+            for engine in ['rt', 'safe']:
+                for cache in [False, ParseCache()]:
+                    reader = YamlConfig(config_file, config_name=config_name, config_folder=tmp_path,
+                                        engine=engine, section_only=True, cache=cache)
+                    section_index = reader._section_index
+                    assert reader.read_conf()[0] == true_config
+                    # Without cache, the index of the sections is not shared, and created before reading any file
+                    assert (section_index is not None) == (cache is False)
+                    assert reader._section_index is section_index
+
+
+def test_index_sections():
+    content = 'a: 1\nb:\n  c: [1, 2]\n  d: 3\n'
+    sections = index_sections(content)
+    assert list(sections) == ['a', 'b']
+    start, end, column = sections['b']
+    assert content[start:end].strip() == 'c: [1, 2]\n  d: 3'
+    assert column == 2
+    assert index_sections('- 1\n- 2\n') is None
+
+    content = 'a: "é"\nb: [1, 2]\nc:\n- 1\n- 2\n'
+    assert load_section(content, 'a') == 'é'
+    assert load_section(content, 'b') == [1, 2]
+    assert load_section(content, 'c', engine='safe') == [1, 2]
+
+
+def test_YamlConfig_includes(tmp_path, mocker):
+    """Files can include other files, each parsed once"""
+    tmp_path.joinpath('common').mkdir()
+    tmp_path.joinpath('common', 'base.yaml').write_text('opt:\n  optimizer: adam\n  lr: 0.1\nseed: 0\n')
+    tmp_path.joinpath('common', 'data.yaml').write_text(
+        'includes: [base.yaml]\nsmall:\n  batch_size: 8\nlarge:\n  batch_size: 64\n')
+    tmp_path.joinpath('config.yaml').write_text(
+        'default:\n'
+        '  includes:\n'
+        '    - common/base.yaml\n'
+        '    - common/data.yaml: large\n'
+        '    - common/data.yaml\n'
+        '  opt:\n'
+        '    lr: 0.01\n')
+
+    reader = YamlConfig('config.yaml', config_name='default', config_folder=tmp_path, include_key='includes')
+    spy = mocker.spy(reader, '_load_file')
+    config, _ = reader.read_conf()
+    assert config == {'opt': {'optimizer': 'adam', 'lr': 0.01}, 'seed': 0, 'batch_size': 64,
+                      'small': {'batch_size': 8}, 'large': {'batch_size': 64}}
+    # Each file is parsed once
+    assert sorted(call.args[0].split('/')[-1] for call in spy.call_args_list) == ['base.yaml', 'config.yaml', 'data.yaml']
+    assert [Path(filepath).name for filepath in reader.filepaths] == ['config.yaml', 'base.yaml', 'data.yaml']
+    assert watched_files(ConfigPipeline([reader])) == reader.filepaths
+
+    # Incremental pipelines reuse the config until an included file changes
+    pipe = ConfigPipeline([reader], incremental=True)
+    pipe.read_conf()
+    spy = mocker.spy(reader, 'read_conf')
+    pipe.read_conf()
+    pipe.read_conf()
+    assert spy.call_count == 0
+    tmp_path.joinpath('common', 'base.yaml').write_text('opt:\n  optimizer: SGD\n')
+    assert pipe.read_conf().opt.optimizer == 'SGD' and spy.call_count == 1
+
+    tmp_path.joinpath('common', 'base.yaml').write_text('includes: data.yaml\n')
+    with pytest.raises(ValueError, match='Cyclic include'):
+        reader.read_conf()
+
+    # Without include_key, the includes are regular values
+    config, _ = YamlConfig('data.yaml', config_folder=tmp_path.joinpath('common')).read_conf()
+    assert config.includes == ['base.yaml']
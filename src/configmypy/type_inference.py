@@ -1,14 +1,16 @@
 # Infer types of argparse arguments intelligently
 
+import array
+import json
+import re
+import sys
 from argparse import ArgumentTypeError
 from ast import literal_eval
+from functools import lru_cache
 from typing import Callable
 
-# import custom Yaml types to handle sequences
-from ruamel.yaml import CommentedSeq, CommentedMap
-from ruamel.yaml.scalarfloat import ScalarFloat
-from ruamel.yaml.scalarint import ScalarInt
-from ruamel.yaml.scalarbool import ScalarBoolean
+_INT_PATTERN = re.compile(r'[+-]?[0-9]+')
+_FLOAT_PATTERN = re.compile(r'[+-]?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+)(?:[eE][+-]?[0-9]+)?')
 
 
 def infer_boolean(var, strict: bool=True):
@@ -21,11 +23,12 @@ def infer_boolean(var, strict: bool=True):
     ----------
     var: input from parser.args
     """
-    if var.lower() == 'true':
+    lower_var = var.lower()
+    if lower_var == 'true':
         return True
-    elif var.lower() == 'false':
+    elif lower_var == 'false':
         return False
-    elif var.lower() == 'None':
+    elif lower_var == 'None':
         return None
     elif strict:
         raise ArgumentTypeError()
@@ -34,13 +37,11 @@ def infer_boolean(var, strict: bool=True):
 
 def infer_numeric(var, strict: bool=True):
     # int if possible -> float -> NoneType -> Err
-    if var.isnumeric():
+    # Handles signs and scientific notation, e.g. -1, 1.5e-3
+    if _INT_PATTERN.fullmatch(var):
         return int(var)
-    elif '.' in list(var):
-        decimal_left_right = var.split('.')
-        if len(decimal_left_right) == 2:
-            if sum([x.isnumeric() for x in decimal_left_right]) == 2: # True, True otherwise False
-                return float(var)
+    elif _FLOAT_PATTERN.fullmatch(var):
+        return float(var)
     elif var.lower() == 'none':
         return None
     elif strict:
@@ -62,10 +63,22 @@ def infer_str(var, strict:bool=True):
     else:
         return str(var)
 
+def _reject_constant(constant):
+    raise ValueError(f'{constant} is not a Python literal')
+
+
 def infer_iterable(var, strict: bool=True, inner_type: Callable=None):
     # Use ast.literal_eval to parse the iterable tree,
     # then use custom type handling to infer the inner types
-    raw_ast_iter = literal_eval(var)
+    # Lists written as json (e.g. long lists of numbers) are parsed in bulk with the much faster json parser
+    raw_ast_iter = None
+    if var.startswith('['):
+        try:
+            raw_ast_iter = json.loads(var, parse_constant=_reject_constant)
+        except ValueError:
+            pass
+    if raw_ast_iter is None:
+        raw_ast_iter = literal_eval(var)
     if inner_type is not None:
         return iterable_helper(raw_ast_iter, inner_type, strict)
     else:
@@ -74,18 +87,103 @@ def infer_iterable(var, strict: bool=True, inner_type: Callable=None):
         return raw_ast_iter
     
 
+def infer_array(var, strict: bool=True, backend: str='array'):
+    """
+    parse a list of numbers as a typed array (see configmypy.arrays), in bulk:
+    lists written as json are parsed by the json parser, without converting each value to str
+
+    var: str input, e.g. '[1, 2, 3]'
+    strict: if False, values that are not lists of numbers are returned as parsed (e.g. None)
+    backend: 'array' for array.array, 'numpy' for numpy arrays
+    """
+    from .arrays import pack_sequence
+    values = infer_iterable(var, strict)
+    if isinstance(values, (list, tuple)):
+        packed = pack_sequence(values, backend=backend)
+        if packed is None:
+            # Not only numbers: infer the type of each value, e.g. None
+            values = iterable_helper(values, infer_numeric, strict)
+            packed = pack_sequence(values, backend=backend)
+        if packed is not None:
+            return packed
+    if strict:
+        raise ArgumentTypeError()
+    return values
+
+def infer_ndarray(var, strict: bool=True):
+    return infer_array(var, strict, backend='numpy')
+
+
+# Values (parsed by literal_eval) that would be returned unchanged by an inference function
+# These are kept as is instead of being converted back to str and parsed again
+_PASSTHROUGH_TYPES = {
+    infer_numeric: (int, float, type(None)),
+    infer_boolean: (bool, ),
+    infer_str: (str, ),
+}
+
+
 def iterable_helper(var, inner_type: Callable, strict: bool=True):
     """
     recursively loop through iterable and apply custom type
     callables to each inner variable to conform to strictness
     """
-    if isinstance(var, list):
-        return [iterable_helper(x,inner_type, strict) for x in var]
-    elif isinstance(var, tuple):
-        return tuple([iterable_helper(x,inner_type, strict) for x in var])
+    return _coerce_iterable(var, inner_type, strict, _PASSTHROUGH_TYPES.get(inner_type, ()))
+
+
+def _coerce_iterable(var, inner_type, strict, passthrough_types):
+    if isinstance(var, (list, tuple)):
+        res = [x if type(x) in passthrough_types else _coerce_iterable(x, inner_type, strict, passthrough_types)
+               for x in var]
+        return res if isinstance(var, list) else tuple(res)
     else:
-        return inner_type(str(var),strict)
-    
+        return inner_type(str(var), strict)
+
+
+# Compiled dispatch table from types to their inference function
+# New types (e.g. ruamel's) are added the first time they are seen, from their MRO
+_TYPE_CALLABLES = {
+    str: infer_str,
+    type(None): infer_str,
+    bool: infer_boolean,
+    int: infer_numeric,
+    float: infer_numeric,
+    tuple: infer_iterable,
+    list: infer_iterable,
+    dict: infer_iterable,
+    array.array: infer_array,
+}
+
+
+def _get_type_callable(orig_type):
+    """Returns the inference function for orig_type, or None if there is none
+
+    ruamel's custom Yaml types are subclasses of the builtin ones
+    (CommentedSeq of list, CommentedMap of dict, ScalarFloat of float, ScalarInt of int),
+    so they are handled without importing ruamel, except ScalarBoolean, which subclasses int:
+    it is only looked up if ruamel was already imported, otherwise no value can be of that type.
+    Likewise for numpy arrays.
+    """
+    try:
+        return _TYPE_CALLABLES[orig_type]
+    except (KeyError, TypeError):
+        pass
+    if not isinstance(orig_type, type):
+        return None
+
+    scalarbool = sys.modules.get('ruamel.yaml.scalarbool')
+    if scalarbool is not None:
+        _TYPE_CALLABLES.setdefault(scalarbool.ScalarBoolean, infer_boolean)
+    numpy = sys.modules.get('numpy')
+    if numpy is not None:
+        _TYPE_CALLABLES.setdefault(numpy.ndarray, infer_ndarray)
+
+    for base in orig_type.__mro__:
+        if base in _TYPE_CALLABLES:
+            _TYPE_CALLABLES[orig_type] = _TYPE_CALLABLES[base]
+            return _TYPE_CALLABLES[base]
+    return None
+
 
 class TypeInferencer(object):
     def __init__(self, orig_type: Callable, strict: bool=True):
@@ -114,15 +212,11 @@ class TypeInferencer(object):
             self.orig_type = orig_type
         self.strict = strict
         
-        if self.orig_type == str or self.orig_type == type(None):
-            self.type_callable = infer_str
-        elif self.orig_type == bool or self.orig_type == ScalarBoolean:
-            self.type_callable = infer_boolean
-        elif self.orig_type == float or self.orig_type == int or self.orig_type == ScalarFloat or self.orig_type == ScalarInt:
-            self.type_callable = infer_numeric
-        elif self.orig_type == tuple or self.orig_type == list or self.orig_type == CommentedMap or self.orig_type == CommentedSeq:
-            self.type_callable = infer_iterable
-        else:
+        # Subclasses are handled like their base type so plain Python types
+        # (e.g. from a safe yaml loader or json) and ruamel's types (CommentedSeq, ScalarFloat, etc)
+        # are handled the same way
+        self.type_callable = _get_type_callable(self.orig_type)
+        if self.type_callable is None:
             self.type_callable = self.orig_type
 
     def __call__(self, var):
@@ -136,3 +230,17 @@ class TypeInferencer(object):
     
     def __repr__(self):
         return f"TypeInferencer[{self.orig_type}]"
+
+
+@lru_cache(maxsize=None)
+def get_type_inferencer(orig_type: Callable, strict: bool=True):
+    """Returns a TypeInferencer for orig_type, shared by all the keys of that type
+
+    Parameters
+    ----------
+    orig_type : Callable type
+        type of original var from config
+    strict : bool, default True
+        see TypeInferencer
+    """
+    return TypeInferencer(orig_type, strict=strict)
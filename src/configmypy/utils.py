@@ -1,4 +1,11 @@
-from .bunch import Bunch
+import logging
+import os
+from bisect import bisect_left
+
+from .bunch import Bunch, _cache, _set_flat
+from .digest import _canonical_bytes, cached_digest, digest
+
+logger = logging.getLogger(__name__)
 
 
 def iter_nested_dict_flat(d, separator='.', return_intermediate_keys=False):
@@ -17,18 +24,48 @@ def iter_nested_dict_flat(d, separator='.', return_intermediate_keys=False):
     Yields
     ------
     nested_key, value
+
+    Notes
+    -----
+    For a Bunch, the flattened keys are cached, see `flat_index`.
     """
+    if isinstance(d, Bunch) and not return_intermediate_keys:
+        yield from flat_items(d, separator)
+        return
+
     for key, value in d.items():
         if isinstance(value, dict):
             if return_intermediate_keys:
                 yield key, 1
-            for nested_key, nested_value in iter_nested_dict_flat(value, separator=separator):
+            if isinstance(value, Bunch):
+                nested_items = flat_items(value, separator)
+            else:
+                nested_items = _iter_flat(value, separator)
+            for nested_key, nested_value in nested_items:
                 yield f'{key}{separator}{nested_key}', nested_value
 
         else:
             yield key, value
 
 
+def _iter_flat(d, separator):
+    """Iterates over the flattened leaves of a nested dict
+
+    The prefix of each level is only built once, rather than for each leaf.
+    """
+    stack = [(iter(d.items()), None)]
+    while stack:
+        items, prefix = stack[-1]
+        for key, value in items:
+            flat_key = key if prefix is None else f'{prefix}{key}'
+            if isinstance(value, dict):
+                stack.append((iter(value.items()), f'{flat_key}{separator}'))
+                break
+            yield flat_key, value
+        else:
+            stack.pop()
+
+
 def update_nested_dict_from_flat(nested_dict, key, value, separator='.'):
     """Updates inplace a nested dict using a flattened key with nesting represented by a separator
     
@@ -39,11 +76,288 @@ def update_nested_dict_from_flat(nested_dict, key, value, separator='.'):
     value : Object
     separator : str, default is '.'
     """
-    keys = key.split(separator, 1)
-    if len(keys) == 1:
-        nested_dict[keys[0]] = value
-    else:
-        k, rest = keys
-        update_nested_dict_from_flat(nested_dict[k], rest, value, separator=separator)
+    *parents, last = key.split(separator)
+    for parent in parents:
+        nested_dict = nested_dict[parent]
+    nested_dict[last] = value
+
+
+def get_dotted(config, key, default=None, separator='.'):
+    """Returns the value of a nested key, e.g. `get_dotted(config, 'a.b')` for `config['a']['b']`
+
+    Parameters
+    ----------
+    config : dict
+    key : str
+        nested key, nesting indicated by the separator
+    default : Object, default is None
+        returned if the key does not exist
+    separator : str, default is '.'
+    """
+    value = config
+    for part in key.split(separator):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def set_dotted(config, key, value, separator='.'):
+    """Sets the value of a nested key, e.g. `set_dotted(config, 'a.b', 2)` for `config['a']['b'] = 2`
+
+    Missing intermediate levels are created (as Bunch).
+    """
+    *parents, last = key.split(separator)
+    node = config
+    for part in parents:
+        if part not in node:
+            node[part] = Bunch()
+        node = node[part]
+    node[last] = value
+
+
+def del_dotted(config, key, separator='.'):
+    """Deletes a nested key, e.g. `del_dotted(config, 'a.b')` for `del config['a']['b']`"""
+    *parents, last = key.split(separator)
+    node = config
+    for part in parents:
+        node = node[part]
+    del node[last]
+
+
+def flat_index(config, separator='.'):
+    """Index of the leaves of a nested dict, by flattened key
+
+    For a Bunch, the index is cached, and only recomputed for the nested Bunch whose keys changed
+    (changing them invalidates the index of the Bunch containing them, up to the root):
+    setting the value of an existing leaf does not invalidate it.
+
+    Parameters
+    ----------
+    config : dict
+    separator : str, default is '.'
+
+    Returns
+    -------
+    dict
+        {flat_key: (parent, key)}, where parent[key] is the value of flat_key.
+        Shared with the cache: do not modify it!
+    """
+    if not isinstance(config, Bunch):
+        return _dict_flat_index(config, separator)
+
+    cached = config._flat
+    if cached is not None and cached[0] == separator:
+        return cached[1]
+
+    index = dict()
+    children = []
+    cacheable = True
+    for key, value in dict.items(config):
+        if isinstance(value, Bunch):
+            nested_index = flat_index(value, separator)
+            children.append(value)
+            cacheable = cacheable and value._flat is not None
+        elif isinstance(value, dict):
+            # We cannot track changes to a regular dict
+            nested_index = _dict_flat_index(value, separator)
+            cacheable = False
+        else:
+            index[key] = (config, key)
+            continue
+        for nested_key, ref in nested_index.items():
+            index[f'{key}{separator}{nested_key}'] = ref
+
+    if cacheable:
+        _cache(config, _set_flat, (separator, index), children)
+    return index
+
+
+def flat_items(config, separator='.'):
+    """Iterates over the (flat_key, value) of all the leaves of a nested dict"""
+    for flat_key, (parent, key) in flat_index(config, separator).items():
+        yield flat_key, parent[key]
+
+
+def _dict_flat_index(d, separator):
+    """Same as flat_index, for a regular dict (never cached)"""
+    index = dict()
+    for key, value in d.items():
+        if isinstance(value, dict):
+            nested_index = flat_index(value, separator)
+        else:
+            index[key] = (d, key)
+            continue
+        for nested_key, ref in nested_index.items():
+            index[f'{key}{separator}{nested_key}'] = ref
+    return index
+
+
+class _Missing:
+    """Value of a key missing from one of the configs compared by diff_nested_dicts"""
+    def __repr__(self):
+        return '<missing>'
+
+    def __bool__(self):
+        return False
+
+MISSING = _Missing()
+
+
+def _values_equal(value, other):
+    """Same rule as the digests: e.g. 1 != 1.0 != True, but a ScalarFloat is a float and a list a tuple"""
+    if value is other:
+        return True
+    value_type = type(value)
+    if value_type is type(other) and value_type in _PLAIN_TYPES:
+        return value == other
+    return _canonical_bytes(value) == _canonical_bytes(other)
+
+
+# Types compared directly, their canonical encodings are the same iff the values are equal
+_PLAIN_TYPES = frozenset([str, int, bool, type(None)])
+
+
+def _same_digest(old, new):
+    """True if old and new are Bunch with the same up to date digests, without computing them"""
+    if not (isinstance(old, Bunch) and isinstance(new, Bunch)):
+        return False
+    old_digest = cached_digest(old)
+    return old_digest is not None and old_digest == cached_digest(new)
+
+
+def diff_nested_dicts(old, new, separator='.', digests=False):
+    """Structural diff between two nested dicts, by flattened key
+
+    Nested dicts that are the same object in both, or Bunch with the same (already computed) digest,
+    are skipped without being visited (see `configmypy.digest.digest`).
+
+    Parameters
+    ----------
+    old, new : dict
+    separator : str, default is '.'
+    digests : bool, default is False
+        if True, the digests of old and new are computed first (and cached, for Bunch),
+        so all the unchanged nested Bunch are skipped
+
+    Returns
+    -------
+    dict
+        {flat_key: (old_value, new_value)} for each leaf that changed,
+        where MISSING indicates a leaf that was added or removed
+    """
+    if digests:
+        for config in (old, new):
+            if isinstance(config, Bunch):
+                digest(config)
+    changes = dict()
+    _diff_nested_dicts(old, new, None, separator, changes)
+    return changes
+
+
+def _diff_nested_dicts(old, new, prefix, separator, changes):
+    for key in list(old) + [key for key in new if key not in old]:
+        flat_key = key if prefix is None else f'{prefix}{key}'
+        old_value = old.get(key, MISSING)
+        new_value = new.get(key, MISSING)
+        if old_value is new_value:
+            continue
+        old_is_dict = isinstance(old_value, dict)
+        new_is_dict = isinstance(new_value, dict)
+        if old_is_dict and new_is_dict:
+            if _same_digest(old_value, new_value):
+                continue
+            _diff_nested_dicts(old_value, new_value, f'{flat_key}{separator}', separator, changes)
+        elif old_is_dict or new_is_dict:
+            # A sub-config replaced by a value, or the other way around
+            if old_is_dict:
+                _diff_nested_dicts(old_value, {}, f'{flat_key}{separator}', separator, changes)
+            elif old_value is not MISSING:
+                changes[flat_key] = (old_value, MISSING)
+            if new_is_dict:
+                _diff_nested_dicts({}, new_value, f'{flat_key}{separator}', separator, changes)
+            elif new_value is not MISSING:
+                changes[flat_key] = (MISSING, new_value)
+        elif not _values_equal(old_value, new_value):
+            changes[flat_key] = (old_value, new_value)
+
+
+def prefix_range(sorted_keys, prefix, lo=0):
+    """Returns the range of the keys starting with prefix in a list of sorted keys
+
+    All the keys sharing a prefix are contiguous once sorted,
+    so they can be found in O(log(n_keys)) with a binary search.
+
+    Parameters
+    ----------
+    sorted_keys : list of str
+    prefix : str
+    lo : int, default is 0
+        only search from this index
+
+    Returns
+    -------
+    start, end : int
+        sorted_keys[start:end] are the keys starting with prefix
+    """
+    start = bisect_left(sorted_keys, prefix, lo)
+    # Smallest string larger than all the strings starting with prefix
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    end = bisect_left(sorted_keys, upper_bound, start)
+    return start, end
+
+
+def trim_overwritten_nested_keys(flat_config, separator='.'):
+    """Removes inplace the keys overwritten at a higher level of nesting from a flat config
+
+    The flat config contains both the intermediate keys (e.g. `mlp`) and their leaves (e.g. `mlp.in_features`):
+
+    * if an intermediate key was set to None or a falsy value (e.g. `mlp=None`),
+      the whole sub-config is disabled: its subkeys are removed
+    * otherwise, the intermediate key itself is removed so its leaves can be set individually
+
+    Each removal only costs the size of the removed sub-config.
+
+    Parameters
+    ----------
+    flat_config : dict
+        flattened config, including the intermediate keys
+    separator : str, default is '.'
+        separator indicating the nesting of the keys
+    """
+    keys = sorted(flat_config)
+    for i, key in enumerate(keys):
+        if key not in flat_config:
+            # Already removed with its parent
+            continue
+        start, end = prefix_range(keys, key + separator, lo=i + 1)
+        if start == end:
+            # Leaf
+            continue
+        value = flat_config[key]
+        if value is None or not value:
+            for subkey in keys[start:end]:
+                flat_config.pop(subkey, None)
+            logger.debug('Removing sub-config %s (%d keys)', key, end - start)
+        else:
+            logger.debug('Removing root %s', key)
+            del flat_config[key]
 
 
+def file_fingerprint(filepath):
+    """Cheap fingerprint of a file, without reading its content
+
+    Parameters
+    ----------
+    filepath : str
+
+    Returns
+    -------
+    (mtime_ns, size) : tuple of int
+        None if the file does not exist
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,245 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+
+from .utils import diff_nested_dicts, file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def watched_files(pipeline):
+    """Returns the files read by the steps of a pipeline (their `filepaths`, or `filepath` attribute)"""
+    filepaths = []
+    for step in pipeline.steps:
+        step_filepaths = getattr(step, 'filepaths', None) or [getattr(step, 'filepath', None)]
+        for filepath in step_filepaths:
+            if filepath is not None and filepath not in filepaths:
+                filepaths.append(filepath)
+    return filepaths
+
+
+class _PollingBackend:
+    """Detects changes by periodically checking the mtime and size of the files"""
+    def __init__(self, interval, stop_event):
+        self.interval = interval
+        self.stop_event = stop_event
+
+    def watch(self, filepaths):
+        pass
+
+    def wait(self, timeout):
+        """Waits for at most timeout seconds. Returns True if a change *may* have happened"""
+        self.stop_event.wait(min(timeout, self.interval))
+        return True
+
+    def close(self):
+        pass
+
+
+class _InotifyBackend:
+    """Detects changes with inotify (Linux), without polling
+
+    The folders are watched rather than the files themselves,
+    so that files replaced (e.g. by editors) are still detected.
+    """
+    # Masks from sys/inotify.h
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    _event = struct.Struct('iIII')
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._watches = dict()
+        self._names = set()
+
+    def watch(self, filepaths):
+        self._names = {Path(filepath).name for filepath in filepaths}
+        for folder in {Path(filepath).parent.as_posix() for filepath in filepaths}:
+            if folder in self._watches.values():
+                continue
+            wd = self._libc.inotify_add_watch(self.fd, folder.encode(), self.MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f'Cannot watch {folder}')
+            self._watches[wd] = folder
+
+    def wait(self, timeout):
+        """Waits for at most timeout seconds. Returns True if a watched file may have changed"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64*1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = self._event.unpack_from(data, offset)
+                offset += self._event.size
+                name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+                offset += length
+                changed = changed or name in self._names
+        return changed
+
+    def close(self):
+        fd, self.fd = self.fd, None
+        if fd is not None:
+            os.close(fd)
+
+
+class ConfigWatcher:
+    """Watches the files read by a ConfigPipeline and reads the config again when they change
+
+    Subscribers are called with the new config and the changes,
+    as returned by `diff_nested_dicts`: {flat_key: (old_value, new_value)}.
+    They are only called if the config actually changed.
+
+    Parameters
+    ----------
+    pipeline : ConfigPipeline
+    callback : callable, optional
+        subscriber, called as callback(config, changes)
+    interval : float, default is 1.0
+        time between checks of the files, in seconds, when polling
+    debounce : float, default is 0.2
+        the config is only read again once the files have not changed for that long (in seconds),
+        so several quick writes trigger a single reload
+    backend : {'auto', 'inotify', 'polling'}
+        how to detect changes: 'auto' uses inotify when available and polls otherwise
+
+    Examples
+    --------
+    >>> watcher = pipe.watch(lambda config, changes: print(changes))
+    >>> # Later
+    >>> watcher.stop()
+    """
+    def __init__(self, pipeline, callback=None, interval=1.0, debounce=0.2, backend='auto'):
+        self.pipeline = pipeline
+        self.interval = interval
+        self.debounce = debounce
+        self.subscribers = []
+        if callback is not None:
+            self.subscribe(callback)
+
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._fingerprints = dict()
+
+        if backend == 'auto':
+            try:
+                self._backend = _InotifyBackend()
+            except (OSError, AttributeError):
+                self._backend = _PollingBackend(interval, self._stop_event)
+        elif backend == 'inotify':
+            self._backend = _InotifyBackend()
+        elif backend == 'polling':
+            self._backend = _PollingBackend(interval, self._stop_event)
+        else:
+            raise ValueError(f'Got backend={backend}, but it should be one of "auto", "inotify", "polling".')
+
+    def subscribe(self, callback):
+        """Calls callback(config, changes) each time the config changes"""
+        self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def start(self):
+        """Starts watching the files, in a background thread"""
+        if self._thread is not None:
+            return self
+        if not hasattr(self.pipeline, 'config'):
+            self.pipeline.read_conf()
+        self._watch_files()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='ConfigWatcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops watching the files (for good: create a new watcher to watch them again)
+
+        Calling it again does nothing.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._backend.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def reload(self):
+        """Reads the config again and notifies the subscribers if it changed
+
+        Returns
+        -------
+        dict
+            the changes, {flat_key: (old_value, new_value)}
+        """
+        old_config = self.pipeline.config
+        try:
+            config = self.pipeline.read_conf()
+        except Exception:
+            # e.g. the file is being written: keep the current config
+            logger.exception('Could not read the config again, keeping the current one.')
+            return dict()
+        finally:
+            self._watch_files()
+
+        changes = diff_nested_dicts(old_config, config)
+        if changes:
+            for callback in list(self.subscribers):
+                callback(config, changes)
+        return changes
+
+    def _watch_files(self):
+        filepaths = watched_files(self.pipeline)
+        self._backend.watch(filepaths)
+        self._fingerprints = {filepath: file_fingerprint(filepath) for filepath in filepaths}
+
+    def _changed(self):
+        return any(file_fingerprint(filepath) != fingerprint for filepath, fingerprint in self._fingerprints.items())
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self._backend.wait(self.interval) or not self._changed():
+                continue
+
+            # Debounce: wait until the files are stable
+            fingerprints = None
+            while not self._stop_event.is_set():
+                new_fingerprints = {filepath: file_fingerprint(filepath) for filepath in self._fingerprints}
+                if new_fingerprints == fingerprints:
+                    break
+                fingerprints = new_fingerprints
+                self._stop_event.wait(self.debounce)
+            else:
+                return
+
+            self.reload()
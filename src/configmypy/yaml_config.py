@@ -1,7 +1,27 @@
-from ruamel.yaml import YAML
+from copy import deepcopy
+from functools import partial
+from .arrays import ARRAY_BACKENDS, pack_arrays
 from .bunch import Bunch
+from .cache import ParseCache, get_default_cache
+from .loaders import ENGINES, index_sections, load_section, resolve_engine
+from .utils import file_fingerprint
 from pathlib import Path
 
+
+def parse_to_bunch(content, engine='rt'):
+    """Parses the content of a config file directly into a Bunch"""
+    return Bunch(ENGINES[engine](content))
+
+
+def parse_section_to_bunch(content, config_name, engine='rt'):
+    """Parses only the section config_name of a yaml file into a Bunch"""
+    return Bunch(load_section(content, config_name, engine=engine))
+
+
+# Engines that can read a single section of a file
+SECTION_ENGINES = ('rt', 'safe')
+
+
 class YamlConfig:
     """Read a yaml config file and export it as a dict
     
@@ -9,11 +29,77 @@ class YamlConfig:
     ----------
     config_file : str, default is None
     config_name : str, default is None
+    cache : bool or ParseCache, default is False
+        if True, the parsed file is cached (in the process-wide `configmypy.cache.default_cache`)
+        and only parsed again if it changed.
+        A ParseCache can also be given directly, e.g. to also cache on disk.
+    engine : {'rt', 'safe', 'json', 'toml', 'auto'}, default is 'rt'
+        parser used to read the file:
+
+        * 'rt' : ruamel's round-trip loader, which preserves comments but is slow
+        * 'safe' : fast loader returning plain Python types,
+          using libyaml (C) if available, otherwise a pure-Python fallback
+        * 'json', 'toml' : read json or toml files with the standard library
+        * 'auto' : chosen from the extension of the file ('safe' for yaml files)
+    section_only : bool, default is False
+        if True and config_name is given, only the section config_name of the yaml file is parsed:
+        the other top-level sections are skipped without building them,
+        and the byte offsets of the sections are kept (in the cache, or by this YamlConfig without one)
+        to directly read the right one next time.
+        Falls back to reading the whole file if it cannot be split (e.g. uses anchors).
+    inplace : bool, default is False
+        if True, the config passed to `read_conf` is updated in place, if already a Bunch,
+        instead of being copied first. Use it when the caller hands over the config,
+        e.g. within a ConfigPipeline.
+    include_key : str, optional
+        if given (e.g. 'includes' or 'defaults'), the config read can list other files to compose it from, under that key::
+
+            includes:
+              - common/optimizer.yaml
+              - common/data.yaml: imagenet  # only the section imagenet of that file
+
+        The files (relative to the including file) are read, with their own includes, and merged in order,
+        then updated with the values of the including config. Each file is parsed at most once
+        (and only if it changed, with `cache`). All the files read are listed in the `filepaths` attribute,
+        and their mtime and size (before reading them) in `file_states`.
+    arrays : {False, 'array', 'numpy'}, default is False
+        if not False, the long lists of numbers (at least `configmypy.arrays.MIN_ARRAY_SIZE` values)
+        are stored as typed arrays: array.array (or True), or numpy arrays.
+        They use much less memory, and can be passed to numeric code without copying.
+        Their values can still be set from the command-line, e.g. `--weights [0.1, 0.2, ...]`.
     """
-    def __init__(self, config_file=None, config_name=None, config_folder='.'):
+    def __init__(self, config_file=None, config_name=None, config_folder='.', cache=False, engine='rt',
+                 section_only=False, inplace=False, include_key=None, arrays=False):
         self.config_file = config_file
         self.config_name = config_name
         self.config_folder = config_folder
+        if cache is True:
+            cache = get_default_cache()
+        elif not isinstance(cache, ParseCache):
+            cache = None
+        self.cache = cache
+        if engine != 'auto':
+            resolve_engine(engine)
+        self.engine = engine
+        self.section_only = section_only
+        self.inplace = inplace
+        self.include_key = include_key
+        if arrays is True:
+            arrays = 'array'
+        elif arrays == 'numpy':
+            # Fail early if numpy is not installed
+            import numpy  # noqa: F401
+        elif arrays and arrays not in ARRAY_BACKENDS:
+            raise ValueError(f'Got arrays={arrays!r}, expected False, True or one of {ARRAY_BACKENDS}.')
+        self.arrays = arrays
+        # Files read by the last read_conf (with their includes), and their fingerprint before reading them
+        self.filepaths = []
+        self.file_states = dict()
+        # (filepath, config_name, file fingerprint), future of a file being read ahead, see prefetch
+        self._prefetched = None
+        # Index of the sections of the files read with section_only, when there is no cache
+        # Created here rather than when first read, as files can be read in other threads (see prefetch)
+        self._section_index = ParseCache() if cache is None else None
     
     def read_conf(self, config=None, config_file=None, config_name=None, config_folder=None):
         """Actually read the conf from the specified yaml file
@@ -57,28 +143,187 @@ class YamlConfig:
     
         # Nothing to read
         if config_file is None:
+            self.filepaths, self.file_states = [], dict()
             return config, {}
 
-        filepath = Path(config_folder).resolve().joinpath(config_file).as_posix()
+        filepath = self._get_filepath(config_file, config_folder)
         self.filepath = filepath
-        # Read the conf
-        yaml=YAML()
-        with open(filepath, 'r') as f:
-            self.config = yaml.load(f)
-        
-        if config_name is not None:
-            self.config = self.config[config_name]
-        
-        # IMPORTANT: only work with Bunch otherwise nested updates will be messed up
-        self.config = Bunch(self.config)
+        # Read the conf, unless it was already read ahead
+        loaded = self._get_prefetched(filepath, config_name)
+        if loaded is None:
+            loaded = self._load(filepath, config_name)
+        self.config, self.file_states = loaded
+        self.filepaths = list(self.file_states)
         
         if config is not None:
-            config = Bunch(config)
+            if not (self.inplace and isinstance(config, Bunch)):
+                config = Bunch(config)
             config.update(self.config)
         else:
             config = self.config
 
         return config, {}
 
+    def fingerprint(self, config_file=None, config_name=None, config_folder=None):
+        """Identifies the inputs of `read_conf`, to know whether its result can be reused
+
+        Takes the same parameters as `read_conf` (except the config).
+
+        Returns
+        -------
+        tuple or None
+            the file read, its mtime and size, and the reading options.
+            None if the file does not exist.
+
+        Notes
+        -----
+        The files included are only known once the file is read: they are not part of the fingerprint,
+        but listed with their state in `file_states` after `read_conf` (see `ConfigPipeline(incremental=True)`).
+        """
+        config_file = config_file if config_file is not None else self.config_file
+        config_name = config_name if config_name is not None else self.config_name
+        config_folder = config_folder if config_folder is not None else self.config_folder
+        if config_file is None:
+            return (None, )
+
+        filepath = self._get_filepath(config_file, config_folder)
+        file_state = file_fingerprint(filepath)
+        if file_state is None:
+            return None
+        return (filepath, file_state, config_name, self.engine, self.section_only, self.arrays)
+
+    def prefetch(self, executor):
+        """Starts reading the file ahead of `read_conf`, in executor
+
+        Only the config_file, config_name and config_folder given in __init__ are used:
+        if `read_conf` ends up reading another file (e.g. passed by a previous step),
+        or the file changed in the meantime, the prefetched result is ignored.
+
+        Parameters
+        ----------
+        executor : concurrent.futures.Executor
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            None if there is no file to read
+        """
+        if self.config_file is None:
+            return None
+        filepath = self._get_filepath(self.config_file, self.config_folder)
+        key = (filepath, self.config_name, file_fingerprint(filepath))
+        future = executor.submit(self._load, filepath, self.config_name)
+        self._prefetched = (key, future)
+        return future
+
+    def _get_prefetched(self, filepath, config_name):
+        """Returns the config read by `prefetch`, if any and still valid"""
+        if self._prefetched is None:
+            return None
+        key, future = self._prefetched
+        self._prefetched = None
+        if key != (filepath, config_name, file_fingerprint(filepath)):
+            future.cancel()
+            return None
+        return future.result()
+
+    @staticmethod
+    def _get_filepath(config_file, config_folder):
+        return Path(config_folder).resolve().joinpath(config_file).as_posix()
+
+    def _load(self, filepath, config_name):
+        """Reads the section config_name (or all) of filepath as a new Bunch, with its includes
+
+        Does not modify the YamlConfig (only its thread-safe index of sections), so it can run in another thread
+        (see `prefetch`).
+
+        Returns
+        -------
+        (Bunch, dict)
+            the config, and the fingerprint of each file read (before reading it), {filepath: (mtime_ns, size)}
+        """
+        file_states = {filepath: file_fingerprint(filepath)}
+        config = self._load_file(filepath, config_name)
+        if self.include_key is not None:
+            config = self._resolve_includes(config, filepath, documents=dict(), including=(filepath, ),
+                                            file_states=file_states)
+
+        if self.arrays:
+            pack_arrays(config, backend=self.arrays)
+        return config, file_states
+
+    def _resolve_includes(self, config, filepath, documents, including, file_states):
+        """Merges the files included by config (read from filepath), then config itself, into a new Bunch
+
+        Parameters
+        ----------
+        documents : dict
+            {filepath: document} of the files already parsed, so each is only parsed once
+        including : tuple
+            the files being resolved, to detect cycles
+        file_states : dict
+            {filepath: fingerprint} of all the files read, updated in place
+        """
+        if not isinstance(config, dict) or self.include_key not in config:
+            return config
+        includes = config.pop(self.include_key)
+        if isinstance(includes, (str, dict)):
+            includes = [includes]
+
+        merged = Bunch()
+        for include in includes:
+            if isinstance(include, dict):
+                (include_file, include_name), = include.items()
+            else:
+                include_file, include_name = include, None
+            include_path = Path(filepath).parent.joinpath(include_file).resolve().as_posix()
+            if include_path in including:
+                cycle = ' -> '.join(including + (include_path, ))
+                raise ValueError(f'Cyclic include of {include_path}: {cycle}.')
+            document = documents.get(include_path)
+            if document is None:
+                file_states[include_path] = file_fingerprint(include_path)
+                document = documents[include_path] = self._load_file(include_path, None)
+            included = deepcopy(document if include_name is None else document[include_name])
+            merged.update(self._resolve_includes(included, include_path, documents,
+                                                 including + (include_path, ), file_states))
+        merged.update(config)
+        return merged
+
+    def _load_file(self, filepath, config_name):
+        """Reads the section config_name (or all) of filepath as a new Bunch"""
+        engine = resolve_engine(self.engine, filepath)
+
+        if self.section_only and config_name is not None and engine in SECTION_ENGINES:
+            if self.cache is not None:
+                section = self.cache.get(filepath, partial(parse_section_to_bunch, config_name=config_name, engine=engine),
+                                         key=(engine, config_name))
+                return deepcopy(section)
+
+            # Only the index of the sections is kept, in memory: seek directly to the one we need
+            sections = self._section_index.get(filepath, partial(index_sections, byte_offsets=True))
+            if sections is not None:
+                start, end, column = sections[config_name]
+                with open(filepath, 'rb') as f:
+                    f.seek(start)
+                    content = f.read(end - start).decode('utf-8')
+                return Bunch(ENGINES[engine](' ' * column + content))
+
+        if self.cache is not None:
+            # The cached document is already a Bunch: only copy the part we need
+            document = self.cache.get(filepath, partial(parse_to_bunch, engine=engine), key=engine)
+            if config_name is not None:
+                document = document[config_name]
+            return deepcopy(document)
+
+        with open(filepath, 'r') as f:
+            config = ENGINES[engine](f.read())
+
+        if config_name is not None:
+            config = config[config_name]
+
+        # IMPORTANT: only work with Bunch otherwise nested updates will be messed up
+        return Bunch(config)
+
     def __str__(self):
         return f'{self.__class__.__name__} with config_file={self.config_file}, config_name={self.config_name}, config_folder={self.config_folder}'